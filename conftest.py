@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+import requests
+
+from src.bench.stub_server import make_server
+from src.bench.synthetic import generate_dataset
+from src.etl import utils_api
+from src.etl.http_cache import ResponseCache
+from src.etl.storage import ndjson_path
+
+# Live-API smoke script: it calls TMDB at import time.
+collect_ignore = ["src/etl/test_tmdb.py"]
+
+# Synthetic catalog size served by the stub in tests.
+STUB_MOVIES = 200
+
+# Synthetic raw dataset transformed once per test session, in chunks of
+# SYNTHETIC_CHUNK so several chunks (and parts) are exercised.
+SYNTHETIC_MOVIES = 300
+SYNTHETIC_CHUNK = 100
+
+
+@pytest.fixture
+def start_stub():
+    """Start stub TMDB servers in-process; returns start(**make_server kwargs) -> base_url."""
+    servers = []
+
+    def start(n_movies=STUB_MOVIES, **kwargs):
+        server = make_server(n_movies, **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/3"
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def tmdb(start_stub, tmp_path, monkeypatch):
+    """
+    Point utils_api at a stub server, with an empty cache in tmp_path and
+    a limiter that does not slow the tests down. Returns the base URL.
+    """
+    base_url = start_stub()
+    monkeypatch.setattr(utils_api, "BASE_URL", base_url)
+    monkeypatch.setattr(utils_api, "CACHE", ResponseCache(tmp_path / "http_cache.sqlite", enabled=True))
+    monkeypatch.setattr(utils_api, "LIMITER", utils_api.TokenBucket(10_000))
+    return base_url
+
+
+def stub_stats(base_url):
+    """Request counters of a stub server (its /__stats endpoint)."""
+    return requests.get(f"{base_url}/__stats", timeout=5).json()
+
+
+@pytest.fixture(scope="session")
+def synthetic_raw(tmp_path_factory):
+    """Raw details / credits stores and genres.json of a small synthetic catalog."""
+    return generate_dataset(SYNTHETIC_MOVIES, folder=tmp_path_factory.mktemp("bench"), workers=1)
+
+
+def transform_synthetic(raw, folder, **kwargs):
+    from src.etl.transform_tmdb import run_transform
+
+    run_transform(
+        chunk_size=SYNTHETIC_CHUNK,
+        details_paths=[ndjson_path(raw, "details")],
+        credits_paths=[ndjson_path(raw, "credits")],
+        genres_path=raw / "genres.json",
+        folder=folder,
+        **kwargs,
+    )
+    return folder
+
+
+@pytest.fixture(scope="session")
+def synthetic_clean(synthetic_raw, tmp_path_factory):
+    """Parquet clean layer of the synthetic catalog (treat as read-only)."""
+    return transform_synthetic(synthetic_raw, tmp_path_factory.mktemp("clean"))
@@ -1,16 +1,31 @@
 import os
+import re
+import time
+import threading
+from collections import namedtuple
+from datetime import date
+from google.api_core.exceptions import NotFound
 from google.cloud import bigquery
+from google.cloud import bigquery_storage
 from google.oauth2 import service_account
 from dotenv import load_dotenv
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from pathlib import Path
 
+from src.etl.publish import read_published
+from src.etl.schemas import SCHEMAS
+from src.etl.instrumentation import METRICS
+from .query_cache import QUERY_CACHE, result_key
+from .local_backend import LOCAL_BACKEND
+from .postgres_backend import POSTGRES_BACKEND
+
 load_dotenv()
 
 # -------------------------------------------------------------------
 # ABSOLUTE PROJECT ROOT (tmdb-data-analyst/)
 # -------------------------------------------------------------------
-# This resolves to: C:/Users/casco/Desktop/tmdb-data-analyst
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 
 # Environment variables
@@ -21,50 +36,351 @@ DATASET = os.getenv("BIGQUERY_DATASET")
 # ABSOLUTE PATH TO service_account.json
 # -------------------------------------------------------------------
 RELATIVE_CREDENTIALS = os.getenv("GCP_CREDENTIALS")  # "credentials/service_account.json"
-CREDENTIALS = PROJECT_ROOT / RELATIVE_CREDENTIALS
+CREDENTIALS = PROJECT_ROOT / RELATIVE_CREDENTIALS if RELATIVE_CREDENTIALS else None
 
 # -------------------------------------------------------------------
 # ABSOLUTE PATH TO sql_queries.sql
 # -------------------------------------------------------------------
 SQL_FILE = PROJECT_ROOT / "src" / "analytics" / "sql_queries.sql"
 
+# -------------------------------------------------------------------
+# QUERY REGISTRY
+# -------------------------------------------------------------------
+# Every query in sql_queries.sql starts with a marker line:
+#   -- name: NAME(param TYPE = default, ...)
+# Any other "--" line is an ordinary comment.
+QUERY_MARKER = re.compile(r"^--[ \t]*name:(.*)$", re.MULTILINE)
+QUERY_DECLARATION = re.compile(r"^\s*([A-Z][A-Z0-9_]*)\s*(?:\(([^)]*)\))?\s*$")
+SQL_PARAM = re.compile(r"@(\w+)")
+PARAM_SPEC = re.compile(r"^\s*(\w+)\s+(\w+)\s*(?:=\s*(.+?))?\s*$")
 
-def get_client():
-    if not CREDENTIALS.exists():
+PARAM_TYPES = {
+    "INT64": int,
+    "FLOAT64": float,
+    "STRING": str,
+    "BOOL": lambda v: v if isinstance(v, bool) else str(v).lower() in ("true", "1"),
+    "DATE": lambda v: v if isinstance(v, date) else date.fromisoformat(str(v)),
+}
+
+Query = namedtuple("Query", ["name", "sql", "params"])
+# A parameter declared without "= default" must be passed to run_query.
+Param = namedtuple("Param", ["name", "type", "default", "required"])
+
+# "bigquery", "local" to run the same queries offline on data/clean
+# through SQLite (see local_backend.py), or "postgres" to answer them from
+# the materialized views load_tmdb keeps (see postgres_backend.py).
+BACKEND = os.getenv("TMDB_ANALYTICS_BACKEND", "bigquery")
+
+# run_query result types: a DataFrame, one Arrow table, or an iterator of
+# Arrow record batches streamed through the BigQuery Storage Read API.
+OUTPUTS = ("pandas", "arrow", "batches")
+
+# Rows per record batch for local results returned as output="batches".
+LOCAL_BATCH_ROWS = 65536
+
+# How often the tables' last-modified times are re-read from BigQuery.
+VERSION_CHECK_SECONDS = 300
+
+_QUERIES = None
+_CLIENT = None
+_READ_CLIENT = None
+_VERSION = (None, 0.0)
+_LOCK = threading.Lock()
+
+
+def parse_default(raw, param_type):
+    if raw is None or raw.upper() == "NULL":
+        return None
+    if raw[0] in "'\"":
+        raw = raw[1:-1]
+    return PARAM_TYPES[param_type](raw)
+
+
+def parse_params(spec):
+    params = []
+    for item in filter(str.strip, (spec or "").split(",")):
+        match = PARAM_SPEC.match(item)
+        if not match or match.group(2).upper() not in PARAM_TYPES:
+            raise ValueError(f"[ERROR] Invalid query parameter declaration: '{item.strip()}'")
+
+        name, param_type, default = match.group(1), match.group(2).upper(), match.group(3)
+        params.append(Param(name, param_type, parse_default(default, param_type), default is None))
+    return tuple(params)
+
+
+def parse_queries(text):
+    """
+    Split a SQL file into {name: Query} on its `-- name:` markers. A
+    malformed marker, a duplicate name or an @param the marker does not
+    declare raises ValueError.
+    """
+    markers = list(QUERY_MARKER.finditer(text))
+    queries = {}
+
+    for marker, following in zip(markers, markers[1:] + [None]):
+        declaration = QUERY_DECLARATION.match(marker.group(1))
+        if not declaration:
+            raise ValueError(f"[ERROR] Invalid query marker: '{marker.group(0).strip()}'")
+
+        name = declaration.group(1)
+        if name in queries:
+            raise ValueError(f"[ERROR] Query '{name}' is declared twice in sql_queries.sql")
+
+        end = following.start() if following else len(text)
+        sql = text[marker.end():end].strip().rstrip(";").strip()
+        params = parse_params(declaration.group(2))
+
+        undeclared = set(SQL_PARAM.findall(sql)) - {p.name for p in params}
+        if undeclared:
+            raise ValueError(f"[ERROR] Query '{name}' uses undeclared parameter(s): {', '.join(sorted(undeclared))}")
+
+        queries[name] = Query(name, sql, params)
+
+    return queries
+
+
+def get_queries():
+    """Query registry, parsed from sql_queries.sql once per process."""
+    global _QUERIES
+
+    if _QUERIES is None:
+        with _LOCK:
+            if _QUERIES is None:
+                if not SQL_FILE.exists():
+                    raise FileNotFoundError(f"[ERROR] SQL file not found at: {SQL_FILE}")
+                _QUERIES = parse_queries(SQL_FILE.read_text(encoding="utf-8"))
+
+    return _QUERIES
+
+
+def get_query(query_name):
+    try:
+        return get_queries()[query_name]
+    except KeyError:
+        raise ValueError(f"[ERROR] Query '{query_name}' not found in sql_queries.sql") from None
+
+
+def load_credentials():
+    if CREDENTIALS is None or not CREDENTIALS.exists():
         raise FileNotFoundError(
             f"[ERROR] BigQuery credentials not found at:\n {CREDENTIALS}\n\n"
             f"Working dir: {os.getcwd()}\n"
             f"PROJECT_ROOT: {PROJECT_ROOT}"
         )
+    return service_account.Credentials.from_service_account_file(CREDENTIALS)
+
+
+def get_client():
+    """Process-wide BigQuery client; credentials are loaded on first use only."""
+    global _CLIENT
+
+    if _CLIENT is None:
+        with _LOCK:
+            if _CLIENT is None:
+                _CLIENT = bigquery.Client(credentials=load_credentials(), project=PROJECT)
+
+    return _CLIENT
+
+
+def get_read_client():
+    """
+    Process-wide BigQuery Storage Read API client. Query results are
+    downloaded from it as Arrow streams instead of paged JSON over REST.
+    """
+    global _READ_CLIENT
 
-    credentials = service_account.Credentials.from_service_account_file(
-        CREDENTIALS
-    )
-    client = bigquery.Client(credentials=credentials, project=PROJECT)
-    return client
+    if _READ_CLIENT is None:
+        with _LOCK:
+            if _READ_CLIENT is None:
+                _READ_CLIENT = bigquery_storage.BigQueryReadClient(credentials=load_credentials())
+
+    return _READ_CLIENT
 
 
 def read_sql(query_name):
-    if not SQL_FILE.exists():
-        raise FileNotFoundError(f"[ERROR] SQL file not found at: {SQL_FILE}")
+    """SQL of a registered query with {{PROJECT}} / {{DATASET}} filled in."""
+    sql = get_query(query_name).sql
+    return sql.replace("{{PROJECT}}", PROJECT).replace("{{DATASET}}", DATASET)
+
+
+def bind_params(query_name, params):
+    """
+    Resolve keyword arguments against the query's declared parameters:
+    unknown names raise, missing (or None) values take the declared default
+    (or raise if the parameter has none), and values are coerced to the
+    declared type (raising ValueError if they cannot be).
+    """
+    query = get_query(query_name)
+    declared = {p.name: p for p in query.params}
+
+    unknown = set(params) - set(declared)
+    if unknown:
+        raise ValueError(f"[ERROR] Query '{query_name}' has no parameter(s): {', '.join(sorted(unknown))}")
 
-    text = SQL_FILE.read_text()
+    values = {}
+    for p in query.params:
+        value = params.get(p.name)
+        if value is None and p.required:
+            raise ValueError(f"[ERROR] Query '{query_name}' requires parameter '{p.name}' ({p.type})")
+        if value is None:
+            value = p.default
+        else:
+            try:
+                value = PARAM_TYPES[p.type](value)
+            except (TypeError, ValueError):
+                raise ValueError(
+                    f"[ERROR] Parameter '{p.name}' of query '{query_name}' must be {p.type}, got {value!r}"
+                ) from None
+        values[p.name] = (p.type, value)
 
-    parts = text.split("-- ")
-    for block in parts:
-        if block.startswith(query_name):
-            sql = block.split(":", 1)[1].strip()
+    return values
 
-            sql = sql.replace("{{PROJECT}}", PROJECT)
-            sql = sql.replace("{{DATASET}}", DATASET)
 
-            return sql
+def query_parameters(bound):
+    """BigQuery parameters for values returned by bind_params."""
+    return [
+        bigquery.ScalarQueryParameter(name, param_type, value)
+        for name, (param_type, value) in bound.items()
+    ]
 
-    raise ValueError(f"[ERROR] Query '{query_name}' not found in sql_queries.sql")
 
+def tables_modified():
+    """Last-modified time of every dataset table (re-read every VERSION_CHECK_SECONDS)."""
+    global _VERSION
+
+    with _LOCK:
+        modified, checked_at = _VERSION
+    if modified is not None and time.monotonic() - checked_at < VERSION_CHECK_SECONDS:
+        return modified
 
-def run_query(query_name):
     client = get_client()
+    times = []
+    for table in SCHEMAS:
+        try:
+            times.append(client.get_table(f"{PROJECT}.{DATASET}.{table}").modified.isoformat())
+        except NotFound:
+            # Not loaded yet; any other error must not pass for "no table".
+            times.append(None)
+
+    with _LOCK:
+        _VERSION = (times, time.monotonic())
+    return times
+
+
+def data_version():
+    """
+    Version of the data behind the queries: the last publish run written by
+    bigquery_load (seen immediately on this machine) plus the tables'
+    last-modified times (catches loads from elsewhere).
+    """
+    published = read_published("bigquery")
+    return [published["run_id"] if published else None, tables_modified()]
+
+
+def local_result(df, output):
+    """Convert a local (SQLite) or Postgres DataFrame result to the requested output type."""
+    if output == "pandas":
+        return df
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    return table if output == "arrow" else iter(table.to_batches(max_chunksize=LOCAL_BATCH_ROWS))
+
+
+def run_query(query_name, use_cache=True, backend=None, output="pandas", **params):
+    """
+    Run a registered query with typed BigQuery parameters, e.g.
+    run_query("POPULARITY_TREND", min_year=2000, genre="Drama").
+
+    output="pandas" returns a DataFrame, "arrow" a pyarrow.Table and
+    "batches" an iterator of pyarrow.RecordBatch. BigQuery results are read
+    through the Storage Read API; "batches" streams them, so large results
+    can be processed in constant memory (see export_query).
+
+    DataFrame results are cached on disk per SQL + parameters + data
+    version, so a repeated call skips BigQuery until new data is published.
+    backend="local" (or TMDB_ANALYTICS_BACKEND=local) runs the query on the
+    clean files instead, offline; backend="postgres" reads it from the
+    Postgres materialized views.
+    """
+    backend = backend or BACKEND
+    if output not in OUTPUTS:
+        raise ValueError(f"[ERROR] Unknown output '{output}' (use one of: {', '.join(OUTPUTS)})")
+    bound = bind_params(query_name, params)
+
+    if backend in ("local", "postgres"):
+        start = time.perf_counter()
+        if backend == "local":
+            df = LOCAL_BACKEND.query(get_query(query_name).sql, bound)
+        else:
+            df = POSTGRES_BACKEND.query(query_name, bound)
+        METRICS.observe("tmdb_query_seconds", time.perf_counter() - start, query=query_name, backend=backend)
+        return local_result(df, output)
+    if backend != "bigquery":
+        raise ValueError(f"[ERROR] Unknown analytics backend '{backend}' (use 'bigquery', 'local' or 'postgres')")
+
     sql = read_sql(query_name)
-    df = client.query(sql).to_dataframe()
+    # The data version costs a get_table per table; skip it when nothing is cached.
+    cached = use_cache and output == "pandas" and QUERY_CACHE.enabled
+    key = result_key(sql, bound, data_version()) if cached else None
+
+    if key:
+        df = QUERY_CACHE.get(key)
+        if df is not None:
+            METRICS.inc("tmdb_query_cache_hits_total", query=query_name)
+            return df
+
+    client = get_client()
+    job_config = bigquery.QueryJobConfig(query_parameters=query_parameters(bound))
+    start = time.perf_counter()
+    job = client.query(sql, job_config=job_config)
+    rows = job.result()
+
+    # Time to a finished job; reading the result is not included.
+    METRICS.observe("tmdb_query_seconds", time.perf_counter() - start, query=query_name, backend=backend)
+    METRICS.inc("tmdb_bigquery_bytes_processed_total", job.total_bytes_processed or 0, query=query_name)
+    METRICS.inc("tmdb_bigquery_bytes_billed_total", job.total_bytes_billed or 0, query=query_name)
+
+    # Small results that fit in the first page skip the Storage API.
+    if output == "batches":
+        return rows.to_arrow_iterable(bqstorage_client=get_read_client())
+    if output == "arrow":
+        return rows.to_arrow(bqstorage_client=get_read_client())
+
+    df = rows.to_dataframe(bqstorage_client=get_read_client())
+
+    if key:
+        QUERY_CACHE.put(key, df)
     return df
+
+
+def export_query(query_name, path, backend=None, **params):
+    """
+    Write a query result to a Parquet file batch by batch, without holding
+    the whole result in memory. Returns the number of rows written.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+
+    rows = 0
+    writer = None
+    done = False
+    try:
+        for batch in run_query(query_name, use_cache=False, backend=backend, output="batches", **params):
+            if writer is None:
+                writer = pq.ParquetWriter(tmp, batch.schema, compression="zstd")
+            writer.write_batch(batch)
+            rows += batch.num_rows
+        done = True
+    finally:
+        if writer is not None:
+            writer.close()
+        if not done:
+            tmp.unlink(missing_ok=True)
+
+    if writer is None:
+        print(f"[WARN] {query_name} returned no rows; nothing written to {path}")
+        return 0
+
+    tmp.replace(path)
+    print(f"[SAVED] {query_name}: {rows} rows -> {path}")
+    return rows
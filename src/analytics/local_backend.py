@@ -0,0 +1,272 @@
+import re
+import math
+import time
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from src.etl.schemas import SCHEMAS, CLEAN_DIR, clean_path, read_clean_frame
+
+# ============================================================
+# DIALECT
+# ============================================================
+
+# BigQuery -> SQLite rewrites for the constructs used in sql_queries.sql.
+DIALECT_RULES = [
+    # `project.dataset.table` -> "table" (quoted: CAST is a keyword)
+    (re.compile(r"`[^`]*?\.(\w+)`"), r'"\1"'),
+    (re.compile(r"EXTRACT\s*\(\s*YEAR\s+FROM\s+([\w.]+)\s*\)", re.IGNORECASE), r"CAST(strftime('%Y', \1) AS INTEGER)"),
+    # Named query parameters: @name -> :name
+    (re.compile(r"@(\w+)"), r":\1"),
+]
+
+INDEXES = {
+    "movie_genres": ["movie_id", "genre_id"],
+    "cast": ["movie_id"],
+    "crew": ["movie_id"],
+    "people": ["person_id"],
+}
+
+
+# Table references after translation ("movies"); only those tables are loaded.
+TABLE_REFERENCE = re.compile(r'"(\w+)"')
+
+# Clause keywords and parentheses; the scan tracks nesting so every SELECT
+# (CTEs, subqueries, UNION branches) is matched with its own GROUP BY.
+CLAUSE = re.compile(
+    r"\b(?:SELECT|FROM|WHERE|GROUP\s+BY|HAVING|QUALIFY|WINDOW|ORDER\s+BY|LIMIT|UNION|INTERSECT|EXCEPT)\b|[()]",
+    re.IGNORECASE,
+)
+# Comments and string literals, blanked out before the scan.
+OPAQUE = re.compile(r"--[^\n]*|'(?:[^'\\]|\\.)*'")
+ALIAS = re.compile(r"\bAS\s+(\w+)\s*$", re.IGNORECASE)
+
+
+def mask(sql):
+    """Blank out comments and string literals, keeping every offset."""
+    return OPAQUE.sub(lambda m: " " * len(m.group(0)), sql)
+
+
+def split_top_level(text):
+    """Split on commas outside parentheses and string literals."""
+    items, depth, start = [], 0, 0
+    for index, char in enumerate(mask(text)):
+        depth += char == "("
+        depth -= char == ")"
+        if char == "," and depth == 0:
+            items.append(text[start:index])
+            start = index + 1
+    return items + [text[start:]]
+
+
+def select_blocks(sql):
+    """
+    (select list, GROUP BY list) spans of every SELECT that has a GROUP BY,
+    each taken at that SELECT's own nesting level.
+    """
+    masked = mask(sql)
+    blocks, open_blocks, depth = [], {}, 0
+
+    def close(level, position):
+        block = open_blocks.pop(level, None)
+        if block and block["group"] is not None:
+            blocks.append((block["select"], (block["group"], block["group_end"] or position)))
+
+    for match in CLAUSE.finditer(masked):
+        token = " ".join(match.group(0).upper().split())
+        if token == "(":
+            depth += 1
+            continue
+        if token == ")":
+            close(depth, match.start())
+            depth -= 1
+            continue
+
+        block = open_blocks.get(depth)
+        if token == "SELECT":
+            close(depth, match.start())
+            open_blocks[depth] = {"select": [match.end(), None], "group": None, "group_end": None}
+        elif block is not None:
+            if token == "FROM" and block["select"][1] is None:
+                block["select"][1] = match.start()
+            if block["group"] is not None and block["group_end"] is None:
+                block["group_end"] = match.start()
+            if token == "GROUP BY":
+                block["group"] = match.end()
+
+    for level in sorted(open_blocks, reverse=True):
+        close(level, len(sql))
+    return [(tuple(select), group) for select, group in blocks if select[1] is not None]
+
+
+def group_by_ordinals(sql):
+    """
+    BigQuery resolves GROUP BY names to SELECT aliases first; SQLite
+    resolves them to columns, which is ambiguous for aliases like
+    `g.genre_id AS genre_id` in a join. Use select-list positions instead,
+    in every SELECT of the query.
+    """
+    edits = []
+    for (select_start, select_end), (group_start, group_end) in select_blocks(sql):
+        positions = {}
+        for index, item in enumerate(split_top_level(sql[select_start:select_end]), start=1):
+            alias = ALIAS.search(item.strip())
+            if alias:
+                positions[alias.group(1).lower()] = str(index)
+
+        group = sql[group_start:group_end]
+        items = [item.strip() for item in split_top_level(group)]
+        trailing = group[len(group.rstrip()):]
+        edits.append((group_start, group_end, " " + ", ".join(positions.get(i.lower(), i) for i in items) + trailing))
+
+    for start, end, replacement in sorted(edits, reverse=True):
+        sql = sql[:start] + replacement + sql[end:]
+    return sql
+
+
+def to_sqlite(sql):
+    """Translate a BigQuery query from the registry to SQLite."""
+    for pattern, replacement in DIALECT_RULES:
+        sql = pattern.sub(replacement, sql)
+    return group_by_ordinals(sql)
+
+
+def referenced_tables(sql):
+    """Clean tables a translated query reads."""
+    return sorted({name for name in TABLE_REFERENCE.findall(sql) if name in SCHEMAS})
+
+
+class StdDev:
+    """Sample standard deviation aggregate, like BigQuery's STDDEV."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def step(self, value):
+        if value is None:
+            return
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    def finalize(self):
+        if self.n < 2:
+            return None
+        return math.sqrt(self.m2 / (self.n - 1))
+
+
+# ============================================================
+# BACKEND
+# ============================================================
+
+class LocalBackend:
+    """
+    Runs registry queries against the clean files in an in-memory SQLite
+    database. A table is loaded the first time a query references it and
+    reloaded when its clean files change on disk; tables no query uses are
+    never read.
+    """
+
+    def __init__(self, folder=CLEAN_DIR):
+        self.folder = Path(folder)
+        self.conn = None
+        self.signatures = {}
+        self.lock = threading.Lock()
+
+    def _signature(self, table):
+        path = clean_path(table, self.folder)
+        if not path.exists():
+            path = clean_path(table, self.folder, "csv")
+        files = sorted(path.rglob("*.parquet")) if path.is_dir() else [path]
+        return [(str(f), f.stat().st_mtime_ns) for f in files if f.exists()]
+
+    def _load(self, table):
+        df = read_clean_frame(table, self.folder)
+        if "release_date" in df:
+            df["release_date"] = pd.to_datetime(df["release_date"]).dt.strftime("%Y-%m-%d")
+
+        self.conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+        df.to_sql(table, self.conn, index=False)
+
+        for column in INDEXES.get(table, []):
+            self.conn.execute(f'CREATE INDEX "{table}_{column}" ON "{table}" ("{column}")')
+
+    def connection(self, tables=None):
+        """The SQLite connection with `tables` (default: every clean table) loaded and current."""
+        if self.conn is None:
+            self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+            self.conn.create_aggregate("STDDEV", 1, StdDev)
+
+        for table in SCHEMAS if tables is None else tables:
+            signature = self._signature(table)
+            if self.signatures.get(table) != signature:
+                start = time.perf_counter()
+                self._load(table)
+                self.signatures[table] = signature
+                print(f"[OK] Local backend loaded '{table}' from {self.folder} in {time.perf_counter() - start:.2f}s")
+
+        return self.conn
+
+    def query(self, sql, params):
+        """Run a BigQuery-dialect query; `params` maps name -> (type, value)."""
+        values = {name: value for name, (_, value) in params.items()}
+        sql = to_sqlite(sql)
+        with self.lock:
+            return pd.read_sql_query(sql, self.connection(referenced_tables(sql)), params=values)
+
+
+LOCAL_BACKEND = LocalBackend()
+
+
+# ============================================================
+# PARITY CHECK
+# ============================================================
+
+def comparable(df):
+    """Sort rows and normalize dtypes so results from both engines compare."""
+    df = df.copy()
+    for column in df.columns:
+        if pd.api.types.is_numeric_dtype(df[column]):
+            df[column] = df[column].astype("float64")
+        else:
+            df[column] = df[column].astype(object).where(df[column].notna(), None)
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+def check_parity(query_names=None):
+    """Run every query on BigQuery and locally (default parameters); raise on any difference."""
+    from .helpers import get_queries, run_query
+
+    for name in query_names or get_queries():
+        remote = run_query(name, use_cache=False, backend="bigquery")
+        local = run_query(name, backend="local")
+        pd.testing.assert_frame_equal(comparable(local), comparable(remote), rtol=1e-6)
+        print(f"[OK] {name}: {len(local)} rows identical on both backends")
+
+
+def main():
+    from .helpers import get_queries, run_query
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--check-parity", action="store_true",
+                        help="Compare every query against BigQuery (needs credentials and a loaded dataset)")
+    args = parser.parse_args()
+
+    if args.check_parity:
+        check_parity()
+        return
+
+    for name in get_queries():
+        start = time.perf_counter()
+        df = run_query(name, backend="local")
+        print(f"[OK] {name}: {len(df)} rows in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import os
+import threading
+
+import pandas as pd
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+from src.config.create_schema import VIEW_QUERIES
+
+load_dotenv()
+
+# ============================================================
+# BACKEND
+# ============================================================
+
+class PostgresBackend:
+    """
+    Answers registry queries from the materialized views that load_tmdb
+    keeps in Postgres (see create_schema.MATERIALIZED_VIEWS), so dashboards
+    read precomputed aggregates instead of joining the fact tables.
+    """
+
+    def __init__(self, url=None):
+        self.url = url
+        self.engine = None
+        self.lock = threading.Lock()
+
+    def get_engine(self):
+        if self.engine is None:
+            with self.lock:
+                if self.engine is None:
+                    url = self.url or os.getenv("DATABASE_URL")
+                    if not url:
+                        raise ValueError("[ERROR] DATABASE_URL not found in .env (needed by the postgres backend)")
+                    self.engine = create_engine(url)
+        return self.engine
+
+    def query(self, query_name, params):
+        """Run a registry query on its view; `params` maps name -> (type, value)."""
+        if query_name not in VIEW_QUERIES:
+            raise ValueError(
+                f"[ERROR] Query '{query_name}' has no materialized view in Postgres "
+                f"(views: {', '.join(VIEW_QUERIES)}); use the bigquery or local backend"
+            )
+
+        values = {name: value for name, (_, value) in params.items()}
+        with self.get_engine().connect() as conn:
+            return pd.read_sql_query(text(VIEW_QUERIES[query_name]), conn, params=values)
+
+
+POSTGRES_BACKEND = PostgresBackend()
@@ -1,22 +1,126 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from .helpers import run_query
+from src.etl.aggregate_cube import cube_path, read_cube, rollup
+from src.etl.schemas import CLEAN_DIR, read_clean_frame
 import pandas as pd
 
-def top_genres():
-    return run_query("TOP_GENRES_BY_COUNT")
+# Year filters are inclusive; None means no bound. backend="postgres"
+# answers popularity_by_genre, popularity_trend, catalog_maturity and
+# genre_stability from the materialized views in Postgres.
+
+def top_genres(limit=None, min_year=None, max_year=None, backend=None):
+    # Every genre by movie count; `limit` keeps the first ones (None: all).
+    df = run_query("TOP_GENRES_BY_COUNT", backend=backend, min_year=min_year, max_year=max_year)
+    return df if limit is None else df.head(limit)
+
+def popularity_by_genre(min_year=None, max_year=None, backend=None):
+    return run_query("POPULARITY_BY_GENRE", backend=backend, min_year=min_year, max_year=max_year)
+
+def popularity_trend(min_year=None, max_year=None, genre=None, backend=None):
+    return run_query("POPULARITY_TREND", backend=backend, min_year=min_year, max_year=max_year, genre=genre)
+
+def engagement_score(limit=None, min_year=None, max_year=None, backend=None):
+    # engagement_score (vote_count * popularity) is computed in SQL.
+    return run_query("ENGAGEMENT_SCORE", backend=backend, limit=limit, min_year=min_year, max_year=max_year)
+
+def catalog_maturity(min_year=None, max_year=None, backend=None):
+    return run_query("CATALOG_MATURITY", backend=backend, min_year=min_year, max_year=max_year)
+
+def genre_stability(min_year=None, max_year=None, backend=None):
+    return run_query("GENRE_STABILITY", backend=backend, min_year=min_year, max_year=max_year)
+
+
+# ============================================================
+# ALL METRICS IN ONE PASS
+# ============================================================
+
+def split_rollup(rollup, top_limit=None):
+    """
+    Derive the five genre/year KPI frames from one METRICS_ROLLUP result.
+    top_limit keeps the first genres by movie count, like top_genres(limit).
+    """
+    genres = rollup[rollup["grain"] == "genre"]
+    years = rollup[rollup["grain"] == "year"]
+
+    top = (
+        genres.rename(columns={"genre": "genre_name"})
+        .sort_values("movie_count", ascending=False)[["genre_id", "genre_name", "movie_count"]]
+        .astype({"genre_id": "int64"})
+    )
+    if top_limit is not None:
+        top = top.head(top_limit)
+
+    # POPULARITY_BY_GENRE / GENRE_STABILITY group by name; TMDB genre names are unique.
+    by_genre = genres[["genre", "avg_popularity", "popularity_stddev"]]
+
+    trend = years.sort_values("year")
+    return {
+        "top_genres": top.reset_index(drop=True),
+        "popularity_by_genre": by_genre[["genre", "avg_popularity"]]
+            .sort_values("avg_popularity", ascending=False).reset_index(drop=True),
+        "popularity_trend": trend[["year", "avg_popularity"]].astype({"year": "int64"}).reset_index(drop=True),
+        "catalog_maturity": trend[["year", "movie_count"]].astype({"year": "int64"})
+            .rename(columns={"movie_count": "total_movies"}).reset_index(drop=True),
+        "genre_stability": by_genre[["genre", "popularity_stddev"]]
+            .rename(columns={"popularity_stddev": "popularity_variance"})
+            .sort_values("popularity_variance").reset_index(drop=True),
+    }
+
+
+# ============================================================
+# METRICS FROM THE AGGREGATE CUBE
+# ============================================================
+
+_CUBE = (None, None, None)
+
+
+def load_cube(folder=CLEAN_DIR):
+    """Genre x year cube and genre names, re-read only when the cube file changes."""
+    global _CUBE
+
+    path = cube_path(folder)
+    if not path.exists():
+        raise FileNotFoundError(f"[ERROR] Aggregate cube not found at {path} (run transform_tmdb)")
+
+    signature = (str(path), path.stat().st_mtime_ns)
+    if _CUBE[0] != signature:
+        _CUBE = (signature, read_cube(folder), read_clean_frame("genres", folder))
+    return _CUBE[1], _CUBE[2]
+
+
+def cube_metrics(min_year=None, max_year=None, top_limit=None, folder=CLEAN_DIR):
+    """
+    The five genre/year KPIs from the cube written by transform_tmdb: no
+    query and no fact-table scan. Reflects data/clean as last transformed.
+    """
+    cube, genres = load_cube(folder)
+    return split_rollup(rollup(cube, genres, min_year, max_year), top_limit)
 
-def popularity_by_genre():
-    return run_query("POPULARITY_BY_GENRE")
 
-def popularity_trend():
-    return run_query("POPULARITY_TREND")
+def compute_all_metrics(min_year=None, max_year=None, top_limit=None, engagement_limit=None, backend=None,
+                        source="sql"):
+    """
+    Every KPI for a dashboard refresh: one rollup query scans movies and
+    genres once for the five genre/year metrics, while the per-movie
+    engagement ranking runs concurrently. source="cube" answers the five
+    from the aggregate cube instead. Year bounds apply to every metric
+    (top genres included). Returns {metric name: DataFrame}.
+    """
+    if source == "cube":
+        metrics = cube_metrics(min_year, max_year, top_limit)
+        metrics["engagement_score"] = run_query("ENGAGEMENT_SCORE", backend=backend, limit=engagement_limit,
+                                                min_year=min_year, max_year=max_year)
+        return metrics
+    if source != "sql":
+        raise ValueError(f"[ERROR] Unknown metrics source '{source}' (use 'sql' or 'cube')")
 
-def engagement_score():
-    df = run_query("ENGAGEMENT_SCORE")
-    df["engagement_score"] = df["vote_count"] * df["popularity"]
-    return df
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        rollup = pool.submit(run_query, "METRICS_ROLLUP", backend=backend, min_year=min_year, max_year=max_year)
+        engagement = pool.submit(run_query, "ENGAGEMENT_SCORE", backend=backend, limit=engagement_limit,
+                                 min_year=min_year, max_year=max_year)
 
-def catalog_maturity():
-    return run_query("CATALOG_MATURITY")
+        metrics = split_rollup(rollup.result(), top_limit)
+        metrics["engagement_score"] = engagement.result()
 
-def genre_stability():
-    return run_query("GENRE_STABILITY")
+    return metrics
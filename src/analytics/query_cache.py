@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+CACHE_DIR = Path(os.getenv("TMDB_CACHE_DIR", PROJECT_ROOT / "data" / "cache")) / "queries"
+
+QUERY_CACHE_ENABLED = os.getenv("TMDB_QUERY_CACHE", "1") != "0"
+QUERY_CACHE_TTL = int(os.getenv("TMDB_QUERY_CACHE_TTL", str(24 * 3600)))
+MAX_QUERY_CACHE_BYTES = int(float(os.getenv("TMDB_QUERY_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+
+def result_key(sql, params, data_version):
+    """Stable key from the rendered SQL, bound parameters and data version."""
+    normalized = sorted((name, param_type, str(value)) for name, (param_type, value) in params.items())
+    raw = json.dumps([sql, normalized, data_version], separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# ============================================================
+# CACHE
+# ============================================================
+
+class QueryResultCache:
+    """
+    On-disk cache of query results, one Parquet file per result.
+
+    Entries expire after `ttl` seconds. The data version is part of the
+    key, so a new load makes old entries unreachable; they age out through
+    the TTL or the size bound, which evicts the least recently used files
+    first (last use is tracked in the file's access time).
+    """
+
+    def __init__(self, folder=CACHE_DIR, ttl=QUERY_CACHE_TTL, max_bytes=MAX_QUERY_CACHE_BYTES,
+                 enabled=QUERY_CACHE_ENABLED):
+        self.folder = Path(folder)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key):
+        return self.folder / f"{key}.parquet"
+
+    def get(self, key):
+        """Cached DataFrame for `key`, or None."""
+        if not self.enabled:
+            return None
+
+        path = self.path(key)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        now = time.time()
+        if now - stat.st_mtime > self.ttl:
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+
+        try:
+            df = pd.read_parquet(path)
+        except Exception as e:
+            print(f"[WARN] Dropping unreadable cache entry {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+
+        os.utime(path, (now, stat.st_mtime))
+        self.hits += 1
+        return df
+
+    def put(self, key, df):
+        if not self.enabled:
+            return
+
+        self.folder.mkdir(parents=True, exist_ok=True)
+        path = self.path(key)
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+
+        try:
+            df.to_parquet(tmp, index=False)
+        except Exception as e:
+            # Some result types cannot be stored as Parquet; skip caching them.
+            print(f"[WARN] Query result not cached: {e}")
+            tmp.unlink(missing_ok=True)
+            return
+
+        os.replace(tmp, path)
+
+        with self.lock:
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        for path in self.folder.glob("*.parquet"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        for path in self.folder.glob("*.parquet"):
+            path.unlink(missing_ok=True)
+
+    def stats(self):
+        files = list(self.folder.glob("*.parquet")) if self.folder.exists() else []
+        return {
+            "entries": len(files),
+            "bytes": sum(f.stat().st_size for f in files),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def report(self):
+        s = self.stats()
+        print(
+            f"[CACHE] queries: {s['hits']} hits, {s['misses']} misses, "
+            f"{s['entries']} entries ({s['bytes'] / 1024 / 1024:.1f} MB)"
+        )
+
+
+QUERY_CACHE = QueryResultCache()
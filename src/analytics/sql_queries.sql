@@ -1,17 +1,30 @@
--- TOP_GENRES_BY_COUNT:
-SELECT 
+-- Query registry for src/analytics/helpers.py.
+-- Each query starts with a marker line:  -- name: NAME(param TYPE = default, ...)
+-- Names must be unique. Parameters are bound as BigQuery query parameters
+-- (@param) and must be declared in the marker; NULL means "no filter".
+-- Any other "--" line is an ordinary SQL comment.
+-- POPULARITY_BY_GENRE, POPULARITY_TREND, CATALOG_MATURITY and GENRE_STABILITY
+-- are also answered from the Postgres materialized views (backend="postgres",
+-- see create_schema.VIEW_QUERIES); keep their result columns in step.
+
+-- name: TOP_GENRES_BY_COUNT(min_year INT64 = NULL, max_year INT64 = NULL)
+SELECT
     g.genre_id AS genre_id,
     g.name AS genre_name,
     COUNT(mg.movie_id) AS movie_count
 FROM `{{PROJECT}}.{{DATASET}}.movie_genres` mg
 JOIN `{{PROJECT}}.{{DATASET}}.genres` g
     ON mg.genre_id = g.genre_id
+JOIN `{{PROJECT}}.{{DATASET}}.movies` m
+    ON mg.movie_id = m.movie_id
+WHERE (@min_year IS NULL OR EXTRACT(YEAR FROM m.release_date) >= @min_year)
+  AND (@max_year IS NULL OR EXTRACT(YEAR FROM m.release_date) <= @max_year)
 GROUP BY genre_id, genre_name
 ORDER BY movie_count DESC;
 
 
--- POPULARITY_BY_GENRE:
-SELECT 
+-- name: POPULARITY_BY_GENRE(min_year INT64 = NULL, max_year INT64 = NULL)
+SELECT
     g.name AS genre,
     AVG(m.popularity) AS avg_popularity
 FROM `{{PROJECT}}.{{DATASET}}.movies` m
@@ -19,21 +32,33 @@ JOIN `{{PROJECT}}.{{DATASET}}.movie_genres` mg
     ON m.movie_id = mg.movie_id
 JOIN `{{PROJECT}}.{{DATASET}}.genres` g
     ON mg.genre_id = g.genre_id
+WHERE (@min_year IS NULL OR EXTRACT(YEAR FROM m.release_date) >= @min_year)
+  AND (@max_year IS NULL OR EXTRACT(YEAR FROM m.release_date) <= @max_year)
 GROUP BY genre
 ORDER BY avg_popularity DESC;
 
 
--- POPULARITY_TREND:
+-- name: POPULARITY_TREND(min_year INT64 = NULL, max_year INT64 = NULL, genre STRING = NULL)
 SELECT
     EXTRACT(YEAR FROM m.release_date) AS year,
     AVG(m.popularity) AS avg_popularity
 FROM `{{PROJECT}}.{{DATASET}}.movies` m
 WHERE m.release_date IS NOT NULL
+  AND (@min_year IS NULL OR EXTRACT(YEAR FROM m.release_date) >= @min_year)
+  AND (@max_year IS NULL OR EXTRACT(YEAR FROM m.release_date) <= @max_year)
+  -- genre filter: only movies tagged with that genre name
+  AND (@genre IS NULL OR m.movie_id IN (
+        SELECT mg.movie_id
+        FROM `{{PROJECT}}.{{DATASET}}.movie_genres` mg
+        JOIN `{{PROJECT}}.{{DATASET}}.genres` g
+            ON mg.genre_id = g.genre_id
+        WHERE g.name = @genre
+  ))
 GROUP BY year
 ORDER BY year;
 
 
--- ENGAGEMENT_SCORE:
+-- name: ENGAGEMENT_SCORE(limit INT64 = 50, min_year INT64 = NULL, max_year INT64 = NULL)
 SELECT
     movie_id,
     title,
@@ -41,22 +66,26 @@ SELECT
     popularity,
     vote_count * popularity AS engagement_score
 FROM `{{PROJECT}}.{{DATASET}}.movies`
+WHERE (@min_year IS NULL OR EXTRACT(YEAR FROM release_date) >= @min_year)
+  AND (@max_year IS NULL OR EXTRACT(YEAR FROM release_date) <= @max_year)
 ORDER BY engagement_score DESC
-LIMIT 50;
+LIMIT @limit;
 
 
--- CATALOG_MATURITY:
+-- name: CATALOG_MATURITY(min_year INT64 = NULL, max_year INT64 = NULL)
 SELECT
     EXTRACT(YEAR FROM release_date) AS year,
     COUNT(*) AS total_movies
 FROM `{{PROJECT}}.{{DATASET}}.movies`
 WHERE release_date IS NOT NULL
+  AND (@min_year IS NULL OR EXTRACT(YEAR FROM release_date) >= @min_year)
+  AND (@max_year IS NULL OR EXTRACT(YEAR FROM release_date) <= @max_year)
 GROUP BY year
 ORDER BY year;
 
 
--- GENRE_STABILITY:
-SELECT 
+-- name: GENRE_STABILITY(min_year INT64 = NULL, max_year INT64 = NULL)
+SELECT
     g.name AS genre,
     STDDEV(m.popularity) AS popularity_variance
 FROM `{{PROJECT}}.{{DATASET}}.movies` m
@@ -64,5 +93,54 @@ JOIN `{{PROJECT}}.{{DATASET}}.movie_genres` mg
     ON m.movie_id = mg.movie_id
 JOIN `{{PROJECT}}.{{DATASET}}.genres` g
     ON mg.genre_id = g.genre_id
+WHERE (@min_year IS NULL OR EXTRACT(YEAR FROM m.release_date) >= @min_year)
+  AND (@max_year IS NULL OR EXTRACT(YEAR FROM m.release_date) <= @max_year)
 GROUP BY genre
 ORDER BY popularity_variance ASC;
+
+
+-- name: METRICS_ROLLUP(min_year INT64 = NULL, max_year INT64 = NULL)
+-- One scan of movies (+ genres) for every genre- and year-level KPI, used by
+-- product_metrics.compute_all_metrics(). grain = 'genre' rows carry
+-- genre_id/genre, grain = 'year' rows carry year.
+WITH base AS (
+    SELECT
+        movie_id,
+        popularity,
+        EXTRACT(YEAR FROM release_date) AS year
+    FROM `{{PROJECT}}.{{DATASET}}.movies`
+    WHERE (@min_year IS NULL OR EXTRACT(YEAR FROM release_date) >= @min_year)
+      AND (@max_year IS NULL OR EXTRACT(YEAR FROM release_date) <= @max_year)
+),
+genre_stats AS (
+    SELECT
+        'genre' AS grain,
+        g.genre_id AS genre_id,
+        g.name AS genre,
+        CAST(NULL AS INT64) AS year,
+        COUNT(*) AS movie_count,
+        AVG(b.popularity) AS avg_popularity,
+        STDDEV(b.popularity) AS popularity_stddev
+    FROM base b
+    JOIN `{{PROJECT}}.{{DATASET}}.movie_genres` mg
+        ON b.movie_id = mg.movie_id
+    JOIN `{{PROJECT}}.{{DATASET}}.genres` g
+        ON mg.genre_id = g.genre_id
+    GROUP BY g.genre_id, g.name
+),
+year_stats AS (
+    SELECT
+        'year' AS grain,
+        CAST(NULL AS INT64) AS genre_id,
+        CAST(NULL AS STRING) AS genre,
+        year,
+        COUNT(*) AS movie_count,
+        AVG(popularity) AS avg_popularity,
+        STDDEV(popularity) AS popularity_stddev
+    FROM base
+    WHERE year IS NOT NULL
+    GROUP BY year
+)
+SELECT * FROM genre_stats
+UNION ALL
+SELECT * FROM year_stats;
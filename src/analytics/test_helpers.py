@@ -0,0 +1,91 @@
+from datetime import date
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from src.analytics import helpers
+
+SQL = """-- Registry header comment.
+
+-- name: TOP(limit INT64 = 10)
+SELECT name FROM t LIMIT @limit;
+
+-- name: SINCE(since DATE, genre STRING = NULL)
+-- an ordinary comment
+SELECT name FROM t WHERE d >= @since AND (@genre IS NULL OR g = @genre);
+"""
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(helpers, "_QUERIES", helpers.parse_queries(SQL))
+    return helpers._QUERIES
+
+
+def test_markers_split_the_file(registry):
+    assert list(registry) == ["TOP", "SINCE"]
+    assert registry["TOP"].sql == "SELECT name FROM t LIMIT @limit"
+    assert registry["SINCE"].sql.startswith("-- an ordinary comment\nSELECT")
+    assert [(p.name, p.type, p.default, p.required) for p in registry["SINCE"].params] == [
+        ("since", "DATE", None, True), ("genre", "STRING", None, False),
+    ]
+
+
+@pytest.mark.parametrize("text, error", [
+    (SQL + "\n-- name: TOP\nSELECT 1;", "declared twice"),
+    ("-- name: top-genres\nSELECT 1;", "Invalid query marker"),
+    ("-- name: TOP(n INT64 = 1)\nSELECT @n, @m;", "undeclared parameter.*: m"),
+    ("-- name: TOP(n INTEGER)\nSELECT @n;", "Invalid query parameter"),
+])
+def test_invalid_registry_fails_to_parse(text, error):
+    with pytest.raises(ValueError, match=error):
+        helpers.parse_queries(text)
+
+
+def test_shipped_registry_parses():
+    queries = helpers.parse_queries(helpers.SQL_FILE.read_text(encoding="utf-8"))
+    assert "METRICS_ROLLUP" in queries and all(q.sql for q in queries.values())
+
+
+def test_unknown_query(registry):
+    with pytest.raises(ValueError, match="'MISSING' not found"):
+        helpers.run_query("MISSING", backend="local")
+
+
+def test_binding(registry):
+    assert helpers.bind_params("TOP", {}) == {"limit": ("INT64", 10)}
+    assert helpers.bind_params("TOP", {"limit": "5"}) == {"limit": ("INT64", 5)}
+    assert helpers.bind_params("SINCE", {"since": "2020-01-02"})["since"] == ("DATE", date(2020, 1, 2))
+
+    with pytest.raises(ValueError, match="requires parameter 'since'"):
+        helpers.bind_params("SINCE", {"genre": "Drama"})
+    with pytest.raises(ValueError, match="'limit' of query 'TOP' must be INT64, got 'ten'"):
+        helpers.bind_params("TOP", {"limit": "ten"})
+    with pytest.raises(ValueError, match="'since' of query 'SINCE' must be DATE"):
+        helpers.bind_params("SINCE", {"since": "yesterday"})
+    with pytest.raises(ValueError, match="has no parameter.*: top"):
+        helpers.bind_params("TOP", {"top": 3})
+
+
+def test_bigquery_params_are_bound_once(registry, monkeypatch):
+    jobs = []
+
+    class Client:
+        def query(self, sql, job_config):
+            jobs.append(job_config.query_parameters)
+            rows = SimpleNamespace(to_dataframe=lambda bqstorage_client: pd.DataFrame({"name": ["a"]}))
+            return SimpleNamespace(result=lambda: rows, total_bytes_processed=0, total_bytes_billed=0)
+
+    bind = helpers.bind_params
+    calls = []
+    monkeypatch.setattr(helpers, "bind_params", lambda name, params: calls.append(name) or bind(name, params))
+    monkeypatch.setattr(helpers, "get_client", Client)
+    monkeypatch.setattr(helpers, "get_read_client", lambda: None)
+    monkeypatch.setattr(helpers, "PROJECT", "p")
+    monkeypatch.setattr(helpers, "DATASET", "d")
+
+    helpers.run_query("TOP", use_cache=False, backend="bigquery", limit=3)
+
+    assert calls == ["TOP"]
+    assert [(p.name, p.type_, p.value) for p in jobs[0]] == [("limit", "INT64", 3)]
@@ -0,0 +1,176 @@
+import shutil
+
+import pandas as pd
+import pytest
+
+from src.analytics import helpers
+from src.analytics.local_backend import (
+    LocalBackend, check_parity, comparable, group_by_ordinals, referenced_tables, to_sqlite,
+)
+from src.etl.schemas import clean_path, read_clean_frame
+
+
+@pytest.fixture
+def backend(synthetic_clean, monkeypatch):
+    backend = LocalBackend(synthetic_clean)
+    monkeypatch.setattr(helpers, "LOCAL_BACKEND", backend)
+    return backend
+
+
+@pytest.fixture(scope="module")
+def frames(synthetic_clean):
+    movies = read_clean_frame("movies", synthetic_clean)
+    movies["year"] = pd.to_datetime(movies["release_date"]).dt.year.astype("Int64")
+    genres = read_clean_frame("genres", synthetic_clean).rename(columns={"name": "genre"})
+    tagged = read_clean_frame("movie_genres", synthetic_clean).merge(genres, on="genre_id")
+    return movies, tagged, tagged.merge(movies, on="movie_id")
+
+
+def assert_same(local, expected):
+    pd.testing.assert_frame_equal(comparable(local), comparable(expected), rtol=1e-9)
+
+
+def test_top_genres(backend, frames):
+    _, tagged, _ = frames
+    expected = (tagged.groupby(["genre_id", "genre"], as_index=False).size()
+                .rename(columns={"genre": "genre_name", "size": "movie_count"}))
+
+    assert_same(helpers.run_query("TOP_GENRES_BY_COUNT", backend="local"), expected)
+
+
+def test_popularity_by_genre_with_year_filter(backend, frames):
+    _, _, joined = frames
+    recent = joined[joined["year"] >= 2000]
+    expected = recent.groupby("genre", as_index=False)["popularity"].mean().rename(columns={"popularity": "avg_popularity"})
+
+    assert_same(helpers.run_query("POPULARITY_BY_GENRE", backend="local", min_year=2000), expected)
+
+
+def test_popularity_trend_for_one_genre(backend, frames):
+    movies, tagged, _ = frames
+    drama = movies[movies["movie_id"].isin(tagged.loc[tagged["genre"] == "Drama", "movie_id"]) & movies["year"].notna()]
+    expected = drama.groupby("year", as_index=False)["popularity"].mean().rename(columns={"popularity": "avg_popularity"})
+
+    assert_same(helpers.run_query("POPULARITY_TREND", backend="local", genre="Drama"), expected)
+
+
+def test_engagement_score(backend, frames):
+    movies, _, _ = frames
+    expected = movies.assign(engagement_score=movies["vote_count"] * movies["popularity"])
+    expected = expected.nlargest(10, "engagement_score")[["movie_id", "title", "vote_count", "popularity", "engagement_score"]]
+
+    assert_same(helpers.run_query("ENGAGEMENT_SCORE", backend="local", limit=10), expected)
+
+
+def test_catalog_maturity_and_genre_stability(backend, frames):
+    movies, _, joined = frames
+    maturity = movies.dropna(subset=["year"]).groupby("year", as_index=False).size().rename(columns={"size": "total_movies"})
+    stability = (joined.groupby("genre", as_index=False)["popularity"].std()
+                 .rename(columns={"popularity": "popularity_variance"}))
+
+    assert_same(helpers.run_query("CATALOG_MATURITY", backend="local"), maturity)
+    assert_same(helpers.run_query("GENRE_STABILITY", backend="local"), stability)
+
+
+def test_loads_only_referenced_tables(backend):
+    sql = to_sqlite(helpers.get_query("CATALOG_MATURITY").sql)
+    assert referenced_tables(sql) == ["movies"]
+
+    helpers.run_query("CATALOG_MATURITY", backend="local")
+    assert set(backend.signatures) == {"movies"}
+
+    helpers.run_query("TOP_GENRES_BY_COUNT", backend="local")
+    assert set(backend.signatures) == {"movies", "movie_genres", "genres"}
+
+
+def test_clean_layer_without_people(synthetic_clean, tmp_path, monkeypatch):
+    # A clean folder written before the people / departments / jobs tables existed.
+    old = tmp_path / "clean"
+    shutil.copytree(synthetic_clean, old)
+    clean_path("people", old).unlink()
+    monkeypatch.setattr(helpers, "LOCAL_BACKEND", LocalBackend(old))
+
+    for name in helpers.get_queries():
+        helpers.run_query(name, backend="local")
+
+
+def test_changed_table_is_reloaded(synthetic_clean, tmp_path, monkeypatch):
+    folder = tmp_path / "clean"
+    shutil.copytree(synthetic_clean, folder)
+    backend = LocalBackend(folder)
+    monkeypatch.setattr(helpers, "LOCAL_BACKEND", backend)
+
+    before = helpers.run_query("TOP_GENRES_BY_COUNT", backend="local")
+    genres = read_clean_frame("genres", folder)
+    genres["name"] = genres["name"].str.upper()
+    genres.to_parquet(clean_path("genres", folder), index=False)
+
+    after = helpers.run_query("TOP_GENRES_BY_COUNT", backend="local")
+    assert sorted(after["genre_name"]) == sorted(before["genre_name"].str.upper())
+
+
+def test_group_by_aliases_in_every_select():
+    sql = """-- leading comment: SELECT a AS b ... GROUP BY b
+WITH t AS (
+    SELECT g.id AS id, COUNT(*) AS n FROM g GROUP BY id
+)
+SELECT x.id AS id, 'a, b (' AS label FROM t x GROUP BY id, label
+UNION ALL
+SELECT y.id AS id, EXTRACT(YEAR FROM y.d) AS label FROM t y GROUP BY id, label ORDER BY id"""
+
+    rewritten = group_by_ordinals(sql)
+    assert rewritten.count("GROUP BY 1") == 3
+    assert "GROUP BY 1\n)" in rewritten
+    assert "GROUP BY 1, 2\nUNION ALL" in rewritten
+    assert "GROUP BY 1, 2 ORDER BY id" in rewritten
+    assert rewritten.startswith("-- leading comment: SELECT a AS b ... GROUP BY b\n")
+
+
+def reference_results(frames):
+    """
+    What BigQuery returns for every registry query (default parameters) on
+    the synthetic catalog, computed with pandas.
+    """
+    movies, tagged, joined = frames
+    dated = movies.dropna(subset=["year"])
+
+    by_genre = joined.groupby(["genre_id", "genre"], as_index=False).agg(
+        movie_count=("movie_id", "size"), avg_popularity=("popularity", "mean"),
+        popularity_stddev=("popularity", "std"),
+    )
+    by_year = dated.groupby("year", as_index=False).agg(
+        movie_count=("movie_id", "size"), avg_popularity=("popularity", "mean"),
+        popularity_stddev=("popularity", "std"),
+    )
+    engagement = movies.assign(engagement_score=movies["vote_count"] * movies["popularity"])
+
+    return {
+        "TOP_GENRES_BY_COUNT": by_genre.rename(columns={"genre": "genre_name"})[["genre_id", "genre_name", "movie_count"]],
+        "POPULARITY_BY_GENRE": by_genre[["genre", "avg_popularity"]],
+        "POPULARITY_TREND": by_year[["year", "avg_popularity"]],
+        "ENGAGEMENT_SCORE": engagement.nlargest(50, "engagement_score")[
+            ["movie_id", "title", "vote_count", "popularity", "engagement_score"]],
+        "CATALOG_MATURITY": by_year[["year", "movie_count"]].rename(columns={"movie_count": "total_movies"}),
+        "GENRE_STABILITY": by_genre[["genre", "popularity_stddev"]]
+            .rename(columns={"popularity_stddev": "popularity_variance"}),
+        "METRICS_ROLLUP": pd.concat([
+            by_genre.assign(grain="genre", year=None),
+            by_year.assign(grain="year", genre_id=None, genre=None),
+        ])[["grain", "genre_id", "genre", "year", "movie_count", "avg_popularity", "popularity_stddev"]]
+            .astype({"genre_id": "Int64", "year": "Int64"}),
+    }
+
+
+def test_check_parity_on_every_query(backend, frames, monkeypatch):
+    recorded = reference_results(frames)
+    assert set(recorded) == set(helpers.get_queries())
+
+    run_query = helpers.run_query
+
+    def run_on(name, use_cache=True, backend=None, **params):
+        if backend == "bigquery":
+            return recorded[name]
+        return run_query(name, use_cache=use_cache, backend=backend, **params)
+
+    monkeypatch.setattr(helpers, "run_query", run_on)
+    check_parity()
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+from src.analytics import helpers, product_metrics
+from src.analytics.local_backend import LocalBackend, comparable
+
+YEARS = [(None, None), (1990, None), (None, 1985), (2000, 2010)]
+
+
+@pytest.fixture
+def backend(synthetic_clean, monkeypatch):
+    monkeypatch.setattr(helpers, "LOCAL_BACKEND", LocalBackend(synthetic_clean))
+
+
+def individual_metrics(min_year, max_year, top_limit=None, engagement_limit=None):
+    """Every KPI from its own registry query, as the dashboards ran them before the rollup."""
+    years = {"min_year": min_year, "max_year": max_year, "backend": "local"}
+    return {
+        "top_genres": product_metrics.top_genres(top_limit, **years),
+        "popularity_by_genre": product_metrics.popularity_by_genre(**years),
+        "popularity_trend": product_metrics.popularity_trend(**years),
+        "catalog_maturity": product_metrics.catalog_maturity(**years),
+        "genre_stability": product_metrics.genre_stability(**years),
+        "engagement_score": product_metrics.engagement_score(engagement_limit, **years),
+    }
+
+
+def assert_same_metrics(metrics, expected):
+    assert set(metrics) == set(expected)
+    for name, df in expected.items():
+        assert list(metrics[name].columns) == list(df.columns), name
+        pd.testing.assert_frame_equal(comparable(metrics[name]), comparable(df), rtol=1e-9, obj=name)
+
+
+@pytest.mark.parametrize("min_year, max_year", YEARS)
+def test_compute_all_metrics_matches_the_individual_queries(backend, min_year, max_year):
+    metrics = product_metrics.compute_all_metrics(min_year, max_year, backend="local")
+    assert_same_metrics(metrics, individual_metrics(min_year, max_year))
+
+
+@pytest.mark.parametrize("min_year, max_year", YEARS)
+def test_cube_metrics_match_the_individual_queries(backend, synthetic_clean, min_year, max_year):
+    metrics = product_metrics.cube_metrics(min_year, max_year, folder=synthetic_clean)
+    expected = individual_metrics(min_year, max_year)
+    del expected["engagement_score"]
+    assert_same_metrics(metrics, expected)
+
+
+def test_limits_keep_the_first_rows(backend):
+    metrics = product_metrics.compute_all_metrics(top_limit=3, engagement_limit=5, backend="local")
+    assert_same_metrics(metrics, individual_metrics(None, None, top_limit=3, engagement_limit=5))
+    assert len(metrics["top_genres"]) == 3 and len(metrics["engagement_score"]) == 5
@@ -0,0 +1,132 @@
+import os
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from google.api_core.exceptions import Forbidden, NotFound
+
+from src.analytics import helpers
+from src.analytics.query_cache import QueryResultCache, result_key
+from src.etl.publish import mark_published, read_published
+
+
+def frame(rows):
+    return pd.DataFrame({"value": range(rows)})
+
+
+def age(path, seconds):
+    """Move a cache file's last use and write back by `seconds`."""
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_entries_expire_after_the_ttl(tmp_path):
+    cache = QueryResultCache(tmp_path, ttl=60, max_bytes=10 ** 9, enabled=True)
+    cache.put("fresh", frame(3))
+    cache.put("stale", frame(3))
+    age(cache.path("stale"), 120)
+
+    pd.testing.assert_frame_equal(cache.get("fresh"), frame(3))
+    assert cache.get("stale") is None
+    assert not cache.path("stale").exists()
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = QueryResultCache(tmp_path, ttl=3600, max_bytes=10 ** 9, enabled=True)
+    cache.put("a", frame(10))
+    cache.put("b", frame(10))
+    age(cache.path("a"), 30)
+    age(cache.path("b"), 20)
+
+    # Reading "a" makes "b" the least recently used entry.
+    assert cache.get("a") is not None
+    cache.max_bytes = cache.path("a").stat().st_size * 2 + 1
+    cache.put("c", frame(10))
+
+    assert sorted(p.stem for p in tmp_path.glob("*.parquet")) == ["a", "c"]
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = QueryResultCache(tmp_path, enabled=False)
+    cache.put("a", frame(1))
+    assert cache.get("a") is None and not list(tmp_path.iterdir())
+
+
+def test_key_covers_sql_params_and_data_version():
+    params = {"limit": ("INT64", 10)}
+    key = result_key("SELECT 1", params, ["run", []])
+
+    assert key == result_key("SELECT 1", dict(params), ["run", []])
+    assert key != result_key("SELECT 2", params, ["run", []])
+    assert key != result_key("SELECT 1", {"limit": ("INT64", 11)}, ["run", []])
+    assert key != result_key("SELECT 1", params, ["next run", []])
+
+
+@pytest.fixture
+def bigquery(tmp_path, monkeypatch):
+    """run_query wired to a fake BigQuery client, a tmp cache and a tmp publish folder."""
+    queries = []
+
+    class Client:
+        def query(self, sql, job_config):
+            queries.append(sql)
+            rows = SimpleNamespace(to_dataframe=lambda bqstorage_client: frame(2))
+            return SimpleNamespace(result=lambda: rows, total_bytes_processed=0, total_bytes_billed=0)
+
+    published = tmp_path / "processed"
+    monkeypatch.setattr(helpers, "QUERY_CACHE", QueryResultCache(tmp_path / "cache", enabled=True))
+    monkeypatch.setattr(helpers, "read_published", lambda target: read_published(target, published))
+    monkeypatch.setattr(helpers, "tables_modified", lambda: ["2024-01-01T00:00:00"])
+    monkeypatch.setattr(helpers, "get_client", Client)
+    monkeypatch.setattr(helpers, "get_read_client", lambda: None)
+    monkeypatch.setattr(helpers, "PROJECT", "p")
+    monkeypatch.setattr(helpers, "DATASET", "d")
+    return queries, published
+
+
+def test_new_publish_invalidates_cached_results(bigquery):
+    queries, published = bigquery
+
+    helpers.run_query("CATALOG_MATURITY", backend="bigquery")
+    helpers.run_query("CATALOG_MATURITY", backend="bigquery")
+    assert len(queries) == 1
+
+    mark_published("bigquery", ["movies"], published)
+    helpers.run_query("CATALOG_MATURITY", backend="bigquery")
+    helpers.run_query("CATALOG_MATURITY", backend="bigquery")
+    assert len(queries) == 2
+
+    # Another target's publish does not touch BigQuery results.
+    mark_published("postgres", ["movies"], published)
+    helpers.run_query("CATALOG_MATURITY", backend="bigquery")
+    assert len(queries) == 2
+
+
+def test_disabled_cache_skips_the_data_version(bigquery, monkeypatch):
+    queries, _ = bigquery
+    helpers.QUERY_CACHE.enabled = False
+    monkeypatch.setattr(helpers, "data_version", lambda: pytest.fail("data_version computed with the cache off"))
+
+    helpers.run_query("CATALOG_MATURITY", backend="bigquery")
+    helpers.run_query("CATALOG_MATURITY", backend="bigquery")
+    assert len(queries) == 2
+
+
+def test_only_missing_tables_count_as_unloaded(monkeypatch):
+    class Client:
+        def __init__(self, error):
+            self.error = error
+
+        def get_table(self, table_id):
+            raise self.error(table_id)
+
+    monkeypatch.setattr(helpers, "_VERSION", (None, 0.0))
+    monkeypatch.setattr(helpers, "get_client", lambda: Client(NotFound))
+    assert set(helpers.tables_modified()) == {None}
+
+    monkeypatch.setattr(helpers, "_VERSION", (None, 0.0))
+    monkeypatch.setattr(helpers, "get_client", lambda: Client(Forbidden))
+    with pytest.raises(Forbidden):
+        helpers.tables_modified()
@@ -0,0 +1,329 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import statistics
+import subprocess
+import multiprocessing
+from queue import Empty
+from datetime import datetime, timezone
+from pathlib import Path
+
+from src.etl.storage import ndjson_path
+from .synthetic import BENCH_DIR, SIZES, generate_dataset, parse_size
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+RESULTS_DIR = BENCH_DIR / "results"
+SUITES = ["extract", "transform", "load", "metrics"]
+
+# Movies fetched from the stub per extract run (every size; HTTP is the
+# bottleneck, not the catalog size) and the stub / client request rates.
+EXTRACT_MOVIES = 2_000
+STUB_RATE = 500
+CLIENT_RATE = 450
+
+# Metric computations timed per run (after one warm-up); the median is kept.
+METRIC_REPEATS = 5
+
+# A case this much slower than in the baseline run is reported as a regression.
+REGRESSION_THRESHOLD = 0.10
+
+
+def bench_folder(n_movies, seed):
+    return BENCH_DIR / f"{n_movies}-seed{seed}"
+
+
+def folder_bytes(folder):
+    return sum(f.stat().st_size for f in Path(folder).rglob("*") if f.is_file())
+
+
+# ============================================================
+# CASES (each runs in a fresh process, see run_isolated)
+# ============================================================
+
+def case_extract(n_movies, seed, settings):
+    """Fetch details + credits for EXTRACT_MOVIES movies from the stub server into an NDJSON store."""
+    from src.bench.stub_server import start_stub
+    from src.etl import utils_api, extract_tmdb
+
+    process, base_url = start_stub(n_movies, seed, rate=settings["stub_rate"])
+    try:
+        utils_api.BASE_URL = base_url
+        utils_api.CACHE.enabled = False
+        utils_api.LIMITER = utils_api.TokenBucket(settings["client_rate"])
+
+        out = bench_folder(n_movies, seed) / "extract"
+        shutil.rmtree(out, ignore_errors=True)
+        out.mkdir(parents=True)
+        extract_tmdb.PROCESSED_DIR = out
+        extract_tmdb.CHECKPOINT_PATH = out / "extract.checkpoint.json"
+
+        ids = list(range(1, min(settings["extract_movies"], n_movies) + 1))
+        start = time.perf_counter()
+        extract_tmdb.extract_movie_details(ids, settings["extract_workers"])
+        seconds = time.perf_counter() - start
+
+        stats = utils_api.STATS.snapshot()
+        return {"seconds": seconds, "rows": len(ids), "requests": stats["requests"], "throttled": stats["throttled"],
+                "bytes_out": folder_bytes(out)}
+    finally:
+        process.terminate()
+
+
+def case_transform(n_movies, seed, settings):
+    """Raw NDJSON -> typed clean layer (run_transform) for the whole synthetic catalog."""
+    from src.etl.transform_tmdb import run_transform
+    from src.etl.instrumentation import METRICS
+
+    raw = bench_folder(n_movies, seed) / "raw"
+    clean = bench_folder(n_movies, seed) / "clean"
+    shutil.rmtree(clean, ignore_errors=True)
+
+    start = time.perf_counter()
+    run_transform(
+        details_paths=[ndjson_path(raw, "details")],
+        credits_paths=[ndjson_path(raw, "credits")],
+        genres_path=raw / "genres.json",
+        folder=clean,
+        workers=settings["transform_workers"],
+    )
+    seconds = time.perf_counter() - start
+
+    stages = {s.name: s for s in METRICS.stages}
+    tables = {name: s.rows_out for name, s in stages.items() if name.startswith("transform.")}
+    return {"seconds": seconds, "rows": n_movies, "rows_out": sum(tables.values()),
+            "bytes_in": folder_bytes(raw), "bytes_out": folder_bytes(clean)}
+
+
+def case_load(n_movies, seed, settings):
+    """
+    COPY the clean layer into Postgres (load_tmdb.load_all) when a database
+    URL is given; otherwise load it into the SQLite local backend as a
+    stand-in.
+    """
+    clean = bench_folder(n_movies, seed) / "clean"
+
+    if settings["database_url"]:
+        os.environ["DATABASE_URL"] = settings["database_url"]
+        from src.etl.load_tmdb import load_all
+
+        start = time.perf_counter()
+        results = load_all(folder=clean)
+        return {"seconds": time.perf_counter() - start, "rows": sum(rows for rows, _ in results.values()),
+                "target": "postgres"}
+
+    from src.analytics.local_backend import LocalBackend
+    from src.etl.schemas import SCHEMAS
+
+    start = time.perf_counter()
+    conn = LocalBackend(clean).connection()
+    seconds = time.perf_counter() - start
+    rows = sum(conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] for table in SCHEMAS)
+    return {"seconds": seconds, "rows": rows, "target": "sqlite"}
+
+
+def case_metrics(n_movies, seed, settings):
+    """Every dashboard KPI: compute_all_metrics on the local backend, and from the aggregate cube."""
+    from src.analytics import helpers
+    from src.analytics.local_backend import LocalBackend
+    from src.analytics.product_metrics import compute_all_metrics, cube_metrics
+
+    clean = bench_folder(n_movies, seed) / "clean"
+    helpers.LOCAL_BACKEND = LocalBackend(clean)
+
+    def median_seconds(func):
+        func()
+        timings = []
+        for _ in range(settings["metric_repeats"]):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
+
+    sql = median_seconds(lambda: compute_all_metrics(backend="local"))
+    cube = median_seconds(lambda: cube_metrics(folder=clean))
+    return {"seconds": sql, "rows": n_movies, "cube_seconds": cube}
+
+
+CASES = {
+    "extract": case_extract,
+    "transform": case_transform,
+    "load": case_load,
+    "metrics": case_metrics,
+}
+
+
+# ============================================================
+# RUNNER
+# ============================================================
+
+def _child(queue, suite, n_movies, seed, settings):
+    from src.etl.instrumentation import peak_rss
+
+    try:
+        result = CASES[suite](n_movies, seed, settings)
+        result["peak_rss_bytes"], result["children_peak_rss_bytes"] = peak_rss()
+        queue.put(result)
+    except BaseException as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+        raise
+
+
+def run_isolated(suite, n_movies, seed, settings):
+    """Run one case in a fresh interpreter, so peak RSS and caches belong to that case alone."""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_child, args=(queue, suite, n_movies, seed, settings))
+    process.start()
+
+    while True:
+        try:
+            result = queue.get(timeout=1)
+            break
+        except Empty:
+            if not process.is_alive():  # killed (e.g. out of memory) before reporting
+                result = {"error": f"benchmark process exited with code {process.exitcode}"}
+                break
+
+    process.join()
+    return result
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True)
+        return commit.stdout.strip(), bool(dirty.stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def latest_result(folder=RESULTS_DIR):
+    runs = sorted(Path(folder).glob("bench-*.json"))
+    return runs[-1] if runs else None
+
+
+def case_key(result):
+    # Postgres and SQLite loads are different cases.
+    return result["suite"], result["movies"], result.get("target")
+
+
+def compare(results, baseline_path):
+    """Print each case's time against the baseline run; returns the regressed cases."""
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))
+    before = {case_key(r): r for r in baseline["results"] if "seconds" in r}
+    regressions = []
+
+    print(f"\n=== COMPARED WITH {Path(baseline_path).name} (commit {baseline.get('commit')}) ===")
+    for r in results:
+        old = before.get(case_key(r))
+        if old is None or "seconds" not in r:
+            continue
+
+        change = r["seconds"] / old["seconds"] - 1
+        tag = "[WARN]" if change > REGRESSION_THRESHOLD else "[OK]"
+        print(f"{tag} {r['suite']:<10}{r['movies']:>10,} movies  {old['seconds']:8.2f}s -> {r['seconds']:8.2f}s "
+              f"({change:+.0%})")
+        if change > REGRESSION_THRESHOLD:
+            regressions.append(r)
+
+    return regressions
+
+
+def run_benchmarks(sizes, suites=SUITES, seed=42, settings=None, output=RESULTS_DIR, baseline=None):
+    """
+    Run every suite at every size and write bench-<timestamp>.json to
+    `output`. Returns the path of the results file.
+    """
+    settings = {
+        "extract_movies": EXTRACT_MOVIES,
+        "extract_workers": 8,
+        "stub_rate": STUB_RATE,
+        "client_rate": CLIENT_RATE,
+        "transform_workers": 1,
+        "metric_repeats": METRIC_REPEATS,
+        "database_url": None,
+        **(settings or {}),
+    }
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    baseline = baseline or latest_result(output)
+
+    commit, dirty = git_commit()
+    started = datetime.now(timezone.utc)
+    results = []
+
+    for n_movies in sizes:
+        generate_dataset(n_movies, seed)
+
+        for suite in suites:
+            print(f"\n=== BENCHMARK {suite} @ {n_movies:,} movies ===")
+            result = {"suite": suite, "movies": n_movies, **run_isolated(suite, n_movies, seed, settings)}
+            if "seconds" in result:
+                result["rows_per_sec"] = result["rows"] / result["seconds"] if result["seconds"] else None
+                print(f"[OK] {suite} @ {n_movies:,}: {result['seconds']:.2f}s ({result['rows_per_sec']:,.0f} rows/s, "
+                      f"peak RSS {result['peak_rss_bytes'] / 2**20:,.0f} MB)")
+            else:
+                print(f"[ERROR] {suite} @ {n_movies:,}: {result['error']}")
+            results.append(result)
+
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "started_at": started.isoformat(),
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "seed": seed,
+        "settings": {k: v for k, v in settings.items() if k != "database_url"},
+        "results": results,
+    }
+
+    path = output / f"bench-{started:%Y%m%dT%H%M%SZ}-{commit or 'nogit'}.json"
+    path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\n[SAVED] {path}")
+
+    if baseline:
+        compare(results, baseline)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", nargs="+", default=["1k", "100k"], help=f"Catalog sizes ({', '.join(SIZES)} or numbers)")
+    parser.add_argument("--suites", nargs="+", choices=SUITES, default=SUITES)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--extract-movies", type=int, default=EXTRACT_MOVIES, help="Movies fetched from the stub per size")
+    parser.add_argument("--extract-workers", type=int, default=8)
+    parser.add_argument("--transform-workers", type=int, default=1)
+    parser.add_argument("--database-url", default=os.getenv("TMDB_BENCH_DATABASE_URL"),
+                        help="Postgres for the load suite; its tmdb schema is replaced (default: "
+                             "TMDB_BENCH_DATABASE_URL; SQLite stand-in if unset)")
+    parser.add_argument("--baseline", type=Path, help="Results file to compare with (default: the latest one)")
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR)
+    args = parser.parse_args()
+
+    settings = {
+        "extract_movies": args.extract_movies,
+        "extract_workers": args.extract_workers,
+        "transform_workers": args.transform_workers,
+        "database_url": args.database_url,
+    }
+    path = run_benchmarks([parse_size(s) for s in args.sizes], args.suites, args.seed, settings, args.output,
+                          args.baseline)
+
+    report = json.loads(path.read_text(encoding="utf-8"))
+    if any("error" in r for r in report["results"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
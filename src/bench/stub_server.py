@@ -0,0 +1,263 @@
+import re
+import gzip
+import json
+import math
+import time
+import random
+import argparse
+import threading
+import multiprocessing
+from datetime import date, datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+from src.etl.utils_api import TokenBucket
+from .synthetic import movie, genres_payload
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+# TMDB serves 20 list results per page and never more than 500 pages.
+PAGE_SIZE = 20
+MAX_PAGES = 500
+CHANGES_PAGE_SIZE = 100
+
+# Share of the catalog reported by /movie/changes per day.
+CHANGES_PER_DAY = 0.002
+
+# Each list endpoint walks the catalog with its own stride, so the lists
+# overlap only partly (like the real popular / top rated / upcoming lists).
+LISTS = {
+    "/movie/popular": 1,
+    "/movie/top_rated": 7,
+    "/movie/upcoming": 13,
+    "/movie/now_playing": 17,
+    "/trending/movie/day": 19,
+    "/trending/movie/week": 23,
+}
+
+NOT_FOUND = {"success": False, "status_code": 34, "status_message": "The resource you requested could not be found."}
+THROTTLED = {"success": False, "status_code": 25, "status_message": "Your request count is over the allowed limit."}
+
+
+# ============================================================
+# SYNTHETIC TMDB
+# ============================================================
+
+class StubTMDB:
+    """
+    Endpoint logic of a fake TMDB over a synthetic catalog of `n_movies`
+    (movie ids 1..n_movies, payloads from synthetic.movie). Stateless apart
+    from the rate limiter and request counters.
+    """
+
+    def __init__(self, n_movies, seed=42, rate=None, latency=0.0, error_rate=0.0):
+        self.n_movies = n_movies
+        self.seed = seed
+        self.limiter = TokenBucket(rate) if rate else None
+        self.latency = latency
+        self.error_rate = error_rate
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "throttled": 0, "errors": 0, "not_found": 0}
+        self.exports = {}
+
+    def count(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+    def throttled(self):
+        """True if this request is over the rate limit."""
+        return self.limiter is not None and not self.limiter.try_acquire()
+
+    def list_page(self, path, page):
+        stride = LISTS[path]
+        total_pages = min(MAX_PAGES, math.ceil(self.n_movies / PAGE_SIZE))
+        results = []
+
+        if 1 <= page <= total_pages:
+            for i in range((page - 1) * PAGE_SIZE, min(page * PAGE_SIZE, self.n_movies)):
+                details, _ = movie(i * stride % self.n_movies + 1, self.n_movies, self.seed)
+                results.append({
+                    "adult": False,
+                    "genre_ids": [g["id"] for g in details["genres"]],
+                    "id": details["id"],
+                    "original_language": details["original_language"],
+                    "original_title": details["original_title"],
+                    "overview": details["overview"],
+                    "popularity": details["popularity"],
+                    "release_date": details["release_date"],
+                    "title": details["title"],
+                    "vote_average": details["vote_average"],
+                    "vote_count": details["vote_count"],
+                })
+
+        return {"page": page, "results": results, "total_pages": total_pages, "total_results": self.n_movies}
+
+    def changed_ids(self, start, end):
+        """Movies 'changed' between two dates: a deterministic sample per day."""
+        per_day = max(1, int(self.n_movies * CHANGES_PER_DAY))
+        ids = set()
+        for ordinal in range(start.toordinal(), end.toordinal() + 1):
+            rng = random.Random(self.seed * 7919 + ordinal)
+            ids.update(rng.randint(1, self.n_movies) for _ in range(per_day))
+        return sorted(ids)
+
+    def changes_page(self, query, page):
+        end = date.fromisoformat(query.get("end_date", date.today().isoformat()))
+        start = date.fromisoformat(query.get("start_date", end.isoformat()))
+        ids = self.changed_ids(start, end)
+        total_pages = max(1, math.ceil(len(ids) / CHANGES_PAGE_SIZE))
+        page_ids = ids[(page - 1) * CHANGES_PAGE_SIZE:page * CHANGES_PAGE_SIZE]
+        return {
+            "results": [{"id": movie_id, "adult": False} for movie_id in page_ids],
+            "page": page,
+            "total_pages": total_pages,
+            "total_results": len(ids),
+        }
+
+    def export(self, name):
+        """Gzipped daily id export (catalog_ingest), built once per file name."""
+        with self.lock:
+            if name not in self.exports:
+                rng = random.Random(self.seed)
+                lines = (
+                    json.dumps({"adult": False, "id": i, "original_title": f"Movie {i}",
+                                "popularity": round(rng.lognormvariate(0.5, 1.3), 3), "video": False})
+                    for i in range(1, self.n_movies + 1)
+                )
+                self.exports[name] = gzip.compress("\n".join(lines).encode("utf-8") + b"\n", compresslevel=1)
+            return self.exports[name]
+
+    def handle(self, path, query):
+        """(status, payload) for a GET request. Payload is a dict, or bytes for exports."""
+        if path == "/__stats":
+            with self.lock:
+                return 200, dict(self.counts)
+
+        self.count("requests")
+
+        if self.throttled():
+            self.count("throttled")
+            return 429, THROTTLED
+        if self.latency:
+            time.sleep(random.expovariate(1 / self.latency))
+        if self.error_rate and random.random() < self.error_rate:
+            self.count("errors")
+            return 503, {"success": False, "status_code": 11, "status_message": "Internal error (stub)."}
+
+        page = int(query.get("page", 1))
+
+        if path in LISTS:
+            return 200, self.list_page(path, page)
+        if path == "/genre/movie/list":
+            return 200, genres_payload()
+        if path == "/movie/changes":
+            return 200, self.changes_page(query, page)
+        if path.startswith("/p/exports/movie_ids_"):
+            return 200, self.export(path.rsplit("/", 1)[1])
+
+        match = re.fullmatch(r"/movie/(\d+)(/credits)?", path)
+        if match:
+            movie_id = int(match.group(1))
+            if not 1 <= movie_id <= self.n_movies:
+                self.count("not_found")
+                return 404, NOT_FOUND
+
+            details, credits = movie(movie_id, self.n_movies, self.seed)
+            if match.group(2):
+                return 200, credits
+            if "credits" in query.get("append_to_response", "").split(","):
+                details["credits"] = {"cast": credits["cast"], "crew": credits["crew"]}
+            return 200, details
+
+        self.count("not_found")
+        return 404, NOT_FOUND
+
+
+# ============================================================
+# HTTP SERVER
+# ============================================================
+
+def make_handler(tmdb, prefix):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            path = url.path[len(prefix):] if url.path.startswith(prefix) else url.path
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+            status, payload = tmdb.handle(path, query)
+
+            if isinstance(payload, bytes):
+                body, content_type = payload, "application/gzip"
+            else:
+                body, content_type = json.dumps(payload, separators=(",", ":")).encode("utf-8"), "application/json"
+
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            if status == 429:
+                self.send_header("Retry-After", "1")
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def make_server(n_movies, seed=42, rate=None, latency=0.0, error_rate=0.0, host="127.0.0.1", port=0, prefix="/3"):
+    """ThreadingHTTPServer for the stub; TMDB_BASE_URL should point at http://host:port/3."""
+    tmdb = StubTMDB(n_movies, seed, rate, latency, error_rate)
+    server = ThreadingHTTPServer((host, port), make_handler(tmdb, prefix))
+    server.daemon_threads = True
+    return server
+
+
+def _serve(ready, n_movies, seed, rate, latency, error_rate):
+    server = make_server(n_movies, seed, rate, latency, error_rate)
+    ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_stub(n_movies, seed=42, rate=None, latency=0.0, error_rate=0.0):
+    """
+    Run the stub in a child process (so it does not compete with the
+    client for the GIL). Returns (process, base_url); terminate the
+    process when done.
+    """
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(ready, n_movies, seed, rate, latency, error_rate),
+                                      daemon=True)
+    process.start()
+    port = ready.get(timeout=30)
+    return process, f"http://127.0.0.1:{port}/3"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=100_000, help="Size of the synthetic catalog")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=float, default=50, help="Requests/sec before answering 429 (0 = unlimited)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean added latency per request, in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    args = parser.parse_args()
+
+    server = make_server(args.movies, args.seed, args.rate or None, args.latency, args.error_rate, port=args.port)
+    host, port = server.server_address
+    print(f"[OK] Stub TMDB serving {args.movies:,} movies on http://{host}:{port}/3 "
+          f"(rate {args.rate or 'unlimited'}/s, started {datetime.now():%H:%M:%S})")
+    print(f"     export TMDB_BASE_URL=http://{host}:{port}/3 TMDB_EXPORT_URL=http://{host}:{port}/p/exports")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
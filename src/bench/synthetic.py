@@ -0,0 +1,304 @@
+import json
+import math
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from src.etl.storage import NDJSONWriter, ndjson_path, read_checkpoint, write_checkpoint
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+BENCH_DIR = BASE_DIR / "data" / "bench"
+
+# Bumped whenever the generated payloads change, so cached datasets are rebuilt.
+GENERATOR_VERSION = 1
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+# Movies generated per worker task.
+GENERATE_CHUNK = 10_000
+
+# Distinct people per movie in the catalog (TMDB has roughly 3-4 people per movie).
+PEOPLE_PER_MOVIE = 3.5
+
+# Flattens the head of the people distribution: the busiest person gets
+# about 0.02% of all credits instead of several percent.
+PERSON_HEAD = 1_000
+
+# Cast / crew sizes are log-normal: most movies have a handful of credits,
+# a few blockbusters have hundreds.
+CAST_MEDIAN, CAST_SIGMA, CAST_MAX = 6, 0.9, 250
+CREW_MEDIAN, CREW_SIGMA, CREW_MAX = 5, 1.2, 600
+
+GENRES = [
+    (28, "Action"), (12, "Adventure"), (16, "Animation"), (35, "Comedy"), (80, "Crime"),
+    (99, "Documentary"), (18, "Drama"), (10751, "Family"), (14, "Fantasy"), (36, "History"),
+    (27, "Horror"), (10402, "Music"), (9648, "Mystery"), (10749, "Romance"), (878, "Science Fiction"),
+    (10770, "TV Movie"), (53, "Thriller"), (10752, "War"), (37, "Western"),
+]
+# Relative frequency of each genre above (drama and comedy dominate the catalog).
+GENRE_WEIGHTS = [8, 4, 4, 14, 5, 9, 20, 4, 3, 2, 7, 3, 3, 7, 3, 3, 8, 1, 1]
+
+DEPARTMENTS = {
+    "Directing": ["Director", "Assistant Director", "First Assistant Director", "Script Supervisor"],
+    "Writing": ["Screenplay", "Writer", "Novel", "Story", "Characters"],
+    "Production": ["Producer", "Executive Producer", "Casting", "Line Producer", "Co-Producer"],
+    "Camera": ["Director of Photography", "Camera Operator", "Still Photographer", "Steadicam Operator"],
+    "Sound": ["Original Music Composer", "Sound Designer", "Sound Re-Recording Mixer", "Boom Operator"],
+    "Editing": ["Editor", "First Assistant Editor", "Colorist"],
+    "Art": ["Production Design", "Art Direction", "Set Decoration", "Property Master"],
+    "Costume & Make-Up": ["Costume Design", "Makeup Artist", "Hairstylist"],
+    "Visual Effects": ["Visual Effects Supervisor", "VFX Artist", "Animation Supervisor"],
+    "Crew": ["Stunts", "Stunt Coordinator", "Driver", "Craft Service"],
+    "Lighting": ["Gaffer", "Electrician", "Best Boy Electric"],
+}
+DEPARTMENT_WEIGHTS = [2, 3, 6, 4, 4, 2, 4, 4, 3, 4, 3]
+
+LANGUAGES = ["en"] * 12 + ["fr", "fr", "es", "es", "ja", "ja", "de", "it", "ko", "hi", "zh", "ru", "pt", "sv"]
+
+FIRST_NAMES = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+    "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Carlos", "Yuki",
+    "Hiroshi", "Marie", "Pierre", "Ana", "Luis", "Sofia", "Ahmed", "Priya", "Wei", "Olga", "Lars", "Ingrid",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Wilson", "Anderson", "Taylor", "Moore", "Martin", "Lee", "Tanaka", "Dubois",
+    "Rossi", "Müller", "Kowalski", "Ivanov", "Kim", "Singh", "Chen", "Silva", "Nielsen", "Cohen", "Okafor",
+]
+ROLES = ["Himself", "Herself", "Narrator", "Doctor", "Nurse", "Police Officer", "Bartender", "Reporter",
+         "Mother", "Father", "Waitress", "Soldier", "Student", "Detective", "(voice)", "Guard", "Driver"]
+
+WORDS = ("a young woman discovers secret family past town war love journey must save world before "
+         "old friends reunite mysterious stranger arrives city night truth dangerous").split()
+
+
+# ============================================================
+# PEOPLE
+# ============================================================
+
+def people_pool(n_movies):
+    return max(1_000, int(n_movies * PEOPLE_PER_MOVIE))
+
+
+def pick_person(rng, pool):
+    """
+    Person id drawn with P(id) ~ 1 / (id + PERSON_HEAD): a head of prolific
+    actors and crew appears in many movies, most people in one or two.
+    """
+    u = rng.random()
+    x = PERSON_HEAD ** (1 - u) * (pool + PERSON_HEAD) ** u
+    return min(pool, max(1, int(x) - PERSON_HEAD + 1))
+
+
+def person_name(person_id):
+    """Stable name for a person id, so the same person is spelled the same on every credit."""
+    first = FIRST_NAMES[person_id % len(FIRST_NAMES)]
+    last = LAST_NAMES[(person_id // len(FIRST_NAMES)) % len(LAST_NAMES)]
+    return f"{first} {last}" if person_id < len(FIRST_NAMES) * len(LAST_NAMES) else f"{first} {last} {person_id}"
+
+
+def person_gender(person_id):
+    return (0, 1, 2, 2, 1)[person_id % 5]
+
+
+# ============================================================
+# MOVIES
+# ============================================================
+
+def fan_out(rng, median, sigma, maximum, boost):
+    if rng.random() < 0.05:
+        return 0
+    return min(maximum, int(rng.lognormvariate(math.log(median), sigma) * boost))
+
+
+def release_date(rng):
+    if rng.random() < 0.03:
+        return ""
+    year = max(1900, 2025 - int(rng.expovariate(1 / 18)))
+    return f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+
+
+def movie(movie_id, n_movies, seed=42):
+    """
+    (details, credits) of one synthetic movie, shaped like TMDB's
+    /movie/{id}?append_to_response=credits split into its two parts.
+    Deterministic per (movie_id, seed): the stub server and the file
+    generator return identical payloads.
+    """
+    rng = random.Random(seed * 1_000_003 + movie_id)
+    pool = people_pool(n_movies)
+
+    popularity = round(rng.lognormvariate(0.5, 1.3), 3)
+    boost = 1 + math.log1p(popularity) / 3
+    genres = {GENRES[i] for i in rng.choices(range(len(GENRES)), GENRE_WEIGHTS, k=rng.choice([0, 1, 1, 2, 2, 3, 4]))}
+    title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title()
+
+    details = {
+        "adult": False,
+        "backdrop_path": f"/b{movie_id}.jpg",
+        "budget": rng.choice([0, 0, 0, rng.randint(10 ** 5, 3 * 10 ** 8)]),
+        "genres": [{"id": genre_id, "name": name} for genre_id, name in sorted(genres)],
+        "homepage": "",
+        "id": movie_id,
+        "imdb_id": f"tt{movie_id + 1_000_000:07d}",
+        "original_language": rng.choice(LANGUAGES),
+        "original_title": title,
+        "overview": " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 60))).capitalize(),
+        "popularity": popularity,
+        "poster_path": f"/p{movie_id}.jpg",
+        "production_companies": [
+            {"id": rng.randint(1, 200_000), "name": f"Studio {rng.randint(1, 5000)}", "origin_country": "US"}
+            for _ in range(rng.randint(0, 3))
+        ],
+        "release_date": release_date(rng),
+        "revenue": rng.choice([0, 0, 0, rng.randint(10 ** 5, 2 * 10 ** 9)]),
+        "runtime": rng.choice([0, rng.randint(60, 180), rng.randint(80, 130)]),
+        "status": "Released",
+        "tagline": "",
+        "title": title,
+        "video": False,
+        "vote_average": round(rng.uniform(0, 10), 3) if popularity > 0.5 else 0.0,
+        "vote_count": int(popularity ** 1.5 * rng.uniform(0, 40)),
+    }
+
+    cast = []
+    for order in range(fan_out(rng, CAST_MEDIAN, CAST_SIGMA, CAST_MAX, boost)):
+        person_id = pick_person(rng, pool)
+        cast.append({
+            "adult": False,
+            "gender": person_gender(person_id),
+            "id": person_id,
+            "known_for_department": "Acting",
+            "name": person_name(person_id),
+            "original_name": person_name(person_id),
+            "popularity": round(rng.lognormvariate(0, 1), 3),
+            "profile_path": f"/f{person_id}.jpg",
+            "cast_id": order + 1,
+            "character": rng.choice(ROLES) if rng.random() < 0.3 else person_name(pick_person(rng, pool)).split()[0],
+            "credit_id": f"{movie_id:08x}{order:04x}",
+            "order": order,
+        })
+
+    crew = []
+    n_crew = fan_out(rng, CREW_MEDIAN, CREW_SIGMA, CREW_MAX, boost)
+    for i in range(n_crew):
+        # Nearly every movie with a crew credits a director first.
+        department = "Directing" if i == 0 else rng.choices(list(DEPARTMENTS), DEPARTMENT_WEIGHTS)[0]
+        job = "Director" if i == 0 else rng.choice(DEPARTMENTS[department])
+        person_id = pick_person(rng, pool)
+        crew.append({
+            "adult": False,
+            "gender": person_gender(person_id),
+            "id": person_id,
+            "known_for_department": department,
+            "name": person_name(person_id),
+            "original_name": person_name(person_id),
+            "popularity": round(rng.lognormvariate(0, 1), 3),
+            "profile_path": None,
+            "credit_id": f"{movie_id:08x}c{i:04x}",
+            "department": department,
+            "job": job,
+        })
+
+    return details, {"id": movie_id, "cast": cast, "crew": crew}
+
+
+def synthetic_movies(n, seed=42):
+    """Yield (details, credits) for movie ids 1..n."""
+    for movie_id in range(1, n + 1):
+        yield movie(movie_id, n, seed)
+
+
+def genres_payload():
+    return {"genres": [{"id": genre_id, "name": name} for genre_id, name in GENRES]}
+
+
+# ============================================================
+# DATASET FILES
+# ============================================================
+
+def encode(record):
+    return json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def generate_chunk(first, last, n_movies, seed):
+    """Worker task: NDJSON bytes of details and credits for movie ids first..last-1."""
+    details, credits = [], []
+    for movie_id in range(first, last):
+        d, c = movie(movie_id, n_movies, seed)
+        details.append(encode(d))
+        credits.append(encode(c))
+    return b"".join(details), b"".join(credits), last - first
+
+
+def dataset_dir(n_movies, seed=42, folder=BENCH_DIR):
+    return Path(folder) / f"{n_movies}-seed{seed}" / "raw"
+
+
+def generate_dataset(n_movies, seed=42, folder=BENCH_DIR, workers=None, compression="none"):
+    """
+    Write details / credits NDJSON stores and genres.json for a synthetic
+    catalog of `n_movies`, generated in parallel chunks. An existing
+    dataset with the same size, seed and generator version is reused.
+    Returns the folder.
+    """
+    out = dataset_dir(n_movies, seed, folder)
+    manifest_path = out / "dataset.json"
+    manifest = {"movies": n_movies, "seed": seed, "generator": GENERATOR_VERSION, "compression": compression}
+
+    if read_checkpoint(manifest_path) == manifest:
+        print(f"[OK] Reusing synthetic dataset {out}")
+        return out
+
+    out.mkdir(parents=True, exist_ok=True)
+    manifest_path.unlink(missing_ok=True)
+    paths = {name: ndjson_path(out, name, compression) for name in ("details", "credits")}
+    for path in paths.values():
+        path.unlink(missing_ok=True)
+
+    print(f"[RUN] Generating {n_movies:,} synthetic movies into {out}")
+    writers = {name: NDJSONWriter(path) for name, path in paths.items()}
+    bounds = [(first, min(first + GENERATE_CHUNK, n_movies + 1)) for first in range(1, n_movies + 1, GENERATE_CHUNK)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(generate_chunk, first, last, n_movies, seed) for first, last in bounds]
+        for future in futures:
+            details, credits, count = future.result()
+            writers["details"].write_encoded(details, count)
+            writers["credits"].write_encoded(credits, count)
+
+    for writer in writers.values():
+        writer.close()
+
+    (out / "genres.json").write_text(json.dumps(genres_payload(), indent=2), encoding="utf-8")
+    write_checkpoint(manifest_path, manifest)
+
+    for path in paths.values():
+        print(f"[SAVED] {path} ({path.stat().st_size / 1e6:,.0f} MB)")
+    return out
+
+
+def parse_size(value):
+    """'1k' / '100k' / '1m' or a plain number of movies."""
+    return SIZES.get(value.lower()) or int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", default="1k", help=f"Movies to generate ({', '.join(SIZES)} or a number)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, default=BENCH_DIR, help="Root folder for generated datasets")
+    parser.add_argument("--workers", type=int, default=None, help="Generator processes (default: one per core)")
+    parser.add_argument("--compression", choices=["none", "gzip", "zstd"], default="none")
+    args = parser.parse_args()
+
+    generate_dataset(parse_size(args.size), args.seed, args.output, args.workers, args.compression)
+
+
+if __name__ == "__main__":
+    main()
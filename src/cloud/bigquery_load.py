@@ -1,10 +1,18 @@
 import os
+import time
 import argparse
+import tempfile
+from google.api_core.exceptions import NotFound
 from google.cloud import bigquery
 from google.oauth2 import service_account
 from dotenv import load_dotenv
 from pathlib import Path
-import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.etl.schemas import SCHEMAS, PARTITION_COLUMN, clean_path
+from src.etl.publish import mark_published
+from src.etl.instrumentation import METRICS
 
 # Load environment variables
 load_dotenv()
@@ -16,13 +24,54 @@ BIGQUERY_DATASET = os.getenv("BIGQUERY_DATASET")
 BASE_PATH = Path(__file__).resolve().parents[2]
 CLEAN_PATH = BASE_PATH / "data" / "clean"
 
-TABLES = {
-    "movies": CLEAN_PATH / "movies.csv",
-    "genres": CLEAN_PATH / "genres.csv",
-    "movie_genres": CLEAN_PATH / "movie_genres.csv",
-    "cast": CLEAN_PATH / "cast.csv",
-    "crew": CLEAN_PATH / "crew.csv"
+TABLES = {table: clean_path(table, CLEAN_PATH) for table in SCHEMAS}
+
+# A table whose partitioning/clustering changed is loaded here first and
+# then swapped in, so the live table is never missing.
+STAGING_SUFFIX = "__staging"
+
+# Physical layout in BigQuery: movies is partitioned by release year and
+# every table the analytics joins on movie_id is clustered by it.
+TIME_PARTITIONING = {
+    "movies": bigquery.TimePartitioning(type_=bigquery.TimePartitioningType.YEAR, field="release_date"),
 }
+CLUSTERING = {
+    "movies": ["movie_id"],
+    "cast": ["movie_id"],
+    "crew": ["movie_id"],
+    "people": ["person_id"],
+}
+
+BQ_TYPES = {
+    pa.int8(): "INT64",
+    pa.int16(): "INT64",
+    pa.int32(): "INT64",
+    pa.int64(): "INT64",
+    pa.float64(): "FLOAT64",
+    pa.string(): "STRING",
+    pa.date32(): "DATE",
+}
+
+_CLIENT = None
+
+
+class BigQueryLoadError(Exception):
+    pass
+
+
+# ============================================
+# CLIENT
+# ============================================
+def get_client():
+    """Process-wide BigQuery client, built from the service account on first use."""
+    global _CLIENT
+
+    if _CLIENT is None:
+        credentials = service_account.Credentials.from_service_account_file(GCP_CREDENTIALS)
+        _CLIENT = bigquery.Client(credentials=credentials, project=GCP_PROJECT_ID)
+
+    return _CLIENT
+
 
 # ============================================
 # TEST CONNECTION
@@ -33,19 +82,11 @@ def test_connection():
     if not os.path.exists(GCP_CREDENTIALS):
         print(f"[ERROR] Credentials file not found: {GCP_CREDENTIALS}")
         return
-    
-    print("[OK] Credentials file found")
 
-    try:
-        credentials = service_account.Credentials.from_service_account_file(GCP_CREDENTIALS)
-        print("[OK] Credentials loaded successfully")
-    except Exception as e:
-        print("[ERROR] Failed to load credentials:")
-        print(e)
-        return
+    print("[OK] Credentials file found")
 
     try:
-        client = bigquery.Client(credentials=credentials, project=GCP_PROJECT_ID)
+        client = get_client()
         print("[OK] BigQuery client initialized")
     except Exception as e:
         print("[ERROR] Failed to initialize BigQuery client:")
@@ -71,8 +112,7 @@ def test_connection():
 def create_dataset_if_not_exists():
     print("\n=== CREATING BIGQUERY DATASET (IF NOT EXISTS) ===")
 
-    credentials = service_account.Credentials.from_service_account_file(GCP_CREDENTIALS)
-    client = bigquery.Client(credentials=credentials, project=GCP_PROJECT_ID)
+    client = get_client()
 
     dataset_ref = f"{GCP_PROJECT_ID}.{BIGQUERY_DATASET}"
     dataset = bigquery.Dataset(dataset_ref)
@@ -87,39 +127,163 @@ def create_dataset_if_not_exists():
 
 
 # ============================================
-# LOAD CLEAN CSVs INTO BIGQUERY
+# LOAD CLEAN PARQUET INTO BIGQUERY
 # ============================================
-def load_clean_data():
-    print("\n=== LOADING CLEAN DATA INTO BIGQUERY ===")
-
-    credentials = service_account.Credentials.from_service_account_file(GCP_CREDENTIALS)
-    client = bigquery.Client(credentials=credentials, project=GCP_PROJECT_ID)
-
-    for table_name, csv_path in TABLES.items():
-        print(f"\nUploading table '{table_name}'...")
-
-        if not csv_path.exists():
-            print(f"[ERROR] CSV not found: {csv_path}")
-            continue
-
-        df = pd.read_csv(csv_path)
-
-        table_id = f"{GCP_PROJECT_ID}.{BIGQUERY_DATASET}.{table_name}"
-
-        job_config = bigquery.LoadJobConfig(
-            write_disposition="WRITE_TRUNCATE",
-            autodetect=True,
-            source_format=bigquery.SourceFormat.CSV,
-            skip_leading_rows=1,
-        )
+def bigquery_schema(table_name):
+    """BigQuery schema matching the clean-layer Arrow schema (no autodetect)."""
+    fields = []
+    for field in SCHEMAS[table_name]:
+        arrow_type = field.type.value_type if pa.types.is_dictionary(field.type) else field.type
+        mode = "NULLABLE" if field.nullable else "REQUIRED"
+        fields.append(bigquery.SchemaField(field.name, BQ_TYPES[arrow_type], mode=mode))
+    return fields
+
+
+def load_job_config(table_name):
+    return bigquery.LoadJobConfig(
+        write_disposition="WRITE_TRUNCATE",
+        source_format=bigquery.SourceFormat.PARQUET,
+        schema=bigquery_schema(table_name),
+        time_partitioning=TIME_PARTITIONING.get(table_name),
+        clustering_fields=CLUSTERING.get(table_name),
+    )
+
+
+def layout_changed(client, table_id, table_name):
+    """
+    True if the table exists with another partitioning/clustering layout.
+    WRITE_TRUNCATE cannot change that layout, so such a table is rebuilt
+    through a staging table.
+    """
+    try:
+        table = client.get_table(table_id)
+    except NotFound:
+        return False
+
+    partitioning = TIME_PARTITIONING.get(table_name)
+    current = (
+        table.time_partitioning.field if table.time_partitioning else None,
+        table.time_partitioning.type_ if table.time_partitioning else None,
+        table.clustering_fields or None,
+    )
+    wanted = (
+        partitioning.field if partitioning else None,
+        partitioning.type_ if partitioning else None,
+        CLUSTERING.get(table_name),
+    )
+    return current != wanted
+
+
+def swap_in(client, staging_id, table_id):
+    """Atomically replace `table_id` (data and layout) with the staging table."""
+    client.query(f"CREATE OR REPLACE TABLE `{table_id}` COPY `{staging_id}`").result()
+    client.delete_table(staging_id, not_found_ok=True)
+
+
+def parquet_files(table_name, path):
+    """
+    Parquet files of a clean table: the file itself, or every part of a
+    partitioned dataset (movies/release_year=YYYY/part-N.parquet).
+    """
+    if not path.exists():
+        return []
+    if table_name not in PARTITION_COLUMN:
+        return [path]
+    return sorted(path.glob("*/*.parquet"))
+
+
+def concat_parquet(files, out_path):
+    """
+    Stream the parts of a partitioned table into one Parquet file, one row
+    group at a time, so the table loads in a single job without being
+    combined in memory.
+    """
+    schema = pq.ParquetFile(files[0]).schema_arrow
+    with pq.ParquetWriter(out_path, schema, compression="zstd") as writer:
+        for path in files:
+            parquet = pq.ParquetFile(path)
+            for i in range(parquet.num_row_groups):
+                writer.write_table(parquet.read_row_group(i))
+    return out_path
+
+
+def submit_load(client, files, table_id, table_name):
+    """
+    One WRITE_TRUNCATE job for the whole table, so it is replaced atomically.
+    The upload finishes before this returns; only the job runs on.
+    """
+    config = load_job_config(table_name)
+    if len(files) == 1:
+        with open(files[0], "rb") as f:
+            return client.load_table_from_file(f, table_id, job_config=config)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        combined = concat_parquet(files, Path(tmp) / f"{table_name}.parquet")
+        with open(combined, "rb") as f:
+            return client.load_table_from_file(f, table_id, job_config=config)
 
-        with open(csv_path, "rb") as f:
-            load_job = client.load_table_from_file(f, table_id, job_config=job_config)
 
-        load_job.result()
-        print(f"[OK] Table '{table_name}' uploaded successfully.")
+def load_clean_data():
+    """
+    Submit every table's load job up front, then wait for all of them.
+
+    Each table is replaced by a single job; the parts of a partitioned
+    table are uploaded as one file. A table whose layout changed is loaded
+    into a staging table and swapped in. Tables that loaded are published
+    even if others failed (their data changed); any failed or missing
+    table then raises BigQueryLoadError.
+    """
+    print("\n=== LOADING CLEAN DATA INTO BIGQUERY ===")
 
-    print("\n[SUCCESS] All clean tables uploaded to BigQuery!")
+    with METRICS.stage("load_bigquery") as record:
+        client = get_client()
+        start = time.perf_counter()
+        jobs = {}
+        staged = {}
+        missing = []
+
+        for table_name, path in TABLES.items():
+            files = parquet_files(table_name, path)
+            if not files:
+                print(f"[ERROR] Parquet not found: {path} (run transform_tmdb)")
+                missing.append(table_name)
+                continue
+
+            table_id = f"{GCP_PROJECT_ID}.{BIGQUERY_DATASET}.{table_name}"
+            destination = table_id
+            if layout_changed(client, table_id, table_name):
+                print(f"[WARN] Rebuilding '{table_name}' with its partitioning/clustering layout")
+                destination = staged[table_name] = table_id + STAGING_SUFFIX
+                client.delete_table(destination, not_found_ok=True)
+
+            jobs[table_name] = submit_load(client, files, destination, table_name)
+            print(f"[OK] Submitted load job for '{table_name}' ({len(files)} file(s))")
+
+        failed = []
+        for table_name, job in jobs.items():
+            try:
+                job.result()
+                if table_name in staged:
+                    swap_in(client, staged[table_name], f"{GCP_PROJECT_ID}.{BIGQUERY_DATASET}.{table_name}")
+
+                print(f"[OK] Table '{table_name}' uploaded ({job.output_rows} rows).")
+                record.rows_out += job.output_rows or 0
+                METRICS.inc("tmdb_bigquery_load_bytes_total", job.input_file_bytes or 0, table=table_name)
+            except Exception as e:
+                print(f"[ERROR] Load of '{table_name}' failed: {e}")
+                failed.append(table_name)
+
+    # Even a partial load changed data, so cached query results must go.
+    loaded = [t for t in jobs if t not in failed]
+    if loaded:
+        mark_published("bigquery", loaded)
+
+    elapsed = time.perf_counter() - start
+    if failed or missing:
+        problems = [f"failed: {', '.join(failed)}" if failed else "", f"missing: {', '.join(missing)}" if missing else ""]
+        raise BigQueryLoadError(f"BigQuery load incomplete ({'; '.join(p for p in problems if p)})")
+
+    print(f"\n[SUCCESS] All clean tables uploaded to BigQuery in {elapsed:.1f}s!")
 
 
 # ============================================
@@ -129,7 +293,7 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--test", action="store_true", help="Run BigQuery connection test")
     parser.add_argument("--create-dataset", action="store_true", help="Create BigQuery dataset")
-    parser.add_argument("--load", action="store_true", help="Load clean CSVs into BigQuery")
+    parser.add_argument("--load", action="store_true", help="Load clean Parquet tables into BigQuery")
     args = parser.parse_args()
 
     if args.test:
@@ -142,6 +306,7 @@ def main():
 
     if args.load:
         load_clean_data()
+        METRICS.write_report("load_bigquery")
         return
 
     print("No action specified. Use --test, --create-dataset or --load")
@@ -0,0 +1,104 @@
+from types import SimpleNamespace
+
+import pyarrow.parquet as pq
+import pytest
+from google.api_core.exceptions import NotFound
+
+from src.cloud import bigquery_load
+from src.cloud.bigquery_load import BigQueryLoadError, load_clean_data
+from src.etl.schemas import SCHEMAS, clean_path
+
+
+class FakeJob:
+    def __init__(self, error=None, rows=1):
+        self.error = error
+        self.output_rows = rows
+        self.input_file_bytes = 1
+
+    def result(self):
+        if self.error:
+            raise self.error
+
+
+class FakeClient:
+    """
+    Records load jobs, queries and deletes. Tables in `failing` fail their
+    load jobs; tables in `layouts` already exist with that (old) layout.
+    """
+
+    def __init__(self, failing=(), layouts=None):
+        self.failing = set(failing)
+        self.layouts = layouts or {}
+        self.loads = []
+        self.queries = []
+        self.deleted = []
+
+    def get_table(self, table_id):
+        table = table_id.rsplit(".", 1)[1]
+        if table not in self.layouts:
+            raise NotFound(table_id)
+        return SimpleNamespace(time_partitioning=None, clustering_fields=self.layouts[table])
+
+    def load_table_from_file(self, f, table_id, job_config):
+        table = table_id.rsplit(".", 1)[1]
+        rows = pq.read_metadata(f).num_rows
+        self.loads.append((table, rows, job_config.write_disposition))
+        return FakeJob(RuntimeError("boom") if table in self.failing else None, rows)
+
+    def query(self, sql):
+        self.queries.append(sql)
+        return FakeJob()
+
+    def delete_table(self, table_id, not_found_ok=False):
+        self.deleted.append(table_id.rsplit(".", 1)[1])
+
+
+@pytest.fixture
+def published(monkeypatch):
+    calls = []
+    monkeypatch.setattr(bigquery_load, "mark_published", lambda target, tables: calls.append((target, sorted(tables))))
+    return calls
+
+
+def use(monkeypatch, client, folder):
+    monkeypatch.setattr(bigquery_load, "_CLIENT", client)
+    monkeypatch.setattr(bigquery_load, "TABLES", {table: clean_path(table, folder) for table in SCHEMAS})
+
+
+def test_partitioned_movies_load_in_one_replace(synthetic_clean, monkeypatch, published):
+    client = FakeClient()
+    use(monkeypatch, client, synthetic_clean)
+
+    load_clean_data()
+
+    parts = list(clean_path("movies", synthetic_clean).glob("*/*.parquet"))
+    movies = [(rows, disposition) for table, rows, disposition in client.loads if table == "movies"]
+    assert len(parts) > 1
+    assert movies == [(sum(pq.read_metadata(part).num_rows for part in parts), "WRITE_TRUNCATE")]
+    assert client.deleted == [] and client.queries == []
+    assert published == [("bigquery", sorted(SCHEMAS))]
+
+
+def test_layout_change_is_swapped_in_from_staging(synthetic_clean, monkeypatch, published):
+    client = FakeClient(layouts={"movies": None, "cast": ["movie_id"]})
+    use(monkeypatch, client, synthetic_clean)
+
+    load_clean_data()
+
+    assert [table for table, _, _ in client.loads if table.startswith("movies")] == ["movies__staging"]
+    assert "cast" in [table for table, _, _ in client.loads]
+    assert len(client.queries) == 1
+    assert client.queries[0].startswith("CREATE OR REPLACE TABLE") and "movies__staging" in client.queries[0]
+    # The live table is replaced by the swap, never deleted.
+    assert client.deleted == ["movies__staging", "movies__staging"]
+
+
+def test_failed_and_missing_tables_raise_after_publishing(synthetic_clean, tmp_path, monkeypatch, published):
+    client = FakeClient(failing={"crew"})
+    use(monkeypatch, client, synthetic_clean)
+    monkeypatch.setitem(bigquery_load.TABLES, "people", tmp_path / "people.parquet")
+
+    with pytest.raises(BigQueryLoadError, match="failed: crew; missing: people"):
+        load_clean_data()
+
+    assert published == [("bigquery", sorted(set(SCHEMAS) - {"crew", "people"}))]
@@ -1,19 +1,346 @@
+import re
+import hashlib
+import argparse
+
+import pyarrow as pa
 from sqlalchemy import create_engine, text
-from settings import DATABASE_URL
-import sys, os
 
-# Ajustar ruta cuando se ejecuta directamente
-CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
-ROOT_DIR = os.path.dirname(os.path.dirname(CURRENT_DIR))
-sys.path.append(ROOT_DIR)
+from src.config.settings import DATABASE_URL
+from src.etl.schemas import SCHEMAS
+
+# ============================================================
+# TABLE DEFINITIONS
+# ============================================================
+
+SCHEMA = "tmdb"
+TABLES = ["movies", "genres", "movie_genres", "people", "departments", "jobs", "cast", "crew"]
+
+# Postgres column types follow the clean-layer Arrow schemas.
+PG_TYPES = {
+    pa.int8(): "smallint",
+    pa.int16(): "smallint",
+    pa.int32(): "integer",
+    pa.int64(): "bigint",
+    pa.float64(): "double precision",
+    pa.string(): "text",
+    pa.date32(): "date",
+}
+
+PRIMARY_KEYS = {
+    "movies": ["movie_id"],
+    "genres": ["genre_id"],
+    "movie_genres": ["movie_id", "genre_id"],
+    "people": ["person_id"],
+    "departments": ["department_id"],
+    "jobs": ["job_id"],
+}
+
+# (constraint suffix, column, referenced table, referenced column). The ids
+# cast / crew take from people, departments and jobs are not enforced: those
+# tables are written by the same transform, and keys on the new columns
+# could not be added to a database still holding the old cast / crew.
+FOREIGN_KEYS = {
+    "movie_genres": [
+        ("movie_id_fkey", "movie_id", "movies", "movie_id"),
+        ("genre_id_fkey", "genre_id", "genres", "genre_id"),
+    ],
+    "cast": [("movie_id_fkey", "movie_id", "movies", "movie_id")],
+    "crew": [("movie_id_fkey", "movie_id", "movies", "movie_id")],
+}
+
+# (index suffix, indexed columns). movie_genres(movie_id, genre_id) is
+# covered by its primary key; the reverse index serves genre -> movies joins.
+TABLE_INDEXES = {
+    "movies": [("release_date_idx", "(release_date)")],
+    "movie_genres": [("genre_id_idx", "(genre_id, movie_id)")],
+    "cast": [("movie_person_idx", "(movie_id, person_id)"), ("person_id_idx", "(person_id)")],
+    "crew": [("movie_person_idx", "(movie_id, person_id)"), ("person_id_idx", "(person_id)")],
+}
+
+# ============================================================
+# MATERIALIZED VIEWS
+# ============================================================
+
+# Precomputed aggregates behind the analytics queries in sql_queries.sql,
+# keyed by query name: (view SELECT, unique key columns). They are kept at
+# year grain so the queries' year filters still apply. The unique index is
+# what allows REFRESH ... CONCURRENTLY, so dashboards keep reading during a
+# refresh.
+MATERIALIZED_VIEWS = {
+    "POPULARITY_BY_GENRE": (
+        f"""
+        SELECT g.genre_id, g.name AS genre, EXTRACT(YEAR FROM m.release_date)::integer AS year,
+               COUNT(*) AS movie_count, COUNT(m.popularity) AS popularity_count, SUM(m.popularity) AS popularity_sum
+        FROM {SCHEMA}.movies m
+        JOIN {SCHEMA}.movie_genres mg ON m.movie_id = mg.movie_id
+        JOIN {SCHEMA}.genres g ON mg.genre_id = g.genre_id
+        GROUP BY g.genre_id, g.name, 3
+        """,
+        ["genre_id", "year"],
+    ),
+    "POPULARITY_TREND": (
+        # genre IS NULL rows cover every movie; the others one genre each.
+        f"""
+        SELECT EXTRACT(YEAR FROM release_date)::integer AS year, NULL::text AS genre,
+               COUNT(popularity) AS popularity_count, SUM(popularity) AS popularity_sum
+        FROM {SCHEMA}.movies
+        WHERE release_date IS NOT NULL
+        GROUP BY 1
+        UNION ALL
+        SELECT EXTRACT(YEAR FROM m.release_date)::integer, g.name,
+               COUNT(m.popularity), SUM(m.popularity)
+        FROM {SCHEMA}.movies m
+        JOIN {SCHEMA}.movie_genres mg ON m.movie_id = mg.movie_id
+        JOIN {SCHEMA}.genres g ON mg.genre_id = g.genre_id
+        WHERE m.release_date IS NOT NULL
+        GROUP BY 1, g.name
+        """,
+        ["year", "genre"],
+    ),
+    "CATALOG_MATURITY": (
+        f"""
+        SELECT EXTRACT(YEAR FROM release_date)::integer AS year, COUNT(*) AS total_movies
+        FROM {SCHEMA}.movies
+        WHERE release_date IS NOT NULL
+        GROUP BY 1
+        """,
+        ["year"],
+    ),
+    "GENRE_STABILITY": (
+        f"""
+        SELECT g.genre_id, g.name AS genre, EXTRACT(YEAR FROM m.release_date)::integer AS year,
+               COUNT(m.popularity) AS popularity_count, SUM(m.popularity) AS popularity_sum,
+               SUM(m.popularity * m.popularity) AS popularity_sq_sum
+        FROM {SCHEMA}.movies m
+        JOIN {SCHEMA}.movie_genres mg ON m.movie_id = mg.movie_id
+        JOIN {SCHEMA}.genres g ON mg.genre_id = g.genre_id
+        GROUP BY g.genre_id, g.name, 3
+        """,
+        ["genre_id", "year"],
+    ),
+}
+
+YEAR_FILTER = "(:min_year IS NULL OR year >= :min_year) AND (:max_year IS NULL OR year <= :max_year)"
+
+# The registry queries answered from the views, with the same parameters
+# and result columns as their BigQuery versions (see postgres_backend.py).
+VIEW_QUERIES = {
+    "POPULARITY_BY_GENRE": f"""
+        SELECT genre, SUM(popularity_sum) / NULLIF(SUM(popularity_count), 0) AS avg_popularity
+        FROM {SCHEMA}.mv_popularity_by_genre
+        WHERE {YEAR_FILTER}
+        GROUP BY genre
+        ORDER BY avg_popularity DESC NULLS LAST
+    """,
+    "POPULARITY_TREND": f"""
+        SELECT year, SUM(popularity_sum) / NULLIF(SUM(popularity_count), 0) AS avg_popularity
+        FROM {SCHEMA}.mv_popularity_trend
+        WHERE genre IS NOT DISTINCT FROM :genre AND {YEAR_FILTER}
+        GROUP BY year
+        ORDER BY year
+    """,
+    "CATALOG_MATURITY": f"""
+        SELECT year, total_movies
+        FROM {SCHEMA}.mv_catalog_maturity
+        WHERE {YEAR_FILTER}
+        ORDER BY year
+    """,
+    # Sample standard deviation from the per-year sums, like BigQuery's STDDEV.
+    "GENRE_STABILITY": f"""
+        SELECT genre,
+               SQRT(GREATEST(SUM(popularity_sq_sum) - SUM(popularity_sum) ^ 2 / NULLIF(SUM(popularity_count), 0), 0)
+                    / NULLIF(SUM(popularity_count) - 1, 0)) AS popularity_variance
+        FROM {SCHEMA}.mv_genre_stability
+        WHERE {YEAR_FILTER}
+        GROUP BY genre
+        ORDER BY popularity_variance ASC NULLS FIRST
+    """,
+}
+
+# Tables the views read. Dropping them would drop the views too, so a full
+# load refills them in place instead of swapping them (see load_tmdb.swap_sql).
+VIEW_TABLES = sorted({
+    table for select, _ in MATERIALIZED_VIEWS.values() for table in re.findall(rf"{SCHEMA}\.(\w+)", select)
+})
+
+
+def view_name(query_name):
+    return f"mv_{query_name.lower()}"
+
+
+def qualified(name):
+    # Quoted: "cast" is a reserved word in Postgres.
+    return f'{SCHEMA}."{name}"'
+
+
+def pg_type(arrow_type):
+    if pa.types.is_dictionary(arrow_type):
+        return "text"
+    return PG_TYPES[arrow_type]
+
+
+def column_names(table_name):
+    return [field.name for field in SCHEMAS[table_name]]
+
+
+def create_table_sql(table_name, target=None, if_not_exists=False):
+    """CREATE TABLE for `table_name`, optionally under another name (e.g. a staging table)."""
+    columns = ",\n    ".join(
+        f'"{field.name}" {pg_type(field.type)}{"" if field.nullable else " NOT NULL"}'
+        for field in SCHEMAS[table_name]
+    )
+    exists = "IF NOT EXISTS " if if_not_exists else ""
+    return f"CREATE TABLE {exists}{qualified(target or table_name)} (\n    {columns}\n)"
+
+
+def primary_key_sql(table_name, target=None):
+    """Primary key for `table_name`, added to `target` (default: the table itself)."""
+    target = target or table_name
+    columns = ", ".join(PRIMARY_KEYS[table_name])
+    return f"ALTER TABLE {qualified(target)} ADD CONSTRAINT {target}_pkey PRIMARY KEY ({columns})"
+
+
+def index_sql(table_name, target=None):
+    target = target or table_name
+    return [
+        f"CREATE INDEX IF NOT EXISTS {target}_{suffix} ON {qualified(target)} {columns}"
+        for suffix, columns in TABLE_INDEXES.get(table_name, [])
+    ]
+
+
+def foreign_keys():
+    """(constraint name, ADD CONSTRAINT statement) for every foreign key."""
+    return [
+        (
+            f"{table_name}_{suffix}",
+            f"ALTER TABLE {qualified(table_name)} ADD CONSTRAINT {table_name}_{suffix} "
+            f"FOREIGN KEY ({column}) REFERENCES {qualified(ref_table)} ({ref_column})",
+        )
+        for table_name, keys in FOREIGN_KEYS.items()
+        for suffix, column, ref_table, ref_column in keys
+    ]
+
+
+def drop_foreign_keys_sql():
+    return [
+        f"ALTER TABLE IF EXISTS {qualified(table_name)} DROP CONSTRAINT IF EXISTS {table_name}_{suffix}"
+        for table_name, keys in FOREIGN_KEYS.items()
+        for suffix, *_ in keys
+    ]
+
+
+def view_signature(select):
+    """Short hash of a view's SELECT, stored as its comment to spot outdated views."""
+    return hashlib.sha1(" ".join(select.split()).encode()).hexdigest()[:12]
+
+
+def create_views_sql():
+    """CREATE statements for every materialized view (skipped if it already exists)."""
+    statements = []
+
+    for query_name, (select, key) in MATERIALIZED_VIEWS.items():
+        name = view_name(query_name)
+        statements.append(f"CREATE MATERIALIZED VIEW IF NOT EXISTS {qualified(name)} AS {select.strip()}")
+        statements.append(f"CREATE UNIQUE INDEX IF NOT EXISTS {name}_key ON {qualified(name)} ({', '.join(key)})")
+        statements.append(f"COMMENT ON MATERIALIZED VIEW {qualified(name)} IS '{view_signature(select)}'")
+
+    return statements
+
+
+# ============================================================
+# SCHEMA CREATION
+# ============================================================
+
+def existing_constraints(conn):
+    rows = conn.execute(text(
+        "SELECT conname FROM pg_constraint c JOIN pg_namespace n ON n.oid = c.connamespace "
+        "WHERE n.nspname = :schema"
+    ), {"schema": SCHEMA})
+    return {row[0] for row in rows}
+
+
+def outdated_views(conn):
+    """Existing materialized views whose SELECT changed since they were created."""
+    comments = dict(conn.execute(text(
+        "SELECT c.relname, obj_description(c.oid, 'pg_class') FROM pg_class c "
+        "JOIN pg_namespace n ON n.oid = c.relnamespace WHERE n.nspname = :schema AND c.relkind = 'm'"
+    ), {"schema": SCHEMA}).all())
+
+    return [
+        view_name(query_name)
+        for query_name, (select, _) in MATERIALIZED_VIEWS.items()
+        if view_name(query_name) in comments and comments[view_name(query_name)] != view_signature(select)
+    ]
+
+
+def create_schema(conn):
+    """
+    Create the tmdb schema, its typed tables with keys, indexes and
+    foreign keys, and the analytics materialized views. Idempotent: missing
+    objects are added, existing ones are left alone (views whose definition
+    changed are rebuilt).
+    """
+    conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA}"))
+
+    for table_name in TABLES:
+        conn.execute(text(create_table_sql(table_name, if_not_exists=True)))
+
+    constraints = existing_constraints(conn)
+
+    for table_name in TABLES:
+        if table_name in PRIMARY_KEYS and f"{table_name}_pkey" not in constraints:
+            conn.execute(text(primary_key_sql(table_name)))
+        for statement in index_sql(table_name):
+            conn.execute(text(statement))
+
+    for name, statement in foreign_keys():
+        if name not in constraints:
+            conn.execute(text(statement))
+
+    for name in outdated_views(conn):
+        print(f"[WARN] Rebuilding outdated materialized view {SCHEMA}.{name}")
+        conn.execute(text(f"DROP MATERIALIZED VIEW {qualified(name)}"))
+
+    for statement in create_views_sql():
+        conn.execute(text(statement))
+
+
+def refresh_views(conn):
+    """
+    Refresh every materialized view. Populated views are refreshed
+    CONCURRENTLY so readers are never blocked; an unpopulated one (WITH NO
+    DATA) needs a plain refresh first.
+    """
+    populated = dict(conn.execute(text(
+        "SELECT matviewname, ispopulated FROM pg_matviews WHERE schemaname = :schema"
+    ), {"schema": SCHEMA}).all())
+
+    for query_name in MATERIALIZED_VIEWS:
+        name = view_name(query_name)
+        concurrently = "CONCURRENTLY " if populated.get(name) else ""
+        conn.execute(text(f"REFRESH MATERIALIZED VIEW {concurrently}{qualified(name)}"))
+
+    print(f"[OK] Refreshed {len(MATERIALIZED_VIEWS)} materialized views")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--refresh", action="store_true", help="Refresh the materialized views")
+    args = parser.parse_args()
+
+    if not DATABASE_URL:
+        raise ValueError("DATABASE_URL no se pudo cargar desde settings.py")
+
+    engine = create_engine(DATABASE_URL)
 
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL no se pudo cargar desde settings.py")
+    with engine.begin() as conn:
+        create_schema(conn)
+    print(f"Schema '{SCHEMA}' creado y configurado correctamente.")
 
-engine = create_engine(DATABASE_URL)
+    if args.refresh:
+        with engine.begin() as conn:
+            refresh_views(conn)
 
-with engine.begin() as conn:
-    conn.execute(text("CREATE SCHEMA IF NOT EXISTS tmdb;"))
-    conn.execute(text("SET search_path TO tmdb;"))
 
-print("Schema 'tmdb' creado y configurado correctamente.")
+if __name__ == "__main__":
+    main()
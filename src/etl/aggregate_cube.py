@@ -0,0 +1,210 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from .schemas import CLEAN_DIR, parse_dates, iter_clean_batches
+
+# ============================================================
+# GENRE x YEAR AGGREGATE CUBE
+# ============================================================
+
+# One row per (genre_id, release year) with additive moments of popularity
+# and vote_count. Sums of cubes merge by addition, so chunks, parallel
+# parts and incremental runs combine without rereading the fact tables;
+# means and standard deviations are derived from the moments at query time.
+CUBE_TABLE = "genre_year_cube"
+
+# genre_id of the rows that count every movie once, whatever its genres
+# (per-year totals such as CATALOG_MATURITY). TMDB genre ids are positive.
+ALL_GENRES = -1
+
+CUBE_KEYS = ["genre_id", "year"]
+MOMENTS = {
+    "movie_count": "int64",
+    "popularity_n": "int64",
+    "popularity_sum": "float64",
+    "popularity_sumsq": "float64",
+    "vote_count_n": "int64",
+    "vote_count_sum": "int64",
+    "vote_count_sumsq": "int64",
+}
+
+CUBE_SCHEMA = pa.schema(
+    [pa.field("genre_id", pa.int32(), nullable=False), ("year", pa.int32())]
+    + [(name, pa.from_numpy_dtype(np.dtype(dtype))) for name, dtype in MOMENTS.items()]
+)
+
+
+def cube_path(folder=CLEAN_DIR):
+    return Path(folder) / f"{CUBE_TABLE}.parquet"
+
+
+def release_years(values):
+    """Release year of every value (date objects or YYYY-MM-DD strings) as Int64."""
+    column = pa.array(values, from_pandas=True)
+    if not pa.types.is_date(column.type):
+        column = parse_dates(column)
+    return pc.year(column).to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get).astype("Int64")
+
+
+# ============================================================
+# BUILD / MERGE
+# ============================================================
+
+def aggregate(frames):
+    """Sum moment rows per (genre_id, year); rows whose movie_count drops to 0 are removed."""
+    frames = [f for f in frames if f is not None and len(f)]
+    if not frames:
+        return empty_cube()
+
+    df = pd.concat(frames, ignore_index=True)
+    cube = df.groupby(CUBE_KEYS, dropna=False, sort=True)[list(MOMENTS)].sum().reset_index()
+    cube = cube[cube["movie_count"] != 0]
+    return cube.astype({"genre_id": "int64", "year": "Int64", **MOMENTS}).reset_index(drop=True)
+
+
+def empty_cube():
+    columns = {"genre_id": "int64", "year": "Int64", **MOMENTS}
+    return pd.DataFrame({name: pd.Series(dtype=dtype) for name, dtype in columns.items()})
+
+
+def build_cube(movies, movie_genres):
+    """
+    Cube of one batch of movies and their genre links (clean-table frames:
+    release_date as strings or dates). Movies without a release date get a
+    null year.
+    """
+    popularity = movies["popularity"].astype("float64")
+    votes = movies["vote_count"].astype("Int64")
+
+    per_movie = pd.DataFrame({
+        "movie_id": movies["movie_id"].astype("int64").to_numpy(),
+        "year": release_years(movies["release_date"]).to_numpy(),
+        "movie_count": 1,
+        "popularity_n": popularity.notna().astype("int64").to_numpy(),
+        "popularity_sum": popularity.fillna(0.0).to_numpy(),
+        "popularity_sumsq": (popularity ** 2).fillna(0.0).to_numpy(),
+        "vote_count_n": votes.notna().astype("int64").to_numpy(),
+        "vote_count_sum": votes.fillna(0).astype("int64").to_numpy(),
+        "vote_count_sumsq": (votes.fillna(0).astype("int64") ** 2).to_numpy(),
+    })
+
+    links = pd.DataFrame({
+        "movie_id": movie_genres["movie_id"].astype("int64").to_numpy(),
+        "genre_id": movie_genres["genre_id"].astype("int64").to_numpy(),
+    })
+    by_genre = links.merge(per_movie, on="movie_id", how="inner")
+
+    return aggregate([by_genre.drop(columns="movie_id"), per_movie.drop(columns="movie_id").assign(genre_id=ALL_GENRES)])
+
+
+def merge_cubes(cubes):
+    return aggregate(cubes)
+
+
+def negate(cube):
+    """Moments with the opposite sign, so merging them removes a cube's contribution."""
+    cube = cube.copy()
+    for name in MOMENTS:
+        cube[name] = -cube[name]
+    return cube
+
+
+def cube_for_movies(movie_ids, folder=CLEAN_DIR):
+    """Cube of the given movies as they currently are in the clean layer."""
+    changed = pc.field("movie_id").isin(list(movie_ids))
+    movies = [b.to_pandas() for b in iter_clean_batches("movies", folder, filter=changed)]
+    links = [b.to_pandas() for b in iter_clean_batches("movie_genres", folder, filter=changed)]
+    if not movies:
+        return empty_cube()
+
+    links = pd.concat(links) if links else pd.DataFrame({"movie_id": [], "genre_id": []})
+    return build_cube(pd.concat(movies, ignore_index=True), links)
+
+
+# ============================================================
+# READ / WRITE
+# ============================================================
+
+def write_cube(cube, folder=CLEAN_DIR):
+    path = cube_path(folder)
+    tmp = path.with_name(path.name + ".tmp")
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    pq.write_table(pa.Table.from_pandas(cube, schema=CUBE_SCHEMA, preserve_index=False), tmp, compression="zstd")
+    os.replace(tmp, path)
+    print(f"[SAVED] {path.name} ({len(cube)} rows)")
+
+
+def read_cube(folder=CLEAN_DIR):
+    """The cube as a DataFrame, or None if it was never built."""
+    path = cube_path(folder)
+    if not path.exists():
+        return None
+
+    df = pq.read_table(path).to_pandas()
+    return df.astype({"genre_id": "int64", "year": "Int64", **MOMENTS})
+
+
+# ============================================================
+# DERIVED METRICS
+# ============================================================
+
+def stats(n, total, sumsq):
+    """Mean and sample standard deviation (NaN below 2 values) from summed moments."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(n > 0, total / n, np.nan)
+        variance = np.where(n > 1, (sumsq - total * total / n) / (n - 1), np.nan)
+    return mean, np.sqrt(np.clip(variance, 0.0, None))
+
+
+def rollup(cube, genres, min_year=None, max_year=None):
+    """
+    Same rows and columns as the METRICS_ROLLUP query (sql_queries.sql),
+    computed from the cube: grain 'genre' rows per genre over the selected
+    years, grain 'year' rows over all movies. `genres` is the clean genres
+    table (genre_id, name).
+    """
+    genre_ids = cube["genre_id"].to_numpy()
+    years = cube["year"].to_numpy(dtype="float64", na_value=np.nan)
+    moments = cube[["movie_count", "popularity_n", "popularity_sum", "popularity_sumsq"]].to_numpy(dtype="float64")
+
+    keep = np.ones(len(cube), dtype=bool)
+    if min_year is not None:
+        keep &= years >= min_year
+    if max_year is not None:
+        keep &= years <= max_year
+
+    # Genre grain: sum the selected years of every genre that has a name.
+    names = dict(zip(genres["genre_id"].astype("int64"), genres["name"]))
+    selected = keep & (genre_ids != ALL_GENRES) & np.isin(genre_ids, list(names))
+    ids, inverse = np.unique(genre_ids[selected], return_inverse=True)
+    sums = np.zeros((len(ids), moments.shape[1]))
+    np.add.at(sums, inverse, moments[selected])
+
+    # Year grain: the ALL_GENRES rows are already one per year.
+    per_year = keep & (genre_ids == ALL_GENRES) & ~np.isnan(years)
+    year_sums = moments[per_year]
+
+    count = np.concatenate([sums[:, 0], year_sums[:, 0]])
+    mean, stddev = stats(
+        np.concatenate([sums[:, 1], year_sums[:, 1]]),
+        np.concatenate([sums[:, 2], year_sums[:, 2]]),
+        np.concatenate([sums[:, 3], year_sums[:, 3]]),
+    )
+
+    n_genres, n_years = len(ids), len(year_sums)
+    return pd.DataFrame({
+        "grain": ["genre"] * n_genres + ["year"] * n_years,
+        "genre_id": pd.array(list(ids) + [None] * n_years, dtype="Int64"),
+        "genre": [names[i] for i in ids] + [None] * n_years,
+        "year": pd.array([None] * n_genres + list(years[per_year]), dtype="Int64"),
+        "movie_count": count.astype("int64"),
+        "avg_popularity": mean,
+        "popularity_stddev": stddev,
+    })
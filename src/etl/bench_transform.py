@@ -0,0 +1,55 @@
+import time
+import argparse
+
+from src.bench.synthetic import synthetic_movies
+from .transform_tmdb import BUILDERS, REFERENCE_BUILDERS, check_parity, iter_chunks, CHUNK_SIZE
+
+
+def time_builders(builders, details_chunks, credits_chunks):
+    """Return {table: (rows, seconds)} for one builder set."""
+    results = {}
+    inputs = {"movies": details_chunks, "movie_genres": details_chunks, "cast": credits_chunks, "crew": credits_chunks}
+
+    for table, chunks in inputs.items():
+        rows = 0
+        start = time.perf_counter()
+        for chunk in chunks:
+            rows += len(builders[table](chunk))
+        results[table] = (rows, time.perf_counter() - start)
+
+    return results
+
+
+def benchmark(n_movies, chunk_size=CHUNK_SIZE):
+    print(f"\n=== TRANSFORM BENCHMARK: {n_movies:,} movies (chunk size {chunk_size}) ===")
+
+    pairs = list(synthetic_movies(n_movies))
+    details_chunks = list(iter_chunks((d for d, _ in pairs), chunk_size))
+    credits_chunks = list(iter_chunks((c for _, c in pairs), chunk_size))
+
+    check_parity(details_chunks[0], credits_chunks[0])
+
+    vectorized = time_builders(BUILDERS, details_chunks, credits_chunks)
+    reference = time_builders(REFERENCE_BUILDERS, details_chunks, credits_chunks)
+
+    print(f"{'table':<14}{'rows':>12}{'reference rows/s':>20}{'vectorized rows/s':>20}{'speedup':>10}")
+    for table, (rows, vec_seconds) in vectorized.items():
+        ref_seconds = reference[table][1]
+        print(
+            f"{table:<14}{rows:>12,}{rows / ref_seconds:>20,.0f}{rows / vec_seconds:>20,.0f}"
+            f"{ref_seconds / vec_seconds:>9.1f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000], help="Catalog sizes to benchmark")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        benchmark(n, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
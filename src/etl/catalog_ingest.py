@@ -0,0 +1,263 @@
+import os
+import gzip
+import json
+import argparse
+from datetime import date, datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from dotenv import load_dotenv
+
+from .utils_api import fetch_concurrent, STATS, report_rate, MAX_WORKERS
+from .extract_tmdb import fetch_movie
+from .storage import CheckpointedOutput, ndjson_path, read_checkpoint
+
+load_dotenv()
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+EXPORT_DIR = BASE_DIR / "data" / "raw" / "exports"
+CATALOG_DIR = BASE_DIR / "data" / "processed" / "catalog"
+
+# TMDB publishes a gzipped NDJSON file of every movie id once a day (~08:00 UTC).
+EXPORT_URL = os.getenv("TMDB_EXPORT_URL", "http://files.tmdb.org/p/exports")
+EXPORT_NAME = "movie_ids_{day:%m_%d_%Y}.json.gz"
+
+NUM_SHARDS = 8
+CHECKPOINT_EVERY = 500
+
+# Extra passes over a shard's failed ids after its last id.
+RETRY_ROUNDS = 2
+
+
+# ============================================================
+# DAILY ID EXPORT
+# ============================================================
+
+def download_export(day=None, folder=EXPORT_DIR):
+    """Download the daily id export for `day` (default: yesterday, UTC)."""
+    day = day or (datetime.now(timezone.utc).date() - timedelta(days=1))
+    name = EXPORT_NAME.format(day=day)
+    path = folder / name
+
+    if path.exists():
+        print(f"[OK] Export already downloaded: {path}")
+        return path
+
+    folder.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".part")
+
+    with requests.get(f"{EXPORT_URL}/{name}", stream=True, timeout=60) as response:
+        response.raise_for_status()
+        with open(tmp, "wb") as f:
+            for block in response.iter_content(chunk_size=1 << 20):
+                f.write(block)
+
+    os.replace(tmp, path)
+    print(f"[SAVED] {path}")
+    return path
+
+
+def iter_export_ids(path, include_adult=False):
+    """Stream movie ids from an export file, one line at a time."""
+    opener = gzip.open if str(path).endswith(".gz") else open
+
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+
+            entry = json.loads(line)
+            if entry.get("adult") and not include_adult:
+                continue
+
+            yield entry["id"]
+
+
+def shard_ids(path, shard, num_shards, skip=0):
+    """Ids belonging to `shard`, in export order, after the first `skip`."""
+    seen = 0
+    for movie_id in iter_export_ids(path):
+        if movie_id % num_shards != shard:
+            continue
+
+        seen += 1
+        if seen > skip:
+            yield movie_id
+
+
+# ============================================================
+# SHARD WORKER
+# ============================================================
+
+def shard_prefix(shard, num_shards):
+    return f"shard_{shard:03d}-of-{num_shards:03d}"
+
+
+def shard_checkpoint_path(shard, num_shards, folder=CATALOG_DIR):
+    return folder / f"{shard_prefix(shard, num_shards)}.checkpoint.json"
+
+
+def shard_output(shard, num_shards, folder=CATALOG_DIR, compression="none", resume=True):
+    """
+    Checkpointed details/credits NDJSON outputs for one shard.
+
+    The checkpoint stores the export file name, how many shard ids were
+    processed ("position") and the ids that failed so far, together with
+    the committed size of both outputs, so a restart drops anything written
+    after it and resumes from that id.
+    """
+    prefix = shard_prefix(shard, num_shards)
+    paths = {
+        "details": ndjson_path(folder, f"{prefix}.details", compression),
+        "credits": ndjson_path(folder, f"{prefix}.credits", compression),
+    }
+    return CheckpointedOutput(shard_checkpoint_path(shard, num_shards, folder), paths, resume)
+
+
+def shard_checkpoint(shard, num_shards, export_name, folder=CATALOG_DIR):
+    """
+    The shard's checkpoint if it was written for `export_name`, else None.
+    Positions count ids of one export file, so they mean nothing for
+    another day's export.
+    """
+    checkpoint = read_checkpoint(shard_checkpoint_path(shard, num_shards, folder))
+    if checkpoint is None or checkpoint.get("state", {}).get("export") != export_name:
+        return None
+    return checkpoint
+
+
+def shard_is_done(shard, num_shards, export_name, folder=CATALOG_DIR):
+    checkpoint = shard_checkpoint(shard, num_shards, export_name, folder)
+    return checkpoint is not None and checkpoint.get("done", False)
+
+
+def ingest_shard(export_path, shard, num_shards, max_workers=MAX_WORKERS, folder=CATALOG_DIR, compression="none"):
+    """
+    Fetch every movie of one shard, resuming from its checkpoint.
+
+    Ids whose request still fails after request_tmdb's own retries are kept
+    in the checkpoint and fetched again (RETRY_ROUNDS passes) once the
+    shard's ids are exhausted; those that never succeed (e.g. deleted
+    movies) stay listed under "failed".
+
+    Returns (movies fetched by this run, ids still failing).
+    """
+    label = f"shard {shard + 1}/{num_shards}"
+    export = Path(export_path).name
+
+    if shard_is_done(shard, num_shards, export, folder):
+        print(f"[OK] {label} already complete")
+        checkpoint = shard_checkpoint(shard, num_shards, export, folder)
+        return 0, len(checkpoint["state"].get("failed", []))
+
+    resume = shard_checkpoint(shard, num_shards, export, folder) is not None
+    if not resume and shard_checkpoint_path(shard, num_shards, folder).exists():
+        print(f"[WARN] {label} checkpoint is for another export. Starting over for {export}.")
+
+    output = shard_output(shard, num_shards, folder, compression, resume)
+    position = output.state.get("position", 0)
+    failed = output.state.get("failed", [])
+
+    if position:
+        print(f"[RESUME] {label} from id #{position} ({len(failed)} failed ids to retry)")
+
+    ids = shard_ids(export_path, shard, num_shards, skip=position)
+    fetched = 0
+
+    def write(result):
+        nonlocal fetched
+        details, credits = result
+        output.write("details", details)
+        output.write("credits", credits)
+        fetched += 1
+
+    try:
+        for movie_id, result in fetch_concurrent(fetch_movie, ids, max_workers, report=False):
+            if result is None:
+                failed.append(movie_id)
+            else:
+                write(result)
+
+            position += 1
+            if position % CHECKPOINT_EVERY == 0:
+                output.checkpoint(export=export, position=position, failed=failed)
+                print(f"[CHECKPOINT] {label}: {position} ids")
+
+        for attempt in range(1, RETRY_ROUNDS + 1):
+            if not failed:
+                break
+
+            print(f"[RETRY] {label}: {len(failed)} failed ids (round {attempt}/{RETRY_ROUNDS})")
+            for movie_id, result in fetch_concurrent(fetch_movie, list(failed), max_workers, report=False):
+                if result is not None:
+                    write(result)
+                    failed.remove(movie_id)
+            output.checkpoint(export=export, position=position, failed=failed)
+
+        output.close(done=True, export=export, position=position, failed=failed)
+    except BaseException:
+        output.close(done=False, export=export, position=position, failed=failed)
+        raise
+
+    if failed:
+        print(f"[WARN] {label}: {len(failed)} ids still failing, listed in its checkpoint")
+    print(f"[OK] {label} finished ({position} ids, {fetched} movies fetched by this run)")
+    return fetched, len(failed)
+
+
+# ============================================================
+# MAIN EXECUTION
+# ============================================================
+
+def ingest_catalog(export_path, num_shards=NUM_SHARDS, shards=None, max_workers=MAX_WORKERS, folder=CATALOG_DIR,
+                   compression="none"):
+    """
+    Run shard workers side by side. Every worker streams the export on its
+    own and keeps its own checkpoint; all of them share the process-wide
+    rate limiter. Pass `shards` to run a subset (e.g. one per machine).
+    Returns (movies fetched, ids still failing) over those shards.
+    """
+    shards = sorted(shards) if shards else list(range(num_shards))
+    print(f"\n=== TMDB CATALOG INGEST START ({len(shards)} of {num_shards} shards) ===")
+
+    before = STATS.snapshot()
+    start = datetime.now(timezone.utc)
+
+    with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+        futures = [
+            pool.submit(ingest_shard, export_path, shard, num_shards, max_workers, folder, compression)
+            for shard in shards
+        ]
+        results = [f.result() for f in futures]
+    fetched = sum(ok for ok, _ in results)
+    failed = sum(bad for _, bad in results)
+
+    elapsed = (datetime.now(timezone.utc) - start).total_seconds()
+    report_rate(before, elapsed, max_workers * len(shards))
+    print(f"\n=== TMDB CATALOG INGEST FINISHED ({fetched} movies fetched, {failed} ids failing) ===")
+    return fetched, failed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--export-file", type=Path, help="Local export file (.json.gz or .json) instead of downloading")
+    parser.add_argument("--date", type=date.fromisoformat, help="Export date to download (YYYY-MM-DD, default yesterday)")
+    parser.add_argument("--shards", type=int, default=NUM_SHARDS, help="Total number of shards")
+    parser.add_argument("--only-shard", type=int, action="append", help="Run only this shard (repeatable)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Concurrent requests per shard")
+    parser.add_argument("--output", type=Path, default=CATALOG_DIR, help="Folder for shard outputs and checkpoints")
+    parser.add_argument("--compression", choices=["none", "gzip", "zstd"], default="none", help="Compression for shard NDJSON outputs")
+    args = parser.parse_args()
+
+    export_path = args.export_file or download_export(args.date)
+    ingest_catalog(export_path, args.shards, args.only_shard, args.workers, args.output, args.compression)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+from .schemas import CLEAN_DIR, SCHEMAS, clean_path, read_clean_frame
+
+# ============================================================
+# CREDIT DIMENSIONS
+# ============================================================
+
+# The cast / crew builders emit the person's name and gender and the crew
+# department / job text on every row. Before a chunk is written it is split
+# into fact rows holding only ids and codes, plus the dimension rows they
+# point to: each person once in `people`, each department / job once in a
+# small lookup table.
+
+PERSON_COLUMNS = ["person_id", "name", "gender"]
+
+# crew text column: (lookup table, code column)
+LOOKUPS = {
+    "department": ("departments", "department_id"),
+    "job": ("jobs", "job_id"),
+}
+
+MAX_CODE = np.iinfo(np.int16).max
+
+
+class CodeBook:
+    """
+    Text -> int16 code for one lookup table.
+
+    Starts from the lookup already in the clean folder, in the format being
+    written (`fmt`), so a code keeps its meaning across runs (incremental
+    upserts rely on that); new names take the next free code.
+    """
+
+    def __init__(self, table, folder=CLEAN_DIR, fmt="parquet"):
+        self.table = table
+        self.key = SCHEMAS[table].names[0]
+        self.codes = {}
+
+        path = clean_path(table, folder, fmt)
+        if path.exists():
+            if fmt == "csv":
+                # Names are text even when they read like NA / numbers.
+                existing = pd.read_csv(path, dtype={"name": "str"}, keep_default_na=False)
+            else:
+                existing = read_clean_frame(table, folder)
+            self.codes = dict(zip(existing["name"], existing[self.key].astype("int64")))
+
+        self.next = max(self.codes.values(), default=-1) + 1
+
+    def encode(self, values):
+        """Int16 codes for a categorical Series (NA stays NA)."""
+        for name in values.cat.categories:
+            if name not in self.codes:
+                if self.next > MAX_CODE:
+                    raise ValueError(f"[ERROR] More than {MAX_CODE + 1} distinct values for '{self.table}'")
+                self.codes[name] = self.next
+                self.next += 1
+
+        mapping = np.array([self.codes[name] for name in values.cat.categories] + [0], dtype="int16")
+        positions = values.cat.codes.to_numpy()
+        return pd.arrays.IntegerArray(mapping[positions], mask=positions < 0)
+
+    def frame(self):
+        df = pd.DataFrame({self.key: list(self.codes.values()), "name": list(self.codes)})
+        return df.sort_values(self.key, ignore_index=True)
+
+
+class PersonSet:
+    """
+    Person ids already written. A bitmap indexed by id: TMDB person ids are
+    dense, so millions of people cost a few MB.
+    """
+
+    def __init__(self):
+        self.bits = np.zeros(0, dtype=bool)
+
+    def add(self, ids):
+        """Mark `ids` (unique, non-negative) as written; True where an id is new."""
+        if ids.size and ids.max() >= self.bits.size:
+            grown = np.zeros(max(int(ids.max()) + 1, 2 * self.bits.size), dtype=bool)
+            grown[:self.bits.size] = self.bits
+            self.bits = grown
+
+        new = ~self.bits[ids]
+        self.bits[ids] = True
+        return new
+
+
+class CreditDimensions:
+    """
+    Splits built cast / crew chunks into compact facts plus new `people`
+    rows (first name / gender seen per person), and collects the department
+    and job lookups, written once the stage is done.
+    """
+
+    # Written chunk by chunk next to cast / crew; the lookups come at the end.
+    tables = ("people",)
+
+    def __init__(self, folder=CLEAN_DIR, fmt="parquet"):
+        self.people = PersonSet()
+        self.codes = {column: CodeBook(table, folder, fmt) for column, (table, _) in LOOKUPS.items()}
+
+    def split(self, frames):
+        cast, crew = frames["cast"], frames["crew"]
+
+        people = pd.concat([cast[PERSON_COLUMNS], crew[PERSON_COLUMNS]], ignore_index=True)
+        people = people.dropna(subset=["person_id"]).drop_duplicates("person_id")
+        people = people[self.people.add(people["person_id"].to_numpy(dtype="int64"))].reset_index(drop=True)
+
+        crew = crew.assign(**{code: self.codes[column].encode(crew[column]) for column, (_, code) in LOOKUPS.items()})
+
+        return {
+            "cast": cast[SCHEMAS["cast"].names],
+            "crew": crew[SCHEMAS["crew"].names],
+            "people": people,
+        }
+
+    def lookups(self):
+        """{lookup table: DataFrame} with every code seen so far."""
+        return {table: self.codes[column].frame() for column, (table, _) in LOOKUPS.items()}
@@ -1,9 +1,16 @@
 import os
 import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from functools import partial
 from dotenv import load_dotenv
 
-from .utils_api import request_tmdb, paginated_request
+from .utils_api import request_tmdb, paginated_request, fetch_concurrent, MAX_WORKERS, TMDBNotFoundError
+from .http_cache import CACHE
+from .instrumentation import METRICS
+from .storage import CheckpointedOutput, ndjson_path, find_store, remove_stores, existing_ids, merge_store
 
 load_dotenv()
 
@@ -12,6 +19,17 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent
 RAW_DIR = BASE_DIR / "data" / "raw"
 PROCESSED_DIR = BASE_DIR / "data" / "processed"
 
+WATERMARK_PATH = PROCESSED_DIR / "watermark.json"
+CHANGED_IDS_PATH = PROCESSED_DIR / "changed_ids.json"
+CHECKPOINT_PATH = PROCESSED_DIR / "extract.checkpoint.json"
+INCREMENTAL_CHECKPOINT_PATH = PROCESSED_DIR / "incremental.checkpoint.json"
+
+# Details/credits are appended as they arrive and committed every N movies.
+CHECKPOINT_EVERY = 500
+
+# /movie/changes accepts at most 14 days per query.
+CHANGES_WINDOW_DAYS = 14
+
 RAW_DIR.mkdir(exist_ok=True, parents=True)
 PROCESSED_DIR.mkdir(exist_ok=True, parents=True)
 
@@ -52,46 +70,286 @@ def extract_genres():
     save_json(data, "genres.json")
 
 
-def extract_movie_details(movie_ids):
-    """Fetch full metadata and credits."""
-    details_list = []
-    credits_list = []
+# Independent list snapshots; extract_lists fetches them side by side.
+LIST_EXTRACTS = {
+    "popular": extract_popular,
+    "top_rated": extract_top_rated,
+    "upcoming": extract_upcoming,
+    "trending": extract_trending,
+    "genres": extract_genres,
+}
+
+
+def extract_lists():
+    with METRICS.stage("extract.lists"), ThreadPoolExecutor(max_workers=len(LIST_EXTRACTS)) as pool:
+        for future in [pool.submit(extract) for extract in LIST_EXTRACTS.values()]:
+            future.result()
+
+
+def fetch_movie(movie_id, refresh=False):
+    """
+    Fetch details and credits for one movie in a single request.
+
+    Credits are folded in with append_to_response and split back out into
+    the same shape /movie/{id}/credits returns. refresh=True bypasses the
+    response cache.
+    """
+    details = request_tmdb(f"/movie/{movie_id}", params={"append_to_response": "credits"}, refresh=refresh)
+    credits = {"id": details["id"], **(details.pop("credits", None) or {})}
+    return details, credits
+
+
+def extract_movie_details(movie_ids, max_workers=MAX_WORKERS, compression="none"):
+    """
+    Fetch full metadata and credits concurrently, streaming them to NDJSON.
+
+    Records are appended as they arrive and committed every
+    CHECKPOINT_EVERY movies. If the previous run crashed, its committed
+    records are kept and those movie ids are skipped.
+    """
+    paths = {
+        "details": ndjson_path(PROCESSED_DIR, "details", compression),
+        "credits": ndjson_path(PROCESSED_DIR, "credits", compression),
+    }
+    output = CheckpointedOutput(CHECKPOINT_PATH, paths)
+
+    for name, path in paths.items():
+        remove_stores(PROCESSED_DIR, name, keep=path)
+
+    done = existing_ids(paths["details"]) if output.resumed else set()
+    todo = [movie_id for movie_id in movie_ids if movie_id not in done]
 
-    for movie_id in movie_ids:
-        print(f"Fetching metadata for movie {movie_id}")
+    if done:
+        print(f"[RESUME] {len(done)} movies already on disk, {len(todo)} to go")
 
-        details = request_tmdb(f"/movie/{movie_id}")
-        credits = request_tmdb(f"/movie/{movie_id}/credits")
+    print(f"Fetching metadata for {len(todo)} movies ({max_workers} workers)")
 
-        details_list.append(details)
-        credits_list.append(credits)
+    with METRICS.stage("extract.details") as record:
+        written = 0
+        try:
+            for movie_id, result in fetch_concurrent(fetch_movie, todo, max_workers):
+                if result is None:
+                    continue
 
-    save_json(details_list, "details.json", PROCESSED_DIR)
-    save_json(credits_list, "credits.json", PROCESSED_DIR)
+                details, credits = result
+                output.write("details", details)
+                output.write("credits", credits)
+
+                written += 1
+                if written % CHECKPOINT_EVERY == 0:
+                    output.checkpoint()
+                    print(f"[CHECKPOINT] {written}/{len(todo)} movies")
+
+            output.close(done=True)
+        except BaseException:
+            output.close(done=False)
+            raise
+        record.rows_in, record.rows_out = len(todo), written
+
+    for path in paths.values():
+        print(f"[SAVED] {path}")
 
 
 # ============================================================
-# MAIN EXECUTION
+# INCREMENTAL EXTRACT
 # ============================================================
 
-def extract_all():
-    print("\n=== TMDB ETL EXTRACT START ===")
+def load_watermark():
+    """Return the start time of the last successful run, or None."""
+    if not WATERMARK_PATH.exists():
+        return None
+
+    data = json.loads(WATERMARK_PATH.read_text(encoding="utf-8"))
+    return datetime.fromisoformat(data["last_run"])
+
+
+def save_watermark(run_started):
+    tmp = WATERMARK_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"last_run": run_started.isoformat()}), encoding="utf-8")
+    os.replace(tmp, WATERMARK_PATH)
+    print(f"[SAVED] {WATERMARK_PATH} ({run_started.isoformat()})")
+
+
+def changed_movie_ids(since, until):
+    """Collect ids from /movie/changes, split into windows TMDB accepts."""
+    ids = set()
+    start = since.date()
+    end = until.date()
+
+    while start <= end:
+        window_end = min(start + timedelta(days=CHANGES_WINDOW_DAYS - 1), end)
+        results = paginated_request(
+            "/movie/changes",
+            total_pages=500,
+            params={"start_date": start.isoformat(), "end_date": window_end.isoformat()},
+        )
+        ids.update(r["id"] for r in results if not r.get("adult"))
+        start = window_end + timedelta(days=1)
+
+    return ids
+
 
-    extract_popular()
-    extract_top_rated()
-    extract_upcoming()
-    extract_trending()
-    extract_genres()
+def delta_paths(folder=PROCESSED_DIR):
+    """Stores an incremental run streams into before merging them."""
+    return {
+        "details": ndjson_path(folder, "details.delta"),
+        "credits": ndjson_path(folder, "credits.delta"),
+        # Tombstones: {"id": ...} for changed movies TMDB now answers with 404.
+        "removed": ndjson_path(folder, "removed.delta"),
+    }
+
+
+# fetch_changed_movie's result for a movie TMDB answers with 404.
+REMOVED = "removed"
+
+
+def fetch_changed_movie(movie_id):
+    """fetch_movie past the cache (a cached copy predates the change); REMOVED on a 404."""
+    try:
+        return fetch_movie(movie_id, refresh=True)
+    except TMDBNotFoundError:
+        return REMOVED
+
+
+def merge_records(name, delta_path, removed, folder=PROCESSED_DIR):
+    """Merge a delta store into the processed `name` store by `id`, dropping `removed` ids."""
+    path = find_store(folder, name) or ndjson_path(folder, name)
+    path = merge_store(path, delta_path, removed)
+    print(f"[SAVED] {path}")
+
+
+def extract_incremental(max_workers=MAX_WORKERS, all_changes=False, compression="none"):
+    """
+    Refetch only movies that changed since the last run's watermark.
+
+    By default only movies already in the details store are refreshed; with
+    all_changes every changed id reported by TMDB is fetched and added.
+    Refetched records stream to checkpointed delta stores (a crashed run
+    resumes where it stopped) and are then merged into the processed
+    stores. Movies that now return 404 are dropped from them. Both kinds
+    of ids go to changed_ids.json.
+    """
+    print("\n=== TMDB ETL INCREMENTAL EXTRACT START ===")
+
+    run_started = datetime.now(timezone.utc)
+    since = load_watermark()
+
+    if since is None:
+        print("[WARN] No watermark found. Running a full extract first.")
+        extract_all(max_workers, compression)
+        return
+
+    changed = changed_movie_ids(since, run_started)
+    print(f"[OK] {len(changed)} movies changed since {since.isoformat()}")
+
+    if not all_changes:
+        changed &= existing_ids(find_store(PROCESSED_DIR, "details"))
+        print(f"[OK] {len(changed)} of them are in the processed store")
+
+    paths = delta_paths(PROCESSED_DIR)
+    output = CheckpointedOutput(INCREMENTAL_CHECKPOINT_PATH, paths)
+
+    done = existing_ids(paths["details"]) | existing_ids(paths["removed"]) if output.resumed else set()
+    todo = sorted(changed - done)
+    if done:
+        print(f"[RESUME] {len(done)} changed movies already fetched, {len(todo)} to go")
+
+    with METRICS.stage("extract.changed_details") as record:
+        written = removed = 0
+        try:
+            for movie_id, result in fetch_concurrent(fetch_changed_movie, todo, max_workers):
+                if result is None:
+                    continue
+                if result == REMOVED:
+                    output.write("removed", {"id": movie_id})
+                    removed += 1
+                    continue
+
+                details, credits = result
+                output.write("details", details)
+                output.write("credits", credits)
+
+                written += 1
+                if written % CHECKPOINT_EVERY == 0:
+                    output.checkpoint()
+            output.checkpoint()
+        except BaseException:
+            output.close(done=False)
+            raise
+        record.rows_in, record.rows_out = len(todo), written
+
+    if removed:
+        print(f"[WARN] {removed} changed movies no longer exist on TMDB; dropping them")
+
+    removed_ids = existing_ids(paths["removed"])
+    merge_records("details", paths["details"], removed_ids, PROCESSED_DIR)
+    merge_records("credits", paths["credits"], removed_ids, PROCESSED_DIR)
+    save_json(sorted(existing_ids(paths["details"]) | removed_ids), CHANGED_IDS_PATH.name, PROCESSED_DIR)
+    save_watermark(run_started)
+
+    output.close(done=True)
+    for path in paths.values():
+        path.unlink(missing_ok=True)
+
+    CACHE.report()
+    print("\n=== TMDB ETL INCREMENTAL EXTRACT FINISHED ===")
+
+
+# ============================================================
+# MAIN EXECUTION
+# ============================================================
+
+def extract_popular_details(max_workers=MAX_WORKERS, compression="none", run_started=None, limit=None):
+    """
+    Full details/credits for the movies in popular.json (the first `limit`
+    only, if given); resets the incremental watermark.
+    """
+    run_started = run_started or datetime.now(timezone.utc)
 
     # Load popular to extract full details
     with open(RAW_DIR / "popular.json", "r", encoding="utf-8") as f:
         popular = json.load(f)
 
-    movie_ids = [m["id"] for m in popular[:50]]  # limit for dev
-    extract_movie_details(movie_ids)
+    movie_ids = [m["id"] for m in popular[:limit]]
+    extract_movie_details(movie_ids, max_workers, compression)
+
+    # A full run refreshes everything; no partial change set applies.
+    CHANGED_IDS_PATH.unlink(missing_ok=True)
+    save_watermark(run_started)
+
+
+def extract_all(max_workers=MAX_WORKERS, compression="none", limit=None):
+    print("\n=== TMDB ETL EXTRACT START ===")
+
+    run_started = datetime.now(timezone.utc)
 
+    extract_lists()
+    extract_popular_details(max_workers, compression, run_started, limit)
+
+    CACHE.report()
     print("\n=== TMDB ETL EXTRACT FINISHED ===")
 
 
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Concurrent requests for movie details")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the local HTTP response cache")
+    parser.add_argument("--compression", choices=["none", "gzip", "zstd"], default="none", help="Compression for the details/credits NDJSON stores")
+    parser.add_argument("--incremental", action="store_true", help="Refetch only movies changed since the last run")
+    parser.add_argument("--all-changes", action="store_true", help="With --incremental, also add changed movies not yet in the store")
+    parser.add_argument("--limit", type=int, help="Fetch details for only the first N popular movies (default: all)")
+    args = parser.parse_args()
+
+    if args.no_cache:
+        CACHE.enabled = False
+
+    if args.incremental:
+        extract_incremental(max_workers=args.workers, all_changes=args.all_changes, compression=args.compression)
+    else:
+        extract_all(max_workers=args.workers, compression=args.compression, limit=args.limit)
+
+    METRICS.write_report("extract")
+
+
 if __name__ == "__main__":
-    extract_all()
+    main()
@@ -0,0 +1,214 @@
+import os
+import re
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from collections import namedtuple
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+CACHE_DIR = Path(os.getenv("TMDB_CACHE_DIR", BASE_DIR / "data" / "cache"))
+CACHE_PATH = CACHE_DIR / "http_cache.sqlite"
+
+CACHE_ENABLED = os.getenv("TMDB_CACHE", "1") != "0"
+MAX_CACHE_BYTES = int(float(os.getenv("TMDB_CACHE_MAX_MB", "1024")) * 1024 * 1024)
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# First matching rule wins. A TTL of 0 means "never cache".
+TTL_RULES = [
+    (re.compile(r"^/movie/changes"), 0),
+    (re.compile(r"^/genre/"), 7 * DAY),
+    (re.compile(r"^/configuration"), 7 * DAY),
+    (re.compile(r"^/movie/(popular|top_rated|upcoming|now_playing)"), 6 * HOUR),
+    (re.compile(r"^/trending/"), 6 * HOUR),
+    (re.compile(r"^/movie/\d+"), DAY),
+]
+DEFAULT_TTL = HOUR
+
+# Params that identify the caller, not the resource.
+IGNORED_PARAMS = {"api_key"}
+
+CachedResponse = namedtuple("CachedResponse", ["key", "data", "etag", "fresh"])
+
+
+def ttl_for(endpoint):
+    for pattern, ttl in TTL_RULES:
+        if pattern.search(endpoint):
+            return ttl
+    return DEFAULT_TTL
+
+
+def cache_key(base_url, endpoint, params):
+    """Stable key from endpoint + normalized params (API key excluded)."""
+    normalized = sorted(
+        (str(k), str(v)) for k, v in (params or {}).items() if k not in IGNORED_PARAMS
+    )
+    raw = json.dumps([base_url, endpoint, normalized], separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# ============================================================
+# CACHE
+# ============================================================
+
+class ResponseCache:
+    """
+    On-disk cache of TMDB JSON responses backed by SQLite.
+
+    Entries expire per endpoint (see TTL_RULES). Expired entries with an
+    ETag are kept so the next request can revalidate with If-None-Match.
+    When the cache grows past max_bytes the least recently used entries
+    are evicted.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_CACHE_BYTES, enabled=CACHE_ENABLED):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.conn = None
+        self.total_bytes = 0
+        self.counters = {"hits": 0, "misses": 0, "stale": 0, "revalidated": 0, "stored": 0, "evicted": 0}
+
+    def _connect(self):
+        if self.conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    endpoint TEXT NOT NULL,
+                    etag TEXT,
+                    stored_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    body BLOB NOT NULL
+                )
+                """
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+            self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        return self.conn
+
+    def _count(self, name):
+        self.counters[name] += 1
+
+    def lookup(self, base_url, endpoint, params):
+        """Return a CachedResponse, or None if nothing usable is cached."""
+        ttl = ttl_for(endpoint)
+        if not self.enabled or ttl <= 0:
+            return None
+
+        key = cache_key(base_url, endpoint, params)
+        now = time.time()
+
+        with self.lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT etag, stored_at, body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self._count("misses")
+                return None
+
+            etag, stored_at, body = row
+            fresh = now - stored_at < ttl
+
+            if not fresh and not etag:
+                self._count("misses")
+                return None
+
+            self._count("hits" if fresh else "stale")
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+
+        data = json.loads(zlib.decompress(body))
+        return CachedResponse(key, data, etag, fresh)
+
+    def revalidation_headers(self, cached):
+        if cached is not None and cached.etag:
+            return {"If-None-Match": cached.etag}
+        return {}
+
+    def revalidated(self, cached):
+        """Mark a stale entry fresh again after a 304 Not Modified."""
+        with self.lock:
+            self._count("revalidated")
+            self._connect().execute(
+                "UPDATE responses SET stored_at = ? WHERE key = ?", (time.time(), cached.key)
+            )
+        return cached.data
+
+    def store(self, base_url, endpoint, params, data, etag=None):
+        if not self.enabled or ttl_for(endpoint) <= 0:
+            return
+
+        key = cache_key(base_url, endpoint, params)
+        body = zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+        now = time.time()
+
+        with self.lock:
+            conn = self._connect()
+            old = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, endpoint, etag, stored_at, accessed_at, size, body) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, endpoint, etag, now, now, len(body), body),
+            )
+            self.total_bytes += len(body) - (old[0] if old else 0)
+            self._count("stored")
+
+            if self.total_bytes > self.max_bytes:
+                self._evict(conn)
+
+    def _evict(self, conn):
+        """Drop least recently used entries until the cache is at 90% of its cap."""
+        target = int(self.max_bytes * 0.9)
+        rows = conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+
+        doomed = []
+        for key, size in rows:
+            if self.total_bytes <= target:
+                break
+            doomed.append((key,))
+            self.total_bytes -= size
+
+        conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.counters["evicted"] += len(doomed)
+
+    def clear(self):
+        with self.lock:
+            self._connect().execute("DELETE FROM responses")
+            self.total_bytes = 0
+
+    def stats(self):
+        with self.lock:
+            return {**self.counters, "bytes": self.total_bytes}
+
+    def report(self):
+        s = self.stats()
+        lookups = s["hits"] + s["misses"] + s["stale"]
+        hit_rate = (s["hits"] + s["revalidated"]) / lookups if lookups else 0.0
+
+        print(
+            f"[CACHE] hits={s['hits']} misses={s['misses']} stale={s['stale']} "
+            f"revalidated={s['revalidated']} evicted={s['evicted']} "
+            f"hit_rate={hit_rate:.0%} size={s['bytes'] / 1024 / 1024:.1f}MB"
+        )
+
+
+CACHE = ResponseCache()
@@ -0,0 +1,333 @@
+import os
+import re
+import sys
+import time
+import cProfile
+import pstats
+import threading
+from contextlib import contextmanager
+from itertools import accumulate
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, peak RSS is not reported
+    resource = None
+
+from .storage import write_checkpoint
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+METRICS_DIR = Path(os.getenv("TMDB_METRICS_DIR", BASE_DIR / "data" / "metrics"))
+
+# Comma-separated stage names to run under cProfile ("all" for every
+# stage), e.g. TMDB_PROFILE=transform.details,load_postgres.
+PROFILE = {name.strip() for name in os.getenv("TMDB_PROFILE", "").split(",") if name.strip()}
+PROFILE_TOP = 25
+
+HTTP_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# name: (type, help, histogram buckets). Every metric recorded must be
+# declared here, so a typo fails loudly instead of adding a new series.
+METRICS_DEFINED = {
+    "tmdb_http_request_seconds": ("histogram", "TMDB HTTP request latency by endpoint.", HTTP_BUCKETS),
+    "tmdb_http_requests_total": ("counter", "TMDB HTTP responses by endpoint and status code.", None),
+    "tmdb_http_retries_total": ("counter", "TMDB requests retried after an error or timeout.", None),
+    "tmdb_http_throttled_total": ("counter", "TMDB 429 (rate limited) responses.", None),
+    "tmdb_http_cache_hits_total": ("counter", "TMDB requests answered from the local HTTP cache.", None),
+    "tmdb_query_seconds": ("histogram", "Analytics query latency by query and backend.", QUERY_BUCKETS),
+    "tmdb_query_cache_hits_total": ("counter", "Analytics queries answered from the query cache.", None),
+    "tmdb_bigquery_bytes_processed_total": ("counter", "Bytes processed by BigQuery queries.", None),
+    "tmdb_bigquery_bytes_billed_total": ("counter", "Bytes billed for BigQuery queries.", None),
+    "tmdb_bigquery_load_bytes_total": ("counter", "Parquet bytes sent to BigQuery load jobs.", None),
+}
+
+# Stage gauges written to the Prometheus file, one series per stage.
+STAGE_GAUGES = {
+    "tmdb_stage_seconds": ("seconds", "Wall time of the last run of each stage."),
+    "tmdb_stage_rows_in": ("rows_in", "Rows read by each stage."),
+    "tmdb_stage_rows_out": ("rows_out", "Rows written by each stage."),
+    "tmdb_stage_rows_per_second": ("rows_per_sec", "Throughput of each stage (rows out, else rows in)."),
+    "tmdb_stage_peak_rss_bytes": ("peak_rss_bytes", "Process peak RSS when each stage finished."),
+}
+
+
+def endpoint_label(endpoint):
+    """/movie/603/credits -> /movie/{id}/credits, so ids do not become label values."""
+    return re.sub(r"/\d+(?=/|$)", "/{id}", endpoint)
+
+
+def peak_rss():
+    """Peak resident set size in bytes of this process and of its (waited-for) children."""
+    if resource is None:
+        return None, None
+    scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss: bytes on macOS, KiB on Linux
+    return (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    )
+
+
+# ============================================================
+# STAGES
+# ============================================================
+
+class StageRecord:
+    """Timing and row counts of one stage run; the stage fills in rows_in / rows_out."""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows_in = 0
+        self.rows_out = 0
+        self.started_at = datetime.now(timezone.utc)
+        self.seconds = None
+        self.status = "running"
+        self.peak_rss_bytes = None
+        self.children_peak_rss_bytes = None
+        self.profile = None
+
+    def count(self, items):
+        """Pass `items` through, adding each one to rows_in."""
+        for item in items:
+            self.rows_in += 1
+            yield item
+
+    def as_dict(self):
+        rows = self.rows_out or self.rows_in
+        return {
+            "stage": self.name,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "seconds": self.seconds,
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "rows_per_sec": rows / self.seconds if self.seconds and rows else None,
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "children_peak_rss_bytes": self.children_peak_rss_bytes,
+            "profile": self.profile,
+        }
+
+
+def profiled(name):
+    return "all" in PROFILE or name in PROFILE
+
+
+# ============================================================
+# REGISTRY
+# ============================================================
+
+class Metrics:
+    """
+    Process-wide, thread-safe registry of counters, histograms and stage
+    records. write_report() dumps it as a JSON run report and a Prometheus
+    text file.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = datetime.now(timezone.utc)
+        self.counters = {}
+        self.histograms = {}
+        self.stages = []
+
+    @staticmethod
+    def _key(name, labels):
+        if name not in METRICS_DEFINED:
+            raise KeyError(f"[ERROR] Undeclared metric '{name}' (add it to METRICS_DEFINED)")
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        buckets = METRICS_DEFINED[name][2]
+        with self.lock:
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = {"buckets": [0] * len(buckets), "count": 0, "sum": 0.0, "max": 0.0}
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    h["buckets"][i] += 1
+                    break
+            h["count"] += 1
+            h["sum"] += value
+            h["max"] = max(h["max"], value)
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time a stage: `with METRICS.stage("transform.details") as s: ...`,
+        setting s.rows_in / s.rows_out (or wrapping an input in s.count()).
+        Stages named in TMDB_PROFILE run under cProfile.
+        """
+        record = StageRecord(name)
+        with self.lock:
+            self.stages.append(record)
+
+        profiler = cProfile.Profile() if profiled(name) else None
+        if profiler is not None:
+            try:
+                profiler.enable()
+            except ValueError:  # another stage is being profiled on a concurrent thread
+                print(f"[WARN] Not profiling '{name}': another profiler is active")
+                profiler = None
+
+        start = time.perf_counter()
+        try:
+            yield record
+            record.status = "ok"
+        except BaseException:
+            record.status = "failed"
+            raise
+        finally:
+            record.seconds = time.perf_counter() - start
+            record.peak_rss_bytes, record.children_peak_rss_bytes = peak_rss()
+            if profiler is not None:
+                profiler.disable()
+                record.profile = str(self._save_profile(name, profiler))
+
+    def _save_profile(self, name, profiler):
+        path = METRICS_DIR / "profiles" / f"{name}-{record_stamp()}.prof"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(path)
+
+        print(f"[PROFILE] {name}: top {PROFILE_TOP} by cumulative time (full profile: {path})")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(PROFILE_TOP)
+        return path
+
+    # ------------------------------------------------------------
+    # REPORTS
+    # ------------------------------------------------------------
+
+    def snapshot(self):
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {key: {**h, "buckets": list(h["buckets"])} for key, h in self.histograms.items()}
+            stages = [s.as_dict() for s in self.stages]
+        return counters, histograms, stages
+
+    def report(self, run):
+        """The run report as a JSON-able dict."""
+        counters, histograms, stages = self.snapshot()
+        finished = datetime.now(timezone.utc)
+        rss, children_rss = peak_rss()
+
+        return {
+            "run": run,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": finished.isoformat(),
+            "seconds": (finished - self.started_at).total_seconds(),
+            "peak_rss_bytes": rss,
+            "children_peak_rss_bytes": children_rss,
+            "stages": stages,
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(counters.items())
+            ],
+            "histograms": [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": h["count"],
+                    "sum": h["sum"],
+                    "mean": h["sum"] / h["count"],
+                    "max": h["max"],
+                    "buckets": cumulative_buckets(METRICS_DEFINED[name][2], h),
+                }
+                for (name, labels), h in sorted(histograms.items())
+            ],
+        }
+
+    def prometheus(self, run):
+        """Everything recorded, in the Prometheus text exposition format."""
+        counters, histograms, stages = self.snapshot()
+        lines = []
+
+        def header(name, kind, text):
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for name, (kind, text, buckets) in METRICS_DEFINED.items():
+            series = counters if kind == "counter" else histograms
+            keys = sorted(key for key in series if key[0] == name)
+            if not keys:
+                continue
+
+            header(name, kind, text)
+            for key in keys:
+                labels = (("run", run),) + key[1]
+                if kind == "counter":
+                    lines.append(f"{name}{format_labels(labels)} {series[key]}")
+                    continue
+
+                h = series[key]
+                for bound, count in cumulative_buckets(buckets, h).items():
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', bound),))} {count}")
+                lines.append(f"{name}_sum{format_labels(labels)} {h['sum']:.6f}")
+                lines.append(f"{name}_count{format_labels(labels)} {h['count']}")
+
+        # A stage that ran several times (e.g. one per table) reports its last run.
+        latest = {s["stage"]: s for s in stages if s["seconds"] is not None}
+        for name, (field, text) in STAGE_GAUGES.items():
+            values = [(stage, s[field]) for stage, s in sorted(latest.items()) if s[field] is not None]
+            if not values:
+                continue
+            header(name, "gauge", text)
+            for stage, value in values:
+                lines.append(f"{name}{format_labels((('run', run), ('stage', stage)))} {value!r}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, run, folder=None):
+        """
+        Write run-<timestamp>-<run>.json and <run>.prom (overwritten each run,
+        for a node_exporter textfile collector) to data/metrics/.
+        """
+        folder = Path(folder or METRICS_DIR)
+        folder.mkdir(parents=True, exist_ok=True)
+
+        report_path = folder / f"run-{record_stamp()}-{run}.json"
+        write_checkpoint(report_path, self.report(run))
+
+        prom_path = folder / f"{run}.prom"
+        tmp = prom_path.with_name(prom_path.name + ".tmp")
+        tmp.write_text(self.prometheus(run), encoding="utf-8")
+        os.replace(tmp, prom_path)
+
+        print(f"[SAVED] Metrics: {report_path.name}, {prom_path.name}")
+        for s in self.snapshot()[2]:
+            rate = f", {s['rows_per_sec']:,.0f} rows/s" if s["rows_per_sec"] else ""
+            print(f"  {s['stage']:<28} {s['status']:<7} {s['seconds'] or 0:8.2f}s{rate}")
+        return report_path, prom_path
+
+
+def cumulative_buckets(buckets, h):
+    """{"le" bound: observations <= bound}, ending with "+Inf" (every observation)."""
+    counts = dict(zip((f"{bound:g}" for bound in buckets), accumulate(h["buckets"])))
+    counts["+Inf"] = h["count"]
+    return counts
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels) + "}"
+
+
+def record_stamp():
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+METRICS = Metrics()
@@ -1,9 +1,26 @@
+import io
 import os
-import pandas as pd
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
 from pathlib import Path
 
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+from src.config.create_schema import (
+    SCHEMA, TABLES, PRIMARY_KEYS, TABLE_INDEXES, VIEW_TABLES, qualified, column_names, create_table_sql,
+    primary_key_sql, index_sql, foreign_keys, drop_foreign_keys_sql, create_views_sql, create_schema, refresh_views,
+)
+from .schemas import iter_clean_batches
+from .extract_tmdb import CHANGED_IDS_PATH
+from .publish import mark_published
+from .instrumentation import METRICS
+
 # ============================================================
 # LOAD CONFIG
 # ============================================================
@@ -17,42 +34,348 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL not found in .env")
 
-engine = create_engine(DATABASE_URL)
+# Tables loaded side by side, one connection each.
+LOAD_WORKERS = int(os.getenv("TMDB_LOAD_WORKERS", "3"))
+BATCH_SIZE = 65536
+COPY_BUFFER = 1 << 20
+
+engine = create_engine(DATABASE_URL, pool_size=LOAD_WORKERS)
+
+
+# Tables rebuilt per changed movie in upsert mode.
+CHILD_TABLES = ["movie_genres", "cast", "crew"]
+
+# Small lookup tables, upserted whole so new ids used by the changed rows exist.
+LOOKUP_TABLES = ["genres", "departments", "jobs"]
+
+
+def column_list(table_name):
+    return ", ".join(f'"{name}"' for name in column_names(table_name))
 
 
 # ============================================================
-# SAFE LOAD FUNCTION
+# COPY STREAM
 # ============================================================
 
-def load_csv(table_name, filename):
+class CSVStream(io.RawIOBase):
     """
-    Loads a cleaned CSV into PostgreSQL using SQLAlchemy.
-    Ensures table exists, replaces it atomically, and logs output.
+    Read-only file object that renders Arrow record batches as CSV on
+    demand, so COPY ... FROM STDIN streams a table without materializing it.
     """
-    path = CLEAN_DIR / filename
 
-    if not path.exists():
-        raise FileNotFoundError(f"Missing file: {path}")
+    def __init__(self, batches):
+        self.batches = iter(batches)
+        self.buffer = memoryview(b"")
+        self.rows = 0
 
-    print(f"📄 Loading {filename} into table '{table_name}' ...")
+    def readable(self):
+        return True
 
-    df = pd.read_csv(path)
+    def _next_chunk(self):
+        for batch in self.batches:
+            if batch.num_rows:
+                self.rows += batch.num_rows
+                return memoryview(csv_bytes(batch))
+        return None
 
-    with engine.begin() as conn:
-        # Truncate instead of DROP for stability & permissions
-        conn.execute(text(f"DROP TABLE IF EXISTS tmdb.{table_name} CASCADE"))
-
-        df.to_sql(
-            table_name,
-            con=conn,
-            schema="tmdb",
-            if_exists="replace",
-            index=False,
-            method="multi",
-            chunksize=5000
+    def readinto(self, target):
+        while not self.buffer:
+            self.buffer = self._next_chunk()
+            if self.buffer is None:
+                self.buffer = memoryview(b"")
+                return 0
+
+        n = min(len(target), len(self.buffer))
+        target[:n] = self.buffer[:n]
+        self.buffer = self.buffer[n:]
+        return n
+
+
+def csv_bytes(batch):
+    # Arrow writes nulls as empty fields and empty strings as "", which is
+    # exactly how COPY's CSV format tells them apart.
+    columns = [
+        column.cast(column.type.value_type) if pa.types.is_dictionary(column.type) else column
+        for column in batch.columns
+    ]
+    sink = io.BytesIO()
+    pacsv.write_csv(pa.RecordBatch.from_arrays(columns, names=batch.schema.names), sink,
+                    pacsv.WriteOptions(include_header=False))
+    return sink.getvalue()
+
+
+def copy_batches(cur, target, table_name, batches):
+    """COPY Arrow batches of `table_name` into `target` (a quoted SQL name). Returns the row count."""
+    stream = CSVStream(batches)
+    cur.copy_expert(
+        f"COPY {target} ({column_list(table_name)}) FROM STDIN WITH (FORMAT csv)",
+        io.BufferedReader(stream, buffer_size=COPY_BUFFER),
+        size=COPY_BUFFER,
+    )
+    return stream.rows
+
+
+# ============================================================
+# STAGING LOAD + SWAP
+# ============================================================
+
+def swap_sql(table_name, in_place=False):
+    """
+    Statements that replace the live table with the loaded staging table in
+    one transaction, renaming keys and indexes to their live names.
+
+    in_place=True refills the live table from the staging table instead,
+    for tables the materialized views read: dropping those would drop the
+    views as well.
+    """
+    staging, old = f"{table_name}_staging", f"{table_name}_old"
+    if in_place:
+        return [
+            f"TRUNCATE {qualified(table_name)}",
+            f"INSERT INTO {qualified(table_name)} ({column_list(table_name)}) "
+            f"SELECT {column_list(table_name)} FROM {qualified(staging)}",
+            f"DROP TABLE {qualified(staging)}",
+        ]
+
+    statements = [
+        f"DROP TABLE IF EXISTS {qualified(old)} CASCADE",
+        f'ALTER TABLE IF EXISTS {qualified(table_name)} RENAME TO "{old}"',
+        f"DROP TABLE IF EXISTS {qualified(old)} CASCADE",
+        f'ALTER TABLE {qualified(staging)} RENAME TO "{table_name}"',
+    ]
+
+    if table_name in PRIMARY_KEYS:
+        statements.append(
+            f"ALTER TABLE {qualified(table_name)} RENAME CONSTRAINT {staging}_pkey TO {table_name}_pkey"
         )
+    for suffix, _ in TABLE_INDEXES.get(table_name, []):
+        statements.append(f"ALTER INDEX {SCHEMA}.{staging}_{suffix} RENAME TO {table_name}_{suffix}")
+
+    return statements
+
+
+def stage_table(table_name, folder=CLEAN_DIR):
+    """
+    COPY a clean table into a typed staging table and build its keys and
+    indexes. The live table is untouched. Returns (rows, seconds).
+    """
+    print(f"📄 Loading '{table_name}' from {folder} ...")
+
+    staging = f"{table_name}_staging"
+    start = time.perf_counter()
+
+    with METRICS.stage(f"load_postgres.{table_name}") as record:
+        conn = engine.raw_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"DROP TABLE IF EXISTS {qualified(staging)} CASCADE")
+                cur.execute(create_table_sql(table_name, staging))
+
+                rows = copy_batches(cur, qualified(staging), table_name, iter_clean_batches(table_name, folder, BATCH_SIZE))
+
+                if table_name in PRIMARY_KEYS:
+                    cur.execute(primary_key_sql(table_name, staging))
+                for statement in index_sql(table_name, staging):
+                    cur.execute(statement)
+
+                cur.execute(f"ANALYZE {qualified(staging)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        record.rows_in = record.rows_out = rows
+
+    elapsed = time.perf_counter() - start
+    print(f"Loaded {rows} rows into {SCHEMA}.{staging} "
+          f"in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)")
+    return rows, elapsed
+
+
+def execute_all(statements):
+    conn = engine.raw_connection()
+    try:
+        with conn.cursor() as cur:
+            for statement in statements:
+                cur.execute(statement)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def live_columns(table_name):
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_schema = :schema AND table_name = :table ORDER BY ordinal_position"
+        ), {"schema": SCHEMA, "table": table_name})
+        return [row[0] for row in rows]
+
+
+def publish(tables):
+    """
+    Swap every staged table over its live table in one transaction, so
+    readers see either the previous dataset or the new one. The
+    materialized views survive the swap and keep serving the previous
+    dataset until load_all refreshes them.
+
+    If a table the views read changed its columns, it has to be swapped
+    and the views go with it: they are then recreated in the same
+    transaction.
+    """
+    start = time.perf_counter()
+    in_place = [t for t in tables if t in VIEW_TABLES]
+    migrated = [t for t in in_place if live_columns(t) != column_names(t)]
+    if migrated:
+        print(f"[WARN] Columns of {', '.join(migrated)} changed; rebuilding the analytics views")
+        in_place = []
+
+    statements = drop_foreign_keys_sql()
+    for table_name in tables:
+        statements += swap_sql(table_name, table_name in in_place)
+    if migrated:
+        statements += create_views_sql()
+
+    execute_all(statements)
+    print(f"[OK] Published {len(tables)} tables in {time.perf_counter() - start:.1f}s")
+
+
+def load_all(tables=TABLES, folder=CLEAN_DIR, workers=LOAD_WORKERS):
+    """
+    Stage several tables in parallel (one pooled connection per table),
+    publish them together, restore the foreign keys, then refresh the
+    materialized views CONCURRENTLY so dashboards are never blocked.
+    """
+    with METRICS.stage("load_postgres") as record:
+        with engine.begin() as conn:
+            create_schema(conn)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {table: pool.submit(stage_table, table, folder) for table in tables}
+            results = {table: future.result() for table, future in futures.items()}
+
+        publish(tables)
+
+        execute_all(statement for _, statement in foreign_keys())
+        print("[OK] Foreign keys restored")
+
+        with engine.begin() as conn:
+            refresh_views(conn)
+        record.rows_in = record.rows_out = sum(rows for rows, _ in results.values())
+
+    mark_published("postgres", tables)
+    return results
+
+
+# ============================================================
+# INCREMENTAL UPSERT
+# ============================================================
+
+def upsert_sql(table_name, source):
+    """INSERT ... ON CONFLICT on the primary key, updating every other column."""
+    columns = column_names(table_name)
+    key = PRIMARY_KEYS[table_name]
+    updates = ", ".join(f'"{c}" = EXCLUDED."{c}"' for c in columns if c not in key)
+    return (
+        f"INSERT INTO {qualified(table_name)} ({column_list(table_name)}) "
+        f"SELECT {column_list(table_name)} FROM \"{source}\" "
+        f"ON CONFLICT ({', '.join(key)}) DO UPDATE SET {updates}"
+    )
+
+
+def upsert_table(cur, table_name, batches):
+    """Stage rows in a temp table and merge them into `table_name`."""
+    delta = f"{table_name}_delta"
+    cur.execute(f'CREATE TEMP TABLE "{delta}" (LIKE {qualified(table_name)}) ON COMMIT DROP')
+    rows = copy_batches(cur, f'"{delta}"', table_name, batches)
+    cur.execute(upsert_sql(table_name, delta))
+    return rows
 
-    print(f"Loaded {len(df)} rows into tmdb.{table_name}")
+
+def credited_people(changed, folder=CLEAN_DIR):
+    """person_ids in the cast / crew rows matching `changed`."""
+    ids = set()
+    for table_name in ("cast", "crew"):
+        for batch in iter_clean_batches(table_name, folder, BATCH_SIZE, changed):
+            ids.update(pc.unique(batch["person_id"]).to_pylist())
+    ids.discard(None)
+    return sorted(ids)
+
+
+def upsert_movies(movie_ids, folder=CLEAN_DIR):
+    """
+    Apply an incremental extract: upsert the changed movies and the people
+    they credit, and replace their genres, cast and crew rows, all in one
+    transaction. Changed movies absent from the clean layer (removed on
+    TMDB) are deleted. Readers see either the old or the new state of
+    every movie, never a gap.
+    """
+    movie_ids = sorted(set(movie_ids))
+    print(f"📄 Upserting {len(movie_ids)} changed movies from {folder} ...")
+
+    with engine.begin() as conn:
+        create_schema(conn)
+
+    changed = pc.field("movie_id").isin(movie_ids)
+    counts = {}
+    start = time.perf_counter()
+
+    with METRICS.stage("upsert_postgres") as record:
+        conn = engine.raw_connection()
+        try:
+            with conn.cursor() as cur:
+                for table_name in LOOKUP_TABLES:
+                    counts[table_name] = upsert_table(cur, table_name, iter_clean_batches(table_name, folder, BATCH_SIZE))
+                counts["movies"] = upsert_table(cur, "movies", iter_clean_batches("movies", folder, BATCH_SIZE, changed))
+
+                credited = pc.field("person_id").isin(credited_people(changed, folder))
+                counts["people"] = upsert_table(cur, "people", iter_clean_batches("people", folder, BATCH_SIZE, credited))
+
+                for table_name in CHILD_TABLES:
+                    cur.execute(f"DELETE FROM {qualified(table_name)} WHERE movie_id = ANY(%s)", (movie_ids,))
+                    counts[table_name] = copy_batches(
+                        cur, qualified(table_name), table_name, iter_clean_batches(table_name, folder, BATCH_SIZE, changed)
+                    )
+
+                # Changed movies missing from the clean layer were removed on TMDB (404).
+                present = {
+                    movie_id
+                    for batch in iter_clean_batches("movies", folder, BATCH_SIZE, changed)
+                    for movie_id in batch.column("movie_id").to_pylist()
+                }
+                removed = [movie_id for movie_id in movie_ids if movie_id not in present]
+                if removed:
+                    cur.execute(f"DELETE FROM {qualified('movies')} WHERE movie_id = ANY(%s)", (removed,))
+                    print(f"[WARN] Deleted {len(removed)} movies no longer on TMDB")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        record.rows_in = record.rows_out = sum(counts.values())
+
+    elapsed = time.perf_counter() - start
+    for table_name, rows in counts.items():
+        print(f"Upserted {rows} rows into {SCHEMA}.{table_name}")
+    print(f"[OK] Upsert committed in {elapsed:.1f}s")
+
+    with engine.begin() as conn:
+        refresh_views(conn)
+
+    mark_published("postgres", counts)
+
+    return counts
+
+
+def load_changed_ids(path=CHANGED_IDS_PATH):
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
 
 
 # ============================================================
@@ -60,15 +383,29 @@ def load_csv(table_name, filename):
 # ============================================================
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tables", nargs="+", choices=TABLES, default=TABLES, help="Tables to load")
+    parser.add_argument("--workers", type=int, default=LOAD_WORKERS, help="Tables loaded in parallel")
+    parser.add_argument("--upsert", action="store_true",
+                        help="Only apply the movies listed in changed_ids.json (after extract_tmdb --incremental)")
+    parser.add_argument("--ids-file", type=Path, default=CHANGED_IDS_PATH, help="Changed movie ids for --upsert")
+    args = parser.parse_args()
+
     print("\n=== TMDB LOAD STARTED ===")
 
-    load_csv("movies", "movies.csv")
-    load_csv("genres", "genres.csv")
-    load_csv("movie_genres", "movie_genres.csv")
-    load_csv("cast", "cast.csv")
-    load_csv("crew", "crew.csv")
+    if args.upsert:
+        movie_ids = load_changed_ids(args.ids_file)
+        if movie_ids is None:
+            print(f"[ERROR] {args.ids_file} not found. Run extract_tmdb --incremental, or a full load.")
+            return
+        upsert_movies(movie_ids, CLEAN_DIR)
+    else:
+        results = load_all(args.tables, CLEAN_DIR, args.workers)
+        rows = sum(r for r, _ in results.values())
+        print(f"\n[OK] {rows} rows in {len(results)} tables")
 
     print("\n=== TMDB LOAD FINISHED ===")
+    METRICS.write_report("load_postgres")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,43 @@
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .storage import write_checkpoint, read_checkpoint
+
+# ============================================================
+# PUBLISH MARKER
+# ============================================================
+
+# Written by the loaders every time they publish new data to a target
+# ("postgres", "bigquery"). Caches of query results use it as part of
+# their data version, so a new load invalidates them.
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+PUBLISH_DIR = BASE_DIR / "data" / "processed"
+
+
+def publish_path(target, folder=PUBLISH_DIR):
+    # One file per target: the pipeline runs the Postgres and BigQuery
+    # loads side by side, and a shared file would let one overwrite the
+    # other's record.
+    return Path(folder) / f"published.{target}.json"
+
+
+def mark_published(target, tables, folder=PUBLISH_DIR):
+    """Record a new load run for `target` and return its run id."""
+    path = publish_path(target, folder)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    run_id = uuid.uuid4().hex
+    write_checkpoint(path, {
+        "run_id": run_id,
+        "published_at": datetime.now(timezone.utc).isoformat(),
+        "tables": sorted(tables),
+    })
+
+    print(f"[OK] Published {target} run {run_id[:8]}")
+    return run_id
+
+
+def read_published(target, folder=PUBLISH_DIR):
+    """Last publish record for `target`, or None if nothing was published yet."""
+    return read_checkpoint(publish_path(target, folder))
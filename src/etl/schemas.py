@@ -0,0 +1,185 @@
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+CLEAN_DIR = BASE_DIR / "data" / "clean"
+
+# Low-cardinality text stored as dictionary-encoded columns.
+CATEGORY = pa.dictionary(pa.int32(), pa.string())
+
+# ============================================================
+# CLEAN TABLE SCHEMAS
+# ============================================================
+
+SCHEMAS = {
+    "movies": pa.schema([
+        pa.field("movie_id", pa.int32(), nullable=False),
+        ("title", pa.string()),
+        ("original_title", pa.string()),
+        ("overview", pa.string()),
+        ("release_date", pa.date32()),
+        ("runtime", pa.int32()),
+        ("popularity", pa.float64()),
+        ("vote_average", pa.float64()),
+        ("vote_count", pa.int32()),
+        ("budget", pa.int64()),
+        ("revenue", pa.int64()),
+        ("original_language", CATEGORY),
+    ]),
+    "genres": pa.schema([
+        pa.field("genre_id", pa.int32(), nullable=False),
+        ("name", pa.string()),
+    ]),
+    "movie_genres": pa.schema([
+        pa.field("movie_id", pa.int32(), nullable=False),
+        pa.field("genre_id", pa.int32(), nullable=False),
+    ]),
+    # Cast and crew hold ids and codes only: names live once per person in
+    # people, department / job text in the departments / jobs lookups.
+    "people": pa.schema([
+        pa.field("person_id", pa.int32(), nullable=False),
+        ("name", pa.string()),
+        ("gender", pa.int8()),
+    ]),
+    "departments": pa.schema([
+        pa.field("department_id", pa.int16(), nullable=False),
+        ("name", pa.string()),
+    ]),
+    "jobs": pa.schema([
+        pa.field("job_id", pa.int16(), nullable=False),
+        ("name", pa.string()),
+    ]),
+    "cast": pa.schema([
+        pa.field("movie_id", pa.int32(), nullable=False),
+        ("cast_id", pa.int32()),
+        ("person_id", pa.int32()),
+        ("character", CATEGORY),
+        ("order", pa.int16()),
+    ]),
+    "crew": pa.schema([
+        pa.field("movie_id", pa.int32(), nullable=False),
+        ("person_id", pa.int32()),
+        ("department_id", pa.int16()),
+        ("job_id", pa.int16()),
+    ]),
+}
+
+# movies is written as a hive-partitioned dataset: movies/release_year=YYYY/
+PARTITION_COLUMN = {"movies": "release_year"}
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+# ============================================================
+# CONVERSION
+# ============================================================
+
+def parse_dates(column):
+    """YYYY-MM-DD strings -> date32; anything unparseable becomes null."""
+    return pc.cast(pc.strptime(column.cast(pa.string()), "%Y-%m-%d", "s", error_is_null=True), pa.date32())
+
+
+def to_arrow(table, df):
+    """Convert a clean-table DataFrame to an Arrow table with its explicit schema."""
+    schema = SCHEMAS[table]
+    arrays = []
+
+    for field in schema:
+        column = pa.array(df[field.name], from_pandas=True)
+
+        if field.type == pa.date32():
+            column = parse_dates(column)
+        elif field.type == CATEGORY and pa.types.is_dictionary(column.type):
+            column = column.cast(CATEGORY)  # a pandas categorical, already encoded
+        elif field.type == CATEGORY:
+            column = pc.dictionary_encode(column.cast(pa.string()))
+        else:
+            column = column.cast(field.type)
+
+        arrays.append(column)
+
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def partition_values(table, arrow_table):
+    """Partition key of every row (None for unpartitioned tables)."""
+    if table != "movies":
+        return None
+    return pc.year(arrow_table["release_date"])
+
+
+# ============================================================
+# READING
+# ============================================================
+
+def clean_path(table, folder=CLEAN_DIR, fmt="parquet"):
+    if fmt == "csv":
+        return Path(folder) / f"{table}.csv"
+    if table in PARTITION_COLUMN:
+        return Path(folder) / table
+    return Path(folder) / f"{table}.parquet"
+
+
+def read_clean_table(table, folder=CLEAN_DIR, columns=None):
+    """
+    Read a clean table as Arrow with its declared schema.
+
+    Partitioned tables are read across all partitions (the partition column
+    is dropped). Falls back to the CSV layer if no Parquet output exists.
+    """
+    columns = columns or SCHEMAS[table].names
+    path = clean_path(table, folder)
+
+    if path.exists():
+        return pq.read_table(path, columns=columns, partitioning="hive")
+
+    csv_path = clean_path(table, folder, "csv")
+    if not csv_path.exists():
+        raise FileNotFoundError(f"Missing clean table '{table}' in {folder}")
+
+    df = pd.read_csv(csv_path, dtype={"release_date": "string"}, keep_default_na=True)
+    return to_arrow(table, df).select(columns)
+
+
+def iter_clean_batches(table, folder=CLEAN_DIR, batch_size=65536, filter=None):
+    """
+    Stream a clean table as Arrow record batches (Parquet, or the CSV layer
+    as a fallback). `filter` is an optional pyarrow.compute expression,
+    e.g. pc.field("movie_id").isin(ids).
+    """
+    columns = SCHEMAS[table].names
+    path = clean_path(table, folder)
+
+    if path.exists():
+        dataset = ds.dataset(path, format="parquet", partitioning="hive")
+        yield from dataset.to_batches(columns=columns, filter=filter, batch_size=batch_size)
+        return
+
+    csv_path = clean_path(table, folder, "csv")
+    if not csv_path.exists():
+        raise FileNotFoundError(f"Missing clean table '{table}' in {folder}")
+
+    for df in pd.read_csv(csv_path, dtype={"release_date": "string"}, chunksize=batch_size):
+        chunk = to_arrow(table, df)
+        if filter is not None:
+            chunk = chunk.filter(filter)
+        yield from chunk.to_batches()
+
+
+def read_clean_frame(table, folder=CLEAN_DIR, columns=None):
+    """Read a clean table into pandas (categoricals decoded to plain strings)."""
+    df = read_clean_table(table, folder, columns).to_pandas(types_mapper={
+        pa.int8(): pd.Int8Dtype(),
+        pa.int16(): pd.Int16Dtype(),
+        pa.int32(): pd.Int32Dtype(),
+        pa.int64(): pd.Int64Dtype(),
+    }.get)
+
+    for column in df.select_dtypes("category"):
+        df[column] = df[column].astype(object)
+
+    return df
@@ -0,0 +1,313 @@
+import io
+import os
+import gzip
+import json
+from pathlib import Path
+
+# ============================================================
+# FORMATS
+# ============================================================
+
+COMPRESSION_SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+# Lookup order when locating an existing store (legacy JSON list last).
+STORE_SUFFIXES = [".ndjson", ".ndjson.gz", ".ndjson.zst", ".json"]
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("zstd compression requires the 'zstandard' package (pip install zstandard)") from e
+    return zstandard
+
+
+def compression_of(path):
+    name = str(path)
+    if name.endswith(".gz"):
+        return "gzip"
+    if name.endswith(".zst"):
+        return "zstd"
+    return "none"
+
+
+def ndjson_path(folder, name, compression="none"):
+    return Path(folder) / f"{name}.ndjson{COMPRESSION_SUFFIXES[compression]}"
+
+
+def find_store(folder, name):
+    """Return the existing `name` store in `folder` (any supported format), or None."""
+    for suffix in STORE_SUFFIXES:
+        path = Path(folder) / f"{name}{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+def remove_stores(folder, name, keep=None):
+    """Delete every `name` store in `folder` except `keep` (e.g. after a format change)."""
+    for suffix in STORE_SUFFIXES:
+        path = Path(folder) / f"{name}{suffix}"
+        if path != keep and path.exists():
+            path.unlink()
+
+
+# ============================================================
+# WRITING
+# ============================================================
+
+class NDJSONWriter:
+    """
+    Append-only newline-delimited JSON writer (plain, gzip or zstd).
+
+    sync() ends the current gzip member / zstd frame, flushes and fsyncs,
+    and returns the committed byte size. Truncating the file back to that
+    size always leaves a valid, readable file, which is what makes
+    checkpoints crash-safe.
+    """
+
+    def __init__(self, path, truncate_to=0):
+        self.path = Path(path)
+        self.compression = compression_of(self.path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.raw = open(self.path, "ab")
+        self.raw.truncate(truncate_to)
+        self.raw.seek(0, io.SEEK_END)
+        self.stream = None
+        self.records = 0
+
+    def _open_stream(self):
+        if self.compression == "gzip":
+            return gzip.GzipFile(fileobj=self.raw, mode="ab")
+        if self.compression == "zstd":
+            return _zstd().ZstdCompressor().stream_writer(self.raw, closefd=False)
+        return self.raw
+
+    def write(self, record):
+        if self.stream is None:
+            self.stream = self._open_stream()
+
+        self.stream.write(json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n")
+        self.records += 1
+
+    def write_encoded(self, data, records):
+        """Append `records` already-encoded NDJSON lines (bytes)."""
+        if self.stream is None:
+            self.stream = self._open_stream()
+
+        self.stream.write(data)
+        self.records += records
+
+    def sync(self):
+        # Ending the gzip member / zstd frame here (a new one starts on the
+        # next write) keeps the committed prefix self-contained.
+        if self.stream is not None and self.stream is not self.raw:
+            self.stream.close()
+        self.stream = None
+
+        self.raw.flush()
+        os.fsync(self.raw.fileno())
+        return self.raw.tell()
+
+    def close(self):
+        size = self.sync()
+        self.raw.close()
+        return size
+
+
+def write_checkpoint(path, state):
+    """Atomically replace a JSON checkpoint file."""
+    path = Path(path)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp, path)
+
+
+def read_checkpoint(path):
+    path = Path(path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+class CheckpointedOutput:
+    """
+    A set of NDJSON outputs committed together under one checkpoint file.
+
+    The checkpoint stores the committed size of every output plus any extra
+    `state` the caller passes. Opening with resume=True after a crash
+    truncates each output back to its committed size and restores `state`;
+    otherwise (or after a completed run) the outputs start empty.
+    """
+
+    def __init__(self, checkpoint_path, paths, resume=True):
+        self.checkpoint_path = Path(checkpoint_path)
+        self.state = {}
+        self.resumed = False
+
+        checkpoint = read_checkpoint(self.checkpoint_path) if resume else None
+        sizes = {name: 0 for name in paths}
+
+        if checkpoint and not checkpoint.get("done"):
+            committed = checkpoint["sizes"]
+            intact = all(
+                name in committed and Path(path).exists() and Path(path).stat().st_size >= committed[name]
+                for name, path in paths.items()
+            )
+
+            if intact:
+                sizes = committed
+                self.state = checkpoint.get("state", {})
+                self.resumed = True
+            else:
+                print(f"[WARN] Outputs are shorter than {self.checkpoint_path.name}. Starting over.")
+
+        self.writers = {name: NDJSONWriter(path, truncate_to=sizes[name]) for name, path in paths.items()}
+
+    def write(self, name, record):
+        self.writers[name].write(record)
+
+    def checkpoint(self, done=False, **state):
+        self.state.update(state)
+        sizes = {name: writer.sync() for name, writer in self.writers.items()}
+        write_checkpoint(self.checkpoint_path, {"sizes": sizes, "state": self.state, "done": done})
+
+    def close(self, done=True, **state):
+        self.checkpoint(done=done, **state)
+        for writer in self.writers.values():
+            writer.close()
+
+
+# ============================================================
+# READING
+# ============================================================
+
+def open_text(path):
+    """Open a plain, .gz or .zst file as a text stream."""
+    compression = compression_of(path)
+
+    if compression == "gzip":
+        return gzip.open(path, "rt", encoding="utf-8")
+    if compression == "zstd":
+        raw = open(path, "rb")
+        reader = _zstd().ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        return io.TextIOWrapper(reader, encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def read_lines(path):
+    """
+    Stream the raw JSON lines of an NDJSON store.
+
+    Every record the writer emits ends with a newline, so a last line
+    without one (or a truncated compressed tail), left by a crash after the
+    last checkpoint, is dropped instead of raising.
+    """
+    path = Path(path)
+
+    with open_text(path) as f:
+        try:
+            for line in f:
+                if not line.endswith("\n"):
+                    print(f"[WARN] Ignoring torn last line in {path.name}")
+                    break
+                if line.strip():
+                    yield line
+        except EOFError:
+            print(f"[WARN] Ignoring truncated tail of {path.name}")
+
+
+def read_records(path):
+    """Stream records from an NDJSON store (or a legacy JSON list)."""
+    path = Path(path)
+
+    if path.suffix == ".json":
+        yield from json.loads(path.read_text(encoding="utf-8"))
+        return
+
+    for line in read_lines(path):
+        yield json.loads(line)
+
+
+def read_raw(paths):
+    """
+    Stream unparsed NDJSON lines from several stores (records as-is for a
+    legacy JSON list), so parsing can happen in worker processes.
+    """
+    for path in paths:
+        path = Path(path)
+        if path.suffix == ".json":
+            yield from read_records(path)
+        else:
+            yield from read_lines(path)
+
+
+def read_many(paths):
+    """Stream records from several stores, one after the other."""
+    for path in paths:
+        yield from read_records(path)
+
+
+def unique_records(records):
+    """
+    Drop records whose id was already seen, so stores that overlap (a movie
+    both in the processed store and in a catalog shard) yield it once; the
+    first store read wins. Only ids are held in memory.
+    """
+    seen = set()
+    for record in records:
+        if record["id"] not in seen:
+            seen.add(record["id"])
+            yield record
+
+
+def existing_ids(path):
+    """Set of record ids already in a store (empty if it does not exist)."""
+    if path is None or not Path(path).exists():
+        return set()
+    return {record["id"] for record in read_records(path)}
+
+
+def merge_store(path, delta_path, removed=()):
+    """
+    Stream a store into a new file, replacing records by `id` with those
+    in the `delta_path` store and dropping the ids in `removed`.
+
+    Replaced records are appended after the others. Unchanged lines are
+    copied as they are, and only ids are held in memory. The new file
+    replaces the old one atomically. A legacy JSON list is converted to
+    NDJSON on the way. Returns the path of the new store.
+    """
+    path = Path(path)
+    dropped = set(removed) | existing_ids(delta_path)
+    target = path.with_suffix(".ndjson") if path.suffix == ".json" else path
+    tmp = target.with_name(target.name.replace(".ndjson", ".rewrite.ndjson"))
+
+    writer = NDJSONWriter(tmp)
+    if path.exists():
+        for item in read_raw([path]):
+            record = json.loads(item) if isinstance(item, str) else item
+            if record["id"] in dropped:
+                continue
+            if isinstance(item, str):
+                writer.write_encoded(item.encode("utf-8"), 1)
+            else:
+                writer.write(item)
+
+    if Path(delta_path).exists():
+        for line in read_lines(delta_path):
+            writer.write_encoded(line.encode("utf-8"), 1)
+
+    writer.close()
+    os.replace(tmp, target)
+
+    if target != path:
+        path.unlink()
+
+    return target
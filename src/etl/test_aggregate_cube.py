@@ -0,0 +1,86 @@
+import json
+import shutil
+
+import pandas as pd
+import pytest
+
+from conftest import transform_synthetic
+from src.analytics import helpers
+from src.analytics.local_backend import LocalBackend, comparable
+from src.etl.aggregate_cube import read_cube, rollup
+from src.etl.schemas import read_clean_frame
+from src.etl.storage import NDJSONWriter, ndjson_path, read_records
+
+
+def edit_catalog(raw, folder):
+    """
+    Copy of the synthetic stores after an incremental extract: some movies
+    changed, one was removed on TMDB and one is new. Returns the changed ids.
+    """
+    shutil.copytree(raw, folder)
+    details = list(read_records(ndjson_path(raw, "details")))
+    first, second, third, removed = details[:4]
+
+    first["popularity"] = (first.get("popularity") or 0) * 3 + 1
+    second["genres"] = []
+    third["release_date"] = "1931-05-06"
+    new = {**first, "id": 10 ** 6, "genres": [{"id": 18, "name": "Drama"}]}
+
+    writer = NDJSONWriter(ndjson_path(folder, "details"))
+    for record in details:
+        if record is not removed:
+            writer.write(record)
+    writer.write(new)
+    writer.close()
+
+    return [first["id"], second["id"], third["id"], removed["id"], new["id"]]
+
+
+def table(name, folder, keys):
+    return read_clean_frame(name, folder).sort_values(keys).reset_index(drop=True)
+
+
+def test_incremental_transform_matches_full(synthetic_raw, synthetic_clean, tmp_path):
+    raw = tmp_path / "raw"
+    changed = edit_catalog(synthetic_raw, raw)
+
+    incremental = tmp_path / "incremental"
+    shutil.copytree(synthetic_clean, incremental)
+    transform_synthetic(raw, incremental, changed_ids=changed)
+    full = transform_synthetic(raw, tmp_path / "full")
+
+    pd.testing.assert_frame_equal(table("movies", incremental, ["movie_id"]), table("movies", full, ["movie_id"]))
+    pd.testing.assert_frame_equal(
+        table("movie_genres", incremental, ["movie_id", "genre_id"]), table("movie_genres", full, ["movie_id", "genre_id"])
+    )
+    assert changed[3] not in set(read_clean_frame("movies", incremental)["movie_id"])
+
+    # Counts must match exactly; float sums only up to summation order.
+    pd.testing.assert_frame_equal(read_cube(incremental), read_cube(full), rtol=1e-9)
+
+
+@pytest.mark.parametrize("min_year, max_year", [(None, None), (1990, None), (None, 1985), (2000, 2010)])
+def test_rollup_matches_the_metrics_rollup_query(synthetic_clean, monkeypatch, min_year, max_year):
+    monkeypatch.setattr(helpers, "LOCAL_BACKEND", LocalBackend(synthetic_clean))
+    query = helpers.run_query("METRICS_ROLLUP", backend="local", min_year=min_year, max_year=max_year)
+
+    cube = rollup(read_cube(synthetic_clean), read_clean_frame("genres", synthetic_clean), min_year, max_year)
+
+    assert list(cube.columns) == list(query.columns)
+    pd.testing.assert_frame_equal(comparable(cube), comparable(query), rtol=1e-9)
+
+
+def test_changed_ids_file_missing_falls_back_to_a_full_transform(synthetic_raw, tmp_path, monkeypatch, capsys):
+    from src.etl import transform_tmdb
+
+    calls = []
+    monkeypatch.setattr(transform_tmdb, "run_transform", lambda *args, **kwargs: calls.append(kwargs))
+    monkeypatch.setattr(transform_tmdb.METRICS, "write_report", lambda stage: None)
+    monkeypatch.setattr("sys.argv", ["transform_tmdb", "--changed-ids", str(tmp_path / "changed_ids.json")])
+    transform_tmdb.main()
+    assert calls[0]["changed_ids"] is None
+    assert "rebuilding the clean layer and the cube in full" in capsys.readouterr().out
+
+    (tmp_path / "changed_ids.json").write_text(json.dumps([1, 2]))
+    transform_tmdb.main()
+    assert calls[1]["changed_ids"] == [1, 2]
@@ -0,0 +1,153 @@
+import gzip
+import json
+from datetime import date
+
+import pytest
+
+from conftest import STUB_MOVIES
+from src.etl import catalog_ingest
+from src.etl.catalog_ingest import ingest_catalog, shard_checkpoint_path
+from src.etl.schemas import read_clean_frame
+from src.etl.storage import NDJSONWriter, ndjson_path, read_checkpoint, read_records
+from src.etl.transform_tmdb import default_inputs, transform_details
+from src.etl.utils_api import TMDBApiError
+
+NUM_SHARDS = 2
+
+# Ids the stub does not know (404 on every attempt).
+MISSING = [100_001, 100_002]
+
+
+def write_export(path, ids, adult=()):
+    lines = [json.dumps({"adult": movie_id in adult, "id": movie_id, "original_title": f"Movie {movie_id}"})
+             for movie_id in ids]
+    path.write_bytes(gzip.compress("\n".join(lines).encode("utf-8") + b"\n"))
+    return path
+
+
+@pytest.fixture
+def export(tmp_path):
+    return write_export(tmp_path / "movie_ids_01_02_2025.json.gz", list(range(1, 41)) + MISSING, adult={13})
+
+
+def ingested_ids(folder):
+    ids = []
+    for shard in range(NUM_SHARDS):
+        prefix = catalog_ingest.shard_prefix(shard, NUM_SHARDS)
+        ids += [r["id"] for r in read_records(ndjson_path(folder, f"{prefix}.details"))]
+    return ids
+
+
+def shard_state(folder, shard):
+    return read_checkpoint(shard_checkpoint_path(shard, NUM_SHARDS, folder))
+
+
+def test_download_export_from_stub(tmdb, tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog_ingest, "EXPORT_URL", tmdb.replace("/3", "/p/exports"))
+    path = catalog_ingest.download_export(date(2025, 1, 2), tmp_path)
+
+    assert path.name == "movie_ids_01_02_2025.json.gz"
+    assert list(catalog_ingest.iter_export_ids(path)) == list(range(1, STUB_MOVIES + 1))
+
+
+def test_ingest_records_failed_ids(tmdb, export, tmp_path):
+    folder = tmp_path / "catalog"
+    assert ingest_catalog(export, NUM_SHARDS, max_workers=2, folder=folder) == (39, 2)
+
+    expected = [i for i in range(1, 41) if i != 13]
+    assert sorted(ingested_ids(folder)) == expected
+
+    failed = sorted(sum((shard_state(folder, s)["state"]["failed"] for s in range(NUM_SHARDS)), []))
+    assert failed == MISSING
+    assert all(shard_state(folder, s)["done"] for s in range(NUM_SHARDS))
+
+    # A finished shard fetches nothing but still reports its failing ids.
+    assert ingest_catalog(export, NUM_SHARDS, max_workers=2, folder=folder) == (0, 2)
+
+
+def test_resume_after_crash(tmdb, export, tmp_path, monkeypatch):
+    folder = tmp_path / "catalog"
+    fetch_movie = catalog_ingest.fetch_movie
+    monkeypatch.setattr(catalog_ingest, "CHECKPOINT_EVERY", 5)
+
+    def crash_on_31(movie_id):
+        if movie_id == 31:
+            raise RuntimeError("worker killed")
+        return fetch_movie(movie_id)
+
+    monkeypatch.setattr(catalog_ingest, "fetch_movie", crash_on_31)
+    with pytest.raises(RuntimeError):
+        ingest_catalog(export, NUM_SHARDS, shards=[1], max_workers=1, folder=folder)
+
+    state = shard_state(folder, 1)
+    assert not state["done"] and 0 < state["state"]["position"] < 20
+    prefix = catalog_ingest.shard_prefix(1, NUM_SHARDS)
+    committed = {r["id"] for r in read_records(ndjson_path(folder, f"{prefix}.details"))}
+
+    calls = []
+    monkeypatch.setattr(catalog_ingest, "fetch_movie", lambda movie_id: calls.append(movie_id) or fetch_movie(movie_id))
+    ingest_catalog(export, NUM_SHARDS, max_workers=2, folder=folder)
+
+    ids = ingested_ids(folder)
+    assert sorted(ids) == [i for i in range(1, 41) if i != 13]
+    assert len(ids) == len(set(ids))
+    assert committed and not committed & set(calls)
+
+
+def test_transient_failures_are_retried(tmdb, export, tmp_path, monkeypatch):
+    folder = tmp_path / "catalog"
+    fetch_movie = catalog_ingest.fetch_movie
+    attempts = {}
+
+    def flaky(movie_id):
+        attempts[movie_id] = attempts.get(movie_id, 0) + 1
+        if movie_id in (4, 7) and attempts[movie_id] == 1:
+            raise TMDBApiError("Failed after 3 attempts")
+        return fetch_movie(movie_id)
+
+    monkeypatch.setattr(catalog_ingest, "fetch_movie", flaky)
+    ingest_catalog(export, NUM_SHARDS, max_workers=2, folder=folder)
+
+    ids = ingested_ids(folder)
+    assert sorted(ids) == [i for i in range(1, 41) if i != 13]
+    assert len(ids) == len(set(ids))
+    assert attempts[4] == attempts[7] == 2
+
+
+def test_new_export_starts_over(tmdb, export, tmp_path):
+    folder = tmp_path / "catalog"
+    ingest_catalog(export, NUM_SHARDS, max_workers=2, folder=folder)
+
+    # Same shard layout, but the next day's export is a different catalog.
+    newer = write_export(tmp_path / "movie_ids_01_03_2025.json.gz", range(41, 61))
+    ingest_catalog(newer, NUM_SHARDS, max_workers=2, folder=folder)
+
+    assert sorted(ingested_ids(folder)) == list(range(41, 61))
+    assert {shard_state(folder, s)["state"]["export"] for s in range(NUM_SHARDS)} == {newer.name}
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_transform_reads_the_catalog_shards(tmdb, export, tmp_path, workers):
+    processed, catalog = tmp_path / "processed", tmp_path / "processed" / "catalog"
+    ingest_catalog(export, NUM_SHARDS, max_workers=2, folder=catalog)
+
+    # The processed store refreshed two of the shards' movies and has one of its own.
+    writer = NDJSONWriter(ndjson_path(processed, "details"))
+    for record in read_records(ndjson_path(catalog, f"{catalog_ingest.shard_prefix(0, NUM_SHARDS)}.details")):
+        if record["id"] in (2, 4):
+            writer.write({**record, "title": "Refreshed"})
+    writer.write({**record, "id": 500, "title": "Popular only"})
+    writer.close()
+
+    paths = default_inputs("details", processed, catalog)
+    assert paths[0] == ndjson_path(processed, "details") and len(paths) == 1 + NUM_SHARDS
+
+    transform_details(paths, chunk_size=7, folder=tmp_path / "clean", workers=workers)
+    movies = read_clean_frame("movies", tmp_path / "clean").set_index("movie_id")["title"]
+    assert sorted(movies.index) == [i for i in range(1, 41) if i != 13] + [500]
+    assert movies[2] == movies[4] == "Refreshed" and movies[6] != "Refreshed"
+
+
+def test_default_inputs_needs_a_store(tmp_path):
+    with pytest.raises(FileNotFoundError, match="Missing details store"):
+        default_inputs("details", tmp_path, tmp_path / "catalog")
@@ -0,0 +1,55 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from conftest import transform_synthetic
+from src.etl.dimensions import CodeBook, PersonSet
+from src.etl.schemas import clean_path, read_clean_frame
+
+
+def categories(*names):
+    return pd.Series(list(names), dtype="category")
+
+
+def test_codes_are_stable_across_runs(synthetic_raw, synthetic_clean, tmp_path):
+    folder = shutil.copytree(synthetic_clean, tmp_path / "clean")
+    transform_synthetic(synthetic_raw, folder)
+
+    for table in ("jobs", "departments", "crew", "people"):
+        pd.testing.assert_frame_equal(read_clean_frame(table, folder), read_clean_frame(table, synthetic_clean))
+
+
+def test_new_category_appends_without_renumbering(synthetic_clean):
+    book = CodeBook("jobs", synthetic_clean)
+    before = dict(book.codes)
+    known = sorted(before)[:2]
+
+    codes = book.encode(categories(known[1], "Brand New Job", known[0], None))
+
+    assert codes.tolist() == [before[known[1]], max(before.values()) + 1, before[known[0]], pd.NA]
+    assert {name: book.codes[name] for name in before} == before
+    assert book.frame()["job_id"].tolist() == list(range(len(before) + 1))
+
+
+def test_csv_layer_reads_back_its_own_lookup(synthetic_raw, tmp_path):
+    folder = transform_synthetic(synthetic_raw, tmp_path / "clean", fmt="csv")
+    jobs = pd.read_csv(clean_path("jobs", folder, "csv"))
+    assert CodeBook("jobs", folder, "csv").codes == dict(zip(jobs["name"], jobs["job_id"]))
+
+    # A stale Parquet lookup with other codes next to the CSV layer is ignored.
+    shuffled = jobs.assign(job_id=jobs["job_id"].to_numpy()[::-1]).astype({"job_id": "int16"})
+    shuffled.to_parquet(clean_path("jobs", folder), index=False)
+    transform_synthetic(synthetic_raw, folder, fmt="csv")
+
+    pd.testing.assert_frame_equal(pd.read_csv(clean_path("jobs", folder, "csv")), jobs)
+
+
+def test_person_set_marks_each_id_once():
+    people = PersonSet()
+
+    assert people.add(np.array([3, 1])).tolist() == [True, True]
+    # Growing the bitmap keeps the ids already seen.
+    assert people.add(np.array([1, 1000, 3, 2])).tolist() == [False, True, False, True]
+    assert people.add(np.array([], dtype="int64")).tolist() == []
+    assert people.add(np.array([1000, 2])).tolist() == [False, False]
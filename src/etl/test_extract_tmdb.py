@@ -0,0 +1,132 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from conftest import STUB_MOVIES, stub_stats
+from src.bench.stub_server import StubTMDB
+from src.bench.synthetic import movie
+from src.etl import extract_tmdb, utils_api
+from src.etl.storage import NDJSONWriter, ndjson_path, read_records
+
+
+@pytest.fixture
+def processed(tmp_path, monkeypatch):
+    folder = tmp_path / "processed"
+    folder.mkdir()
+    monkeypatch.setattr(extract_tmdb, "PROCESSED_DIR", folder)
+    monkeypatch.setattr(extract_tmdb, "WATERMARK_PATH", folder / "watermark.json")
+    monkeypatch.setattr(extract_tmdb, "CHANGED_IDS_PATH", folder / "changed_ids.json")
+    monkeypatch.setattr(extract_tmdb, "CHECKPOINT_PATH", folder / "extract.checkpoint.json")
+    monkeypatch.setattr(extract_tmdb, "INCREMENTAL_CHECKPOINT_PATH", folder / "incremental.checkpoint.json")
+    return folder
+
+
+def write_store(folder, name, records):
+    writer = NDJSONWriter(ndjson_path(folder, name))
+    for record in records:
+        writer.write(record)
+    writer.close()
+
+
+def test_incremental_refetches_changed_movies_past_the_cache(tmdb, processed):
+    since = datetime.now(timezone.utc) - timedelta(days=3)
+    changed_id = StubTMDB(STUB_MOVIES).changed_ids(since.date(), datetime.now(timezone.utc).date())[0]
+
+    # The store and the response cache both hold the movie as it was before the change.
+    old = {"id": changed_id, "title": "Old title"}
+    write_store(processed, "details", [old, {"id": 999_999, "title": "Untouched"}])
+    write_store(processed, "credits", [{"id": changed_id, "cast": [], "crew": []}])
+    utils_api.CACHE.store(tmdb, f"/movie/{changed_id}", {"append_to_response": "credits"},
+                          {**old, "credits": {"cast": [], "crew": []}})
+    extract_tmdb.save_watermark(since)
+
+    extract_tmdb.extract_incremental(max_workers=2)
+
+    details = {r["id"]: r for r in read_records(ndjson_path(processed, "details"))}
+    expected, credits = movie(changed_id, STUB_MOVIES)
+    assert details[changed_id] == expected
+    assert details[999_999]["title"] == "Untouched"
+
+    stored_credits = {r["id"]: r for r in read_records(ndjson_path(processed, "credits"))}
+    assert stored_credits[changed_id]["cast"] == credits["cast"]
+
+    assert json.loads(extract_tmdb.CHANGED_IDS_PATH.read_text()) == [changed_id]
+    assert extract_tmdb.load_watermark() > since
+
+    # The refetch replaced the stale cache entry too.
+    assert utils_api.CACHE.lookup(tmdb, f"/movie/{changed_id}", {"append_to_response": "credits"}).data["title"] \
+        == expected["title"]
+
+
+def test_incremental_skips_changed_movies_outside_the_store(tmdb, processed):
+    write_store(processed, "details", [{"id": 999_999}])
+    write_store(processed, "credits", [{"id": 999_999, "cast": [], "crew": []}])
+    extract_tmdb.save_watermark(datetime.now(timezone.utc) - timedelta(days=3))
+
+    extract_tmdb.extract_incremental(max_workers=2)
+
+    assert json.loads(extract_tmdb.CHANGED_IDS_PATH.read_text()) == []
+    assert stub_stats(tmdb)["requests"] == 1  # only /movie/changes
+
+
+def test_incremental_drops_movies_tmdb_removed(tmdb, processed, monkeypatch):
+    # 999_999 is past the stub catalog, so TMDB answers it with 404.
+    write_store(processed, "details", [{"id": 1, "title": "Old"}, {"id": 999_999}])
+    write_store(processed, "credits", [{"id": 1, "cast": [], "crew": []}, {"id": 999_999, "cast": [], "crew": []}])
+    extract_tmdb.save_watermark(datetime.now(timezone.utc) - timedelta(days=3))
+    monkeypatch.setattr(extract_tmdb, "changed_movie_ids", lambda since, until: {1, 999_999})
+
+    extract_tmdb.extract_incremental(max_workers=2)
+
+    assert [r["id"] for r in read_records(ndjson_path(processed, "details"))] == [1]
+    assert [r["id"] for r in read_records(ndjson_path(processed, "credits"))] == [1]
+    assert json.loads(extract_tmdb.CHANGED_IDS_PATH.read_text()) == [1, 999_999]
+    assert sorted(path.name for path in processed.iterdir()) == [
+        "changed_ids.json", "credits.ndjson", "details.ndjson", "incremental.checkpoint.json", "watermark.json",
+    ]
+
+
+def test_incremental_resumes_after_a_crash(tmdb, processed, monkeypatch):
+    write_store(processed, "details", [{"id": i} for i in range(1, 6)])
+    write_store(processed, "credits", [{"id": i, "cast": [], "crew": []} for i in range(1, 6)])
+    since = datetime.now(timezone.utc) - timedelta(days=3)
+    extract_tmdb.save_watermark(since)
+    monkeypatch.setattr(extract_tmdb, "changed_movie_ids", lambda since, until: {1, 2, 3, 4, 5})
+    monkeypatch.setattr(extract_tmdb, "CHECKPOINT_EVERY", 1)
+
+    fetch = extract_tmdb.fetch_movie
+
+    def crash_on_4(movie_id, refresh=False):
+        if movie_id == 4:
+            raise KeyboardInterrupt
+        return fetch(movie_id, refresh)
+
+    monkeypatch.setattr(extract_tmdb, "fetch_movie", crash_on_4)
+    with pytest.raises(KeyboardInterrupt):
+        extract_tmdb.extract_incremental(max_workers=1)
+    assert extract_tmdb.load_watermark() == since
+
+    fetched = stub_stats(tmdb)["requests"]
+    monkeypatch.setattr(extract_tmdb, "fetch_movie", fetch)
+    extract_tmdb.extract_incremental(max_workers=1)
+
+    # Movies 1-3 came from the delta stores; only 4 and 5 were fetched again.
+    assert stub_stats(tmdb)["requests"] - fetched == 2
+    details = {r["id"]: r for r in read_records(ndjson_path(processed, "details"))}
+    assert sorted(details) == [1, 2, 3, 4, 5]
+    assert all(details[i] == movie(i, STUB_MOVIES)[0] for i in details)
+    assert json.loads(extract_tmdb.CHANGED_IDS_PATH.read_text()) == [1, 2, 3, 4, 5]
+
+
+def test_popular_details_limit(tmdb, processed, tmp_path, monkeypatch):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    (raw / "popular.json").write_text(json.dumps([{"id": i} for i in range(1, 11)]))
+    monkeypatch.setattr(extract_tmdb, "RAW_DIR", raw)
+
+    extract_tmdb.extract_popular_details(max_workers=2, limit=4)
+
+    assert sorted(r["id"] for r in read_records(ndjson_path(processed, "details"))) == [1, 2, 3, 4]
+    assert not extract_tmdb.CHANGED_IDS_PATH.exists()
+    assert extract_tmdb.load_watermark() is not None
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from conftest import stub_stats
+from src.etl import http_cache, utils_api
+from src.etl.http_cache import ResponseCache
+from src.etl.utils_api import TMDBApiError, request_tmdb
+from src.etl.utils_db import tmdb_get
+
+
+def test_second_request_is_served_from_cache(tmdb):
+    first = request_tmdb("/movie/5", params={"append_to_response": "credits"})
+    second = request_tmdb("/movie/5", params={"append_to_response": "credits"})
+
+    assert first == second
+    assert stub_stats(tmdb)["requests"] == 1
+    assert utils_api.CACHE.stats()["hits"] == 1
+
+
+def test_tmdb_get_shares_the_cache_and_errors(tmdb):
+    assert tmdb_get("/movie/5") == request_tmdb("/movie/5")
+    assert stub_stats(tmdb)["requests"] == 1
+
+    with pytest.raises(TMDBApiError):
+        tmdb_get("/movie/999999")
+
+
+def test_key_ignores_api_key_but_not_params():
+    base = http_cache.cache_key("u", "/movie/1", {"api_key": "a", "page": 1})
+    assert base == http_cache.cache_key("u", "/movie/1", {"page": 1, "api_key": "b"})
+    assert base != http_cache.cache_key("u", "/movie/1", {"page": 2})
+
+
+def test_changes_are_never_cached(tmdb):
+    request_tmdb("/movie/changes", params={"page": 1})
+    request_tmdb("/movie/changes", params={"page": 1})
+
+    assert stub_stats(tmdb)["requests"] == 2
+
+
+def test_stale_entry_is_revalidated_only_with_etag(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path / "cache.sqlite", enabled=True)
+    cache.store("u", "/movie/1", {}, {"id": 1}, etag='"v1"')
+    cache.store("u", "/movie/2", {}, {"id": 2})
+
+    later = http_cache.time.time() + 2 * http_cache.DAY
+    monkeypatch.setattr(http_cache.time, "time", lambda: later)
+
+    stale = cache.lookup("u", "/movie/1", {})
+    assert stale.data == {"id": 1} and not stale.fresh
+    assert cache.revalidation_headers(stale) == {"If-None-Match": '"v1"'}
+    assert cache.lookup("u", "/movie/2", {}) is None
+
+    cache.revalidated(stale)
+    assert cache.lookup("u", "/movie/1", {}).fresh
+
+
+def test_eviction_keeps_recently_used_entries(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite", max_bytes=4096, enabled=True)
+
+    for movie_id in range(40):
+        # Random text, so zlib cannot shrink the entries below the cap.
+        cache.store("u", f"/movie/{movie_id}", {}, {"id": movie_id, "overview": os.urandom(300).hex()})
+
+    assert cache.stats()["evicted"] > 0
+    assert cache.stats()["bytes"] <= 4096
+    assert cache.lookup("u", "/movie/39", {}) is not None
+    assert cache.lookup("u", "/movie/0", {}) is None
@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+from src.etl import instrumentation
+from src.etl.instrumentation import Metrics, StageRecord, endpoint_label
+
+EXPOSITION = """\
+# HELP tmdb_http_request_seconds TMDB HTTP request latency by endpoint.
+# TYPE tmdb_http_request_seconds histogram
+tmdb_http_request_seconds_bucket{run="extract",endpoint="/movie/{id}",le="0.05"} 0
+tmdb_http_request_seconds_bucket{run="extract",endpoint="/movie/{id}",le="0.1"} 1
+tmdb_http_request_seconds_bucket{run="extract",endpoint="/movie/{id}",le="0.25"} 1
+tmdb_http_request_seconds_bucket{run="extract",endpoint="/movie/{id}",le="0.5"} 2
+tmdb_http_request_seconds_bucket{run="extract",endpoint="/movie/{id}",le="1"} 2
+tmdb_http_request_seconds_bucket{run="extract",endpoint="/movie/{id}",le="2.5"} 2
+tmdb_http_request_seconds_bucket{run="extract",endpoint="/movie/{id}",le="5"} 2
+tmdb_http_request_seconds_bucket{run="extract",endpoint="/movie/{id}",le="10"} 2
+tmdb_http_request_seconds_bucket{run="extract",endpoint="/movie/{id}",le="30"} 2
+tmdb_http_request_seconds_bucket{run="extract",endpoint="/movie/{id}",le="+Inf"} 3
+tmdb_http_request_seconds_sum{run="extract",endpoint="/movie/{id}"} 45.400000
+tmdb_http_request_seconds_count{run="extract",endpoint="/movie/{id}"} 3
+# HELP tmdb_http_requests_total TMDB HTTP responses by endpoint and status code.
+# TYPE tmdb_http_requests_total counter
+tmdb_http_requests_total{run="extract",endpoint="/movie/{id}",status="200"} 2
+tmdb_http_requests_total{run="extract",endpoint="/movie/{id}",status="429"} 1
+# HELP tmdb_query_cache_hits_total Analytics queries answered from the query cache.
+# TYPE tmdb_query_cache_hits_total counter
+tmdb_query_cache_hits_total{run="extract",query="say \\"hi\\"\\n"} 1
+# HELP tmdb_stage_seconds Wall time of the last run of each stage.
+# TYPE tmdb_stage_seconds gauge
+tmdb_stage_seconds{run="extract",stage="extract.details"} 2.0
+tmdb_stage_seconds{run="extract",stage="transform"} 0.5
+# HELP tmdb_stage_rows_in Rows read by each stage.
+# TYPE tmdb_stage_rows_in gauge
+tmdb_stage_rows_in{run="extract",stage="extract.details"} 100
+tmdb_stage_rows_in{run="extract",stage="transform"} 0
+# HELP tmdb_stage_rows_out Rows written by each stage.
+# TYPE tmdb_stage_rows_out gauge
+tmdb_stage_rows_out{run="extract",stage="extract.details"} 80
+tmdb_stage_rows_out{run="extract",stage="transform"} 0
+# HELP tmdb_stage_rows_per_second Throughput of each stage (rows out, else rows in).
+# TYPE tmdb_stage_rows_per_second gauge
+tmdb_stage_rows_per_second{run="extract",stage="extract.details"} 40.0
+"""
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    monkeypatch.setattr(instrumentation, "peak_rss", lambda: (None, None))
+    metrics = Metrics()
+
+    endpoint = endpoint_label("/movie/603")
+    for seconds in (0.08, 0.32, 45.0):
+        metrics.observe("tmdb_http_request_seconds", seconds, endpoint=endpoint)
+    metrics.inc("tmdb_http_requests_total", endpoint=endpoint, status=200)
+    metrics.inc("tmdb_http_requests_total", endpoint=endpoint, status=200)
+    metrics.inc("tmdb_http_requests_total", endpoint=endpoint, status=429)
+    metrics.inc("tmdb_query_cache_hits_total", query='say "hi"\n')
+
+    # Fixed timings: the stage context manager would measure real ones.
+    for name, seconds, rows_in, rows_out in [
+        ("extract.details", 9.0, 1, 1), ("extract.details", 2.0, 100, 80), ("transform", 0.5, 0, 0),
+    ]:
+        record = StageRecord(name)
+        record.seconds, record.rows_in, record.rows_out, record.status = seconds, rows_in, rows_out, "ok"
+        metrics.stages.append(record)
+    return metrics
+
+
+def test_prometheus_exposition(metrics):
+    assert metrics.prometheus("extract") == EXPOSITION
+
+
+def test_json_report(metrics):
+    report = json.loads(json.dumps(metrics.report("extract")))
+
+    assert report["run"] == "extract"
+    assert [(s["stage"], s["rows_out"], s["rows_per_sec"]) for s in report["stages"]] == [
+        ("extract.details", 1, 1 / 9.0), ("extract.details", 80, 40.0), ("transform", 0, None),
+    ]
+    assert report["counters"] == [
+        {"name": "tmdb_http_requests_total", "labels": {"endpoint": "/movie/{id}", "status": "200"}, "value": 2},
+        {"name": "tmdb_http_requests_total", "labels": {"endpoint": "/movie/{id}", "status": "429"}, "value": 1},
+        {"name": "tmdb_query_cache_hits_total", "labels": {"query": 'say "hi"\n'}, "value": 1},
+    ]
+
+    histogram, = report["histograms"]
+    assert histogram == {
+        "name": "tmdb_http_request_seconds",
+        "labels": {"endpoint": "/movie/{id}"},
+        "count": 3,
+        "sum": pytest.approx(45.4),
+        "mean": pytest.approx(45.4 / 3),
+        "max": 45.0,
+        "buckets": {"0.05": 0, "0.1": 1, "0.25": 1, "0.5": 2, "1": 2, "2.5": 2, "5": 2, "10": 2, "30": 2, "+Inf": 3},
+    }
+
+
+def test_write_report(metrics, tmp_path):
+    report_path, prom_path = metrics.write_report("extract", tmp_path)
+
+    assert prom_path.name == "extract.prom" and prom_path.read_text(encoding="utf-8") == EXPOSITION
+    assert report_path.name.startswith("run-") and report_path.name.endswith("-extract.json")
+    assert json.loads(report_path.read_text(encoding="utf-8"))["counters"][0]["value"] == 2
+
+
+def test_undeclared_metric_fails():
+    with pytest.raises(KeyError, match="Undeclared metric"):
+        Metrics().inc("tmdb_typo_total")
@@ -0,0 +1,96 @@
+import importlib
+import os
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from src.analytics import helpers
+from src.analytics.local_backend import LocalBackend, comparable
+from src.analytics.postgres_backend import PostgresBackend
+from src.config.create_schema import SCHEMA, VIEW_QUERIES
+
+# The load replaces the whole tmdb schema, so it only runs against a
+# database set aside for tests.
+TEST_DATABASE_URL = os.getenv("TMDB_TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TMDB_TEST_DATABASE_URL (a scratch Postgres) not set")
+
+
+@pytest.fixture
+def load_tmdb(monkeypatch):
+    """load_tmdb bound to the test database, starting from an empty schema."""
+    monkeypatch.setenv("DATABASE_URL", TEST_DATABASE_URL)
+    module = importlib.import_module("src.etl.load_tmdb")
+
+    engine = create_engine(TEST_DATABASE_URL)
+    monkeypatch.setattr(module, "engine", engine)
+    monkeypatch.setattr(module, "mark_published", lambda target, tables: None)
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+    yield module
+    engine.dispose()
+
+
+def views(engine):
+    """{view name: (oid, populated, rows)} of the analytics views."""
+    with engine.connect() as conn:
+        found = conn.execute(text(
+            "SELECT c.relname, c.oid, v.ispopulated FROM pg_matviews v "
+            "JOIN pg_class c ON c.relname = v.matviewname "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace AND n.nspname = v.schemaname "
+            "WHERE v.schemaname = :schema"
+        ), {"schema": SCHEMA}).all()
+        return {
+            name: (oid, populated, conn.execute(text(f"SELECT COUNT(*) FROM {SCHEMA}.{name}")).scalar())
+            for name, oid, populated in found
+        }
+
+
+def test_load_keeps_views_populated(load_tmdb, synthetic_clean):
+    load_tmdb.load_all(folder=synthetic_clean, workers=1)
+    first = views(load_tmdb.engine)
+
+    load_tmdb.load_all(folder=synthetic_clean, workers=1)
+    second = views(load_tmdb.engine)
+
+    assert len(second) == len(VIEW_QUERIES)
+    assert all(populated and rows for _, populated, rows in second.values())
+    # Same objects: the swap no longer drops and recreates the views.
+    assert {name: oid for name, (oid, _, _) in second.items()} == {name: oid for name, (oid, _, _) in first.items()}
+
+
+FILTERS = {"none": {}, "year range": {"min_year": 1990, "max_year": 2010}, "genre": {"genre": "Drama"}}
+
+
+@pytest.mark.parametrize("params", FILTERS.values(), ids=FILTERS.keys())
+def test_views_answer_like_the_tables(load_tmdb, synthetic_clean, monkeypatch, params):
+    load_tmdb.load_all(folder=synthetic_clean, workers=1)
+    monkeypatch.setattr(helpers, "POSTGRES_BACKEND", PostgresBackend(TEST_DATABASE_URL))
+    monkeypatch.setattr(helpers, "LOCAL_BACKEND", LocalBackend(synthetic_clean))
+
+    for name in VIEW_QUERIES:
+        declared = {p.name for p in helpers.get_query(name).params}
+        query_params = {key: value for key, value in params.items() if key in declared}
+        postgres = helpers.run_query(name, backend="postgres", **query_params)
+        local = helpers.run_query(name, backend="local", **query_params)
+
+        assert len(postgres), name
+        pd.testing.assert_frame_equal(comparable(postgres), comparable(local), rtol=1e-6, obj=name)
+
+
+def test_upsert_deletes_movies_tmdb_removed(load_tmdb, synthetic_clean):
+    load_tmdb.load_all(folder=synthetic_clean, workers=1)
+    with load_tmdb.engine.begin() as conn:
+        # A movie loaded earlier that the last incremental extract found gone (404).
+        conn.execute(text(f"CREATE TEMP TABLE gone AS SELECT * FROM {SCHEMA}.movies LIMIT 1"))
+        conn.execute(text("UPDATE gone SET movie_id = 999999"))
+        conn.execute(text(f"INSERT INTO {SCHEMA}.movies SELECT * FROM gone"))
+        kept = conn.execute(text(f"SELECT MIN(movie_id) FROM {SCHEMA}.movies")).scalar()
+
+    load_tmdb.upsert_movies([kept, 999999], synthetic_clean)
+
+    with load_tmdb.engine.connect() as conn:
+        ids = set(conn.execute(text(f"SELECT movie_id FROM {SCHEMA}.movies WHERE movie_id IN (:a, :b)"),
+                               {"a": kept, "b": 999999}).scalars())
+    assert ids == {kept}
@@ -0,0 +1,103 @@
+import gzip
+
+import pytest
+
+from src.etl.storage import CheckpointedOutput, NDJSONWriter, ndjson_path, read_checkpoint, read_records
+
+COMPRESSIONS = ["none", "gzip", "zstd"]
+
+
+def crash(output):
+    """
+    Leave the outputs as a killed process would: records written since the
+    last checkpoint are partly on disk (an unfinished gzip member / zstd
+    frame) and the writers are never closed.
+    """
+    for writer in output.writers.values():
+        if writer.stream is not None and writer.stream is not writer.raw:
+            writer.stream.flush()
+        writer.raw.flush()
+        # Drop the stream unclosed so no trailer is ever written.
+        writer.stream = None
+        writer.raw.close()
+
+
+def records(start, stop):
+    return [{"id": i, "title": f"Movie {i}" * 5} for i in range(start, stop)]
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+def test_resume_truncates_to_the_committed_size(tmp_path, compression):
+    paths = {"details": ndjson_path(tmp_path, "details", compression)}
+    checkpoint = tmp_path / "run.checkpoint.json"
+
+    output = CheckpointedOutput(checkpoint, paths)
+    for record in records(0, 50):
+        output.write("details", record)
+    output.checkpoint(page=5)
+    committed = read_checkpoint(checkpoint)["sizes"]["details"]
+
+    for record in records(50, 80):
+        output.write("details", record)
+    crash(output)
+    assert paths["details"].stat().st_size > committed
+
+    resumed = CheckpointedOutput(checkpoint, paths)
+    assert resumed.resumed and resumed.state == {"page": 5}
+    assert paths["details"].stat().st_size == committed
+    assert list(read_records(paths["details"])) == records(0, 50)
+
+    for record in records(50, 80):
+        resumed.write("details", record)
+    resumed.close(done=True)
+    assert list(read_records(paths["details"])) == records(0, 80)
+
+
+@pytest.mark.parametrize("compression", ["gzip", "zstd"])
+def test_committed_prefix_stays_readable_after_a_partial_write(tmp_path, compression):
+    path = ndjson_path(tmp_path, "details", compression)
+    writer = NDJSONWriter(path)
+    for record in records(0, 10):
+        writer.write(record)
+    committed = writer.sync()
+    for record in records(10, 20):
+        writer.write(record)
+    writer.sync()
+
+    # Cut the second gzip member / zstd frame in half.
+    with open(path, "r+b") as f:
+        f.truncate(committed + (f.seek(0, 2) - committed) // 2)
+    if compression == "gzip":
+        with pytest.raises(EOFError):
+            gzip.decompress(path.read_bytes())
+
+    NDJSONWriter(path, truncate_to=committed).close()
+    assert list(read_records(path)) == records(0, 10)
+
+
+def test_outputs_shorter_than_the_checkpoint_start_over(tmp_path, capsys):
+    paths = {"details": ndjson_path(tmp_path, "details"), "credits": ndjson_path(tmp_path, "credits")}
+    checkpoint = tmp_path / "run.checkpoint.json"
+
+    output = CheckpointedOutput(checkpoint, paths)
+    output.write("details", {"id": 1})
+    output.write("credits", {"id": 1})
+    output.checkpoint()
+    paths["credits"].write_bytes(b"")
+
+    restarted = CheckpointedOutput(checkpoint, paths)
+    assert not restarted.resumed
+    assert "Starting over" in capsys.readouterr().out
+    assert paths["details"].stat().st_size == 0
+
+
+def test_finished_run_is_not_resumed(tmp_path):
+    paths = {"details": ndjson_path(tmp_path, "details")}
+    checkpoint = tmp_path / "run.checkpoint.json"
+
+    output = CheckpointedOutput(checkpoint, paths)
+    output.write("details", {"id": 1})
+    output.close(done=True)
+
+    again = CheckpointedOutput(checkpoint, paths)
+    assert not again.resumed and paths["details"].stat().st_size == 0
@@ -0,0 +1,90 @@
+import pandas as pd
+import pytest
+
+from conftest import transform_synthetic
+from src.etl.dimensions import CreditDimensions
+from src.etl.schemas import SCHEMAS, read_clean_table, to_arrow
+from src.etl.storage import ndjson_path, read_many
+from src.etl.transform_tmdb import BUILDERS, REFERENCE_BUILDERS, check_parity, iter_chunks
+
+EDGE_DETAILS = {
+    "missing keys": [{"id": 1}, {"id": 2, "title": "Only a title"}],
+    "null values": [{"id": 3, "title": None, "overview": None, "runtime": None, "popularity": None, "genres": None}],
+    "empty genres": [{"id": 4, "genres": []}, {"id": 5, "genres": [{"id": 18, "name": "Drama"}]}],
+    "empty chunk": [],
+}
+
+EDGE_CREDITS = {
+    "missing lists": [{"id": 1}, {"id": 2, "cast": None, "crew": None}],
+    "empty lists": [{"id": 3, "cast": [], "crew": []}],
+    "missing keys": [{"id": 4, "cast": [{"id": 10}], "crew": [{"id": 11}, {"id": 12, "job": "Director"}]}],
+    "null values": [{"id": 5, "cast": [{"id": 10, "name": None, "character": None, "gender": None}],
+                     "crew": [{"id": 11, "name": None, "department": None, "job": None}]}],
+    "empty chunk": [],
+}
+
+
+@pytest.mark.parametrize("details", EDGE_DETAILS.values(), ids=EDGE_DETAILS.keys())
+def test_details_builders_agree(details):
+    for table in ("movies", "movie_genres"):
+        pd.testing.assert_frame_equal(BUILDERS[table](details), REFERENCE_BUILDERS[table](details), obj=table)
+
+
+@pytest.mark.parametrize("credits", EDGE_CREDITS.values(), ids=EDGE_CREDITS.keys())
+def test_credit_builders_agree(credits):
+    for table in ("cast", "crew"):
+        pd.testing.assert_frame_equal(BUILDERS[table](credits), REFERENCE_BUILDERS[table](credits), obj=table)
+
+
+@pytest.mark.parametrize("builders", [BUILDERS, REFERENCE_BUILDERS], ids=["vectorized", "reference"])
+def test_missing_text_is_none(builders):
+    movies = builders["movies"](EDGE_DETAILS["missing keys"])
+    assert movies["title"].tolist() == [None, "Only a title"]
+
+    crew = builders["crew"](EDGE_CREDITS["missing keys"])
+    assert crew["name"].tolist() == [None, None]
+
+
+@pytest.mark.parametrize("builders", [BUILDERS, REFERENCE_BUILDERS], ids=["vectorized", "reference"])
+def test_empty_chunk_keeps_dtypes(builders):
+    full = builders["crew"](EDGE_CREDITS["missing keys"])
+    empty = builders["crew"]([])
+
+    assert empty.empty
+    for column in full:
+        if isinstance(full[column].dtype, pd.CategoricalDtype):
+            assert empty[column].cat.categories.dtype == full[column].cat.categories.dtype, column
+        else:
+            assert empty[column].dtype == full[column].dtype, column
+
+
+def test_empty_chunk_writes(tmp_path):
+    frames = {table: BUILDERS[table]([]) for table in ("cast", "crew")}
+    split = CreditDimensions(tmp_path).split(frames)
+
+    for table, df in split.items():
+        assert to_arrow(table, df).schema == SCHEMAS[table]
+
+
+def test_synthetic_parity(synthetic_raw):
+    details = iter_chunks(read_many([ndjson_path(synthetic_raw, "details")]), 100)
+    credits = iter_chunks(read_many([ndjson_path(synthetic_raw, "credits")]), 100)
+    for details_chunk, credits_chunk in zip(details, credits):
+        check_parity(details_chunk, credits_chunk)
+
+
+def test_reference_transform_writes_the_same_clean_layer(synthetic_raw, synthetic_clean, tmp_path):
+    reference = transform_synthetic(synthetic_raw, tmp_path / "clean", reference=True)
+
+    for table in SCHEMAS:
+        assert read_clean_table(table, reference).equals(read_clean_table(table, synthetic_clean)), table
+
+
+def test_worker_count_does_not_change_the_output(synthetic_raw, tmp_path):
+    serial = transform_synthetic(synthetic_raw, tmp_path / "serial", workers=1)
+    parallel = transform_synthetic(synthetic_raw, tmp_path / "parallel", workers=3)
+
+    files = sorted(p.relative_to(serial) for p in serial.rglob("*") if p.is_file())
+    assert files == sorted(p.relative_to(parallel) for p in parallel.rglob("*") if p.is_file())
+    for path in files:
+        assert (serial / path).read_bytes() == (parallel / path).read_bytes(), path
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+import requests
+
+from conftest import stub_stats
+from src.etl import utils_api
+from src.etl.utils_api import TMDBApiError, TMDBRateLimitError, fetch_concurrent, request_tmdb
+
+
+def test_request_returns_payload(tmdb):
+    data = request_tmdb("/movie/7")
+    assert data["id"] == 7
+
+
+def test_client_error_is_not_retried(tmdb):
+    with pytest.raises(TMDBApiError, match="404"):
+        request_tmdb("/movie/999999")
+
+
+def test_rate_limit_error_after_max_throttled(start_stub, monkeypatch):
+    # A stub rate below one request per second answers every request with 429.
+    monkeypatch.setattr(utils_api, "BASE_URL", start_stub(rate=0.001))
+    monkeypatch.setattr(utils_api.CACHE, "enabled", False)
+    monkeypatch.setattr(utils_api, "LIMITER", utils_api.TokenBucket(10_000))
+    monkeypatch.setattr(utils_api, "MAX_THROTTLED", 2)
+    monkeypatch.setattr(utils_api, "_retry_after", lambda response: 0.0)
+
+    with pytest.raises(TMDBRateLimitError, match=r"after 2 throttled \(429\) attempts"):
+        request_tmdb("/movie/1")
+    assert stub_stats(utils_api.BASE_URL)["throttled"] == 2
+
+
+def retry_after(value):
+    response = requests.Response()
+    if value is not None:
+        response.headers["Retry-After"] = value
+    return utils_api._retry_after(response)
+
+
+def test_retry_after_parses_seconds_and_http_dates():
+    assert retry_after("3") == 3.0
+    assert retry_after(None) == 2.0
+    assert retry_after("soon") == 2.0
+
+    later = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 < retry_after(format_datetime(later, usegmt=True)) <= 30
+    assert retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+def test_fetch_concurrent_keeps_order_and_failures(tmdb):
+    ids = [3, 999999, 1, 2]
+    results = list(fetch_concurrent(lambda i: request_tmdb(f"/movie/{i}"), ids, max_workers=2, report=False))
+
+    assert [item for item, _ in results] == ids
+    assert [r and r["id"] for _, r in results] == [3, None, 1, 2]
@@ -1,133 +1,845 @@
+import os
 import json
-import pandas as pd
+import shutil
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
 
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from .storage import find_store, read_many, read_raw, unique_records
+from .schemas import SCHEMAS, PARTITION_COLUMN, NULL_PARTITION, to_arrow, partition_values, clean_path, iter_clean_batches
+from .extract_tmdb import CHANGED_IDS_PATH
+from .catalog_ingest import CATALOG_DIR
+from .aggregate_cube import build_cube, merge_cubes, negate, cube_for_movies, read_cube, write_cube
+from .dimensions import CreditDimensions
+from .instrumentation import METRICS
+
 BASE = Path(__file__).resolve().parents[2]  # root del proyecto
 RAW = BASE / "data" / "processed"
 CLEAN = BASE / "data" / "clean"
 
-CLEAN.mkdir(parents=True, exist_ok=True)
+# Records held in memory at once. Peak memory depends on this, not on the
+# size of the catalog.
+CHUNK_SIZE = 5000
+
+# Column order and dtype of every built table. Nullable integer dtypes keep
+# the written values identical whichever chunk a row ends up in. cast and
+# crew are built with the person's name / gender and crew department / job
+# text, which dimensions.py moves to the people / departments / jobs tables
+# before writing; repeated text is categorical and ids are narrow.
+TABLE_COLUMNS = {
+    "movies": {
+        "movie_id": "Int64",
+        "title": "object",
+        "original_title": "object",
+        "overview": "object",
+        "release_date": "object",
+        "runtime": "Int64",
+        "popularity": "float64",
+        "vote_average": "float64",
+        "vote_count": "Int64",
+        "budget": "Int64",
+        "revenue": "Int64",
+        "original_language": "object",
+    },
+    "genres": {
+        "genre_id": "Int64",
+        "name": "object",
+    },
+    "movie_genres": {
+        "movie_id": "Int64",
+        "genre_id": "Int64",
+    },
+    "cast": {
+        "movie_id": "Int32",
+        "cast_id": "Int32",
+        "person_id": "Int32",
+        "name": "object",
+        "character": "category",
+        "gender": "Int8",
+        "order": "Int16",
+    },
+    "crew": {
+        "movie_id": "Int32",
+        "person_id": "Int32",
+        "name": "object",
+        "gender": "Int8",
+        "department": "category",
+        "job": "category",
+    },
+}
+
+
+def iter_chunks(records, size=CHUNK_SIZE):
+    """Yield lists of at most `size` records."""
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def frame(table, rows):
+    """
+    Build a DataFrame with the table's fixed columns and dtypes.
+
+    Missing text is None (never NaN) and categories are always str, even
+    in an empty chunk, so dict rows and Arrow columns give equal frames.
+    """
+    columns = TABLE_COLUMNS[table]
+    df = pd.DataFrame(rows, columns=list(columns)).astype(columns)
+
+    for column, dtype in columns.items():
+        if dtype == "object":
+            df[column] = df[column].where(df[column].notna(), None)
+        elif dtype == "category":
+            df[column] = df[column].cat.set_categories(df[column].cat.categories.astype("str"))
+
+    return df
+
+
+# Clean layer output format; csv keeps the original untyped files.
+OUTPUT_FORMAT = "parquet"
+# "frame": a whole built DataFrame, for stages split into dimensions by the parent.
+PART_SUFFIX = {"csv": ".csv", "parquet": ".arrow", "frame": ".arrow"}
+
+
+class CsvTableWriter:
+    """
+    Appends DataFrame chunks to one clean CSV table.
+
+    Rows go to a temporary file that replaces the real one on close(), so
+    readers never see a half-written table.
+    """
+
+    fmt = "csv"
+
+    def __init__(self, table, folder=CLEAN):
+        self.table = table
+        self.columns = SCHEMAS[table].names
+        self.path = clean_path(table, folder, "csv")
+        self.tmp = self.path.with_suffix(".csv.tmp")
+        self.rows = 0
+        self.started = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp.unlink(missing_ok=True)
+
+    def write(self, df):
+        df.to_csv(self.tmp, mode="a", header=not self.started, index=False)
+        self.started = True
+        self.rows += len(df)
+
+    def append_part(self, part, rows):
+        """Append a headerless part file written by a worker (see build_part)."""
+        if not self.started:
+            self.write(pd.DataFrame(columns=self.columns))
+
+        with open(part, "rb") as src, open(self.tmp, "ab") as dst:
+            shutil.copyfileobj(src, dst)
+
+        self.rows += rows
+        part.unlink()
+
+    def close(self):
+        if not self.started:
+            self.write(pd.DataFrame(columns=self.columns))
+
+        os.replace(self.tmp, self.path)
+        print(f"[SAVED] {self.path.name} ({self.rows} rows)")
+
+
+class ParquetTableWriter:
+    """
+    Appends chunks to one typed Parquet file (one row group per chunk).
+
+    Like CsvTableWriter, output goes to a temporary file that replaces the
+    real one on close().
+    """
+
+    fmt = "parquet"
+
+    def __init__(self, table, folder=CLEAN):
+        self.table = table
+        self.schema = SCHEMAS[table]
+        self.path = clean_path(table, folder)
+        self.tmp = self.path.with_name(self.path.name + ".tmp")
+        self.rows = 0
+        self.writer = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp.unlink(missing_ok=True)
+
+    def write(self, df):
+        self.write_arrow(to_arrow(self.table, df))
+
+    def write_arrow(self, arrow_table):
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.tmp, self.schema, compression="zstd")
+
+        if arrow_table.num_rows:
+            self.writer.write_table(arrow_table)
+            self.rows += arrow_table.num_rows
 
-print("=== TMDB TRANSFORM STARTED ===")
+    def append_part(self, part, rows):
+        """Append an Arrow IPC part file written by a worker (see build_part)."""
+        with pa.ipc.open_file(part) as reader:
+            self.write_arrow(reader.read_all())
+        part.unlink()
+
+    def close(self):
+        self.write_arrow(self.schema.empty_table())
+        self.writer.close()
+
+        os.replace(self.tmp, self.path)
+        print(f"[SAVED] {self.path.name} ({self.rows} rows)")
+
+
+class PartitionedParquetWriter(ParquetTableWriter):
+    """
+    Hive-partitioned Parquet dataset (e.g. movies/release_year=1999/part-0.parquet).
+
+    One ParquetWriter stays open per partition. Rows are buffered per
+    partition so a chunk spread over a hundred years does not turn into a
+    hundred tiny row groups; the whole directory is swapped into place on
+    close().
+    """
+
+    ROW_GROUP_ROWS = 20000
+    MAX_BUFFERED_ROWS = 100000
+
+    def __init__(self, table, folder=CLEAN):
+        # A crashed run can leave the temporary dataset directory behind.
+        shutil.rmtree(clean_path(table, folder).with_name(f"{table}.tmp"), ignore_errors=True)
+        super().__init__(table, folder)
+        self.column = PARTITION_COLUMN[table]
+        self.writers = {}
+        self.pending = {}
+        self.buffered = 0
+
+    def _writer(self, key):
+        if key not in self.writers:
+            value = NULL_PARTITION if key is None else key
+            directory = self.tmp / f"{self.column}={value}"
+            directory.mkdir(parents=True, exist_ok=True)
+            self.writers[key] = pq.ParquetWriter(directory / "part-0.parquet", self.schema, compression="zstd")
+        return self.writers[key]
+
+    def _flush(self, key):
+        tables = self.pending.pop(key)
+        rows = sum(t.num_rows for t in tables)
+        self._writer(key).write_table(pa.concat_tables(tables), row_group_size=rows)
+        self.buffered -= rows
+
+    def write_arrow(self, arrow_table):
+        if not arrow_table.num_rows:
+            return
+
+        keys = partition_values(self.table, arrow_table)
+
+        for key in pc.unique(keys).to_pylist():
+            mask = pc.is_null(keys) if key is None else pc.equal(keys, key)
+            part = arrow_table.filter(mask)
+            self.pending.setdefault(key, []).append(part)
+            self.buffered += part.num_rows
+
+            if sum(t.num_rows for t in self.pending[key]) >= self.ROW_GROUP_ROWS:
+                self._flush(key)
+
+        if self.buffered >= self.MAX_BUFFERED_ROWS:
+            for key in list(self.pending):
+                self._flush(key)
+
+        self.rows += arrow_table.num_rows
+
+    def close(self):
+        for key in list(self.pending):
+            self._flush(key)
+
+        if not self.writers:
+            self._writer(None)
+
+        for writer in self.writers.values():
+            writer.close()
+
+        old = self.path.with_name(self.path.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        if self.path.exists():
+            os.replace(self.path, old)
+        os.replace(self.tmp, self.path)
+        shutil.rmtree(old, ignore_errors=True)
+
+        print(f"[SAVED] {self.path.name}/ ({self.rows} rows, {len(self.writers)} partitions)")
 
-# ----------------------
-# 1. CARGA DE ARCHIVOS
-# ----------------------
 
-details_path = RAW / "details.json"
-credits_path = RAW / "credits.json"
-genres_path = RAW / "genres.json"
+def open_table_writer(table, folder=CLEAN, fmt=OUTPUT_FORMAT):
+    if fmt == "csv":
+        return CsvTableWriter(table, folder)
+    if table in PARTITION_COLUMN:
+        return PartitionedParquetWriter(table, folder)
+    return ParquetTableWriter(table, folder)
 
-details = json.loads(details_path.read_text(encoding="utf-8"))
-credits = json.loads(credits_path.read_text(encoding="utf-8"))
-genres = json.loads(genres_path.read_text(encoding="utf-8"))
 
-print("[OK] Loaded details.json, credits.json, genres.json")
+def write_part(table, df, path, fmt):
+    """Write one chunk of a table as a part file for the parent to merge."""
+    if fmt == "csv":
+        df.to_csv(path, header=False, index=False)
+        return
+
+    arrow_table = pa.Table.from_pandas(df, preserve_index=False) if fmt == "frame" else to_arrow(table, df)
+    with pa.ipc.new_file(path, arrow_table.schema) as writer:
+        writer.write_table(arrow_table)
+
+
+def read_frame_part(path):
+    """DataFrame written by write_part(fmt="frame"), dtypes included; the part is deleted."""
+    with pa.ipc.open_file(path) as reader:
+        df = reader.read_all().to_pandas()
+    path.unlink()
+    return df
 
 
 # ----------------------
 # 2. NORMALIZAR MOVIES
 # ----------------------
 
-movies_rows = []
-
-for movie in details:
-    movies_rows.append({
-        "movie_id": movie["id"],
-        "title": movie.get("title"),
-        "original_title": movie.get("original_title"),
-        "overview": movie.get("overview"),
-        "release_date": movie.get("release_date"),
-        "runtime": movie.get("runtime"),
-        "popularity": movie.get("popularity"),
-        "vote_average": movie.get("vote_average"),
-        "vote_count": movie.get("vote_count"),
-        "budget": movie.get("budget"),
-        "revenue": movie.get("revenue"),
-        "original_language": movie.get("original_language"),
-    })
-
-df_movies = pd.DataFrame(movies_rows)
-df_movies.to_csv(CLEAN / "movies.csv", index=False)
-print("[SAVED] movies.csv")
+def build_movies_reference(details):
+    rows = []
+
+    for movie in details:
+        rows.append({
+            "movie_id": movie["id"],
+            "title": movie.get("title"),
+            "original_title": movie.get("original_title"),
+            "overview": movie.get("overview"),
+            "release_date": movie.get("release_date"),
+            "runtime": movie.get("runtime"),
+            "popularity": movie.get("popularity"),
+            "vote_average": movie.get("vote_average"),
+            "vote_count": movie.get("vote_count"),
+            "budget": movie.get("budget"),
+            "revenue": movie.get("revenue"),
+            "original_language": movie.get("original_language"),
+        })
+
+    return frame("movies", rows)
 
 
 # ----------------------
 # 3. NORMALIZAR GENRES
 # ----------------------
 
-df_genres = pd.DataFrame(genres["genres"])
-df_genres.rename(columns={"id": "genre_id"}, inplace=True)
-
-df_genres.to_csv(CLEAN / "genres.csv", index=False)
-print("[SAVED] genres.csv")
+def build_genres(genres):
+    df = pd.DataFrame(genres["genres"]).rename(columns={"id": "genre_id"})
+    return frame("genres", df)
 
 
 # ----------------------
 # 4. RELACIÓN MOVIE-GENRES
 # ----------------------
 
-movie_genres_rows = []
+def build_movie_genres_reference(details):
+    rows = []
 
-for movie in details:
-    if movie.get("genres"):
-        for g in movie["genres"]:
-            movie_genres_rows.append({
-                "movie_id": movie["id"],
-                "genre_id": g["id"]
-            })
+    for movie in details:
+        if movie.get("genres"):
+            for g in movie["genres"]:
+                rows.append({
+                    "movie_id": movie["id"],
+                    "genre_id": g["id"]
+                })
 
-df_movie_genres = pd.DataFrame(movie_genres_rows)
-df_movie_genres.to_csv(CLEAN / "movie_genres.csv", index=False)
-print("[SAVED] movie_genres.csv")
+    return frame("movie_genres", rows)
 
 
 # ----------------------
 # 5. ACTORES (CAST)
 # ----------------------
 
-cast_rows = []
-
-for c in credits:
-    movie_id = c["id"]   # CORREGIDO
-
-    for actor in c.get("cast", []):
-        cast_rows.append({
-            "movie_id": movie_id,
-            "cast_id": actor.get("cast_id"),
-            "person_id": actor.get("id"),
-            "name": actor.get("name"),
-            "character": actor.get("character"),
-            "gender": actor.get("gender"),
-            "order": actor.get("order")
-        })
+def build_cast_reference(credits):
+    rows = []
+
+    for c in credits:
+        movie_id = c["id"]
+
+        for actor in c.get("cast") or []:
+            rows.append({
+                "movie_id": movie_id,
+                "cast_id": actor.get("cast_id"),
+                "person_id": actor.get("id"),
+                "name": actor.get("name"),
+                "character": actor.get("character"),
+                "gender": actor.get("gender"),
+                "order": actor.get("order")
+            })
 
-df_cast = pd.DataFrame(cast_rows)
-df_cast.to_csv(CLEAN / "cast.csv", index=False)
-print("[SAVED] cast.csv")
+    return frame("cast", rows)
 
 
 # ----------------------
 # 6. EQUIPO TÉCNICO (CREW)
 # ----------------------
 
-crew_rows = []
+def build_crew_reference(credits):
+    rows = []
 
-for c in credits:
-    movie_id = c["id"]   # CORREGIDO
+    for c in credits:
+        movie_id = c["id"]
 
-    for member in c.get("crew", []):
-        crew_rows.append({
-            "movie_id": movie_id,
-            "person_id": member.get("id"),
-            "name": member.get("name"),
-            "department": member.get("department"),
-            "job": member.get("job")
-        })
+        for member in c.get("crew") or []:
+            rows.append({
+                "movie_id": movie_id,
+                "person_id": member.get("id"),
+                "name": member.get("name"),
+                "gender": member.get("gender"),
+                "department": member.get("department"),
+                "job": member.get("job")
+            })
+
+    return frame("crew", rows)
+
+
+# ============================================================
+# VECTORIZED BUILDERS
+# ============================================================
+# Same output as the *_reference builders above, built column-wise with
+# Arrow instead of appending one Python dict per row.
+
+MOVIE_FIELDS = {
+    "id": "movie_id",
+    "title": "title",
+    "original_title": "original_title",
+    "overview": "overview",
+    "release_date": "release_date",
+    "runtime": "runtime",
+    "popularity": "popularity",
+    "vote_average": "vote_average",
+    "vote_count": "vote_count",
+    "budget": "budget",
+    "revenue": "revenue",
+    "original_language": "original_language",
+}
+
+CAST_FIELDS = {
+    "cast_id": "cast_id",
+    "id": "person_id",
+    "name": "name",
+    "character": "character",
+    "gender": "gender",
+    "order": "order",
+}
+
+CREW_FIELDS = {
+    "id": "person_id",
+    "name": "name",
+    "gender": "gender",
+    "department": "department",
+    "job": "job",
+}
+
+
+ARROW_TYPES = {
+    "Int8": pa.int8(),
+    "Int16": pa.int16(),
+    "Int32": pa.int32(),
+    "Int64": pa.int64(),
+    "float64": pa.float64(),
+    "object": pa.string(),
+    "category": pa.string(),
+}
+
+PANDAS_INTEGERS = {
+    pa.int8(): pd.Int8Dtype(),
+    pa.int16(): pd.Int16Dtype(),
+    pa.int32(): pd.Int32Dtype(),
+    pa.int64(): pd.Int64Dtype(),
+}
+
+
+def struct_type(table, fields):
+    """Arrow struct for the source keys in `fields`, typed like the output columns."""
+    columns = TABLE_COLUMNS[table]
+    return pa.struct([(key, ARROW_TYPES[columns[column]]) for key, column in fields.items()])
+
+
+def to_frame(table, arrays):
+    df = pa.table(arrays).to_pandas(types_mapper=PANDAS_INTEGERS.get)
+    return frame(table, df)
+
+
+def flatten(table, records, key, fields):
+    """
+    One row per element of records[i][key], with the parent's id as movie_id.
+
+    The nested lists are converted to a single Arrow list<struct> array and
+    flattened in C++; list_parent_indices maps every element back to its
+    movie. Unknown keys are ignored and missing keys become NA.
+    """
+    lists = pa.array([r.get(key) for r in records], type=pa.list_(struct_type(table, fields)))
+    parent_ids = pa.array([r["id"] for r in records], type=ARROW_TYPES[TABLE_COLUMNS[table]["movie_id"]])
+    items = pc.list_flatten(lists)
+
+    arrays = {"movie_id": pc.take(parent_ids, pc.list_parent_indices(lists))}
+    for source, column in fields.items():
+        arrays[column] = items.field(source)
+
+    return to_frame(table, arrays)
+
+
+def build_movies(details):
+    movies = pa.array(details, type=struct_type("movies", MOVIE_FIELDS))
+    return to_frame("movies", {column: movies.field(key) for key, column in MOVIE_FIELDS.items()})
+
+
+def build_movie_genres(details):
+    return flatten("movie_genres", details, "genres", {"id": "genre_id"})
+
+
+def build_cast(credits):
+    return flatten("cast", credits, "cast", CAST_FIELDS)
+
+
+def build_crew(credits):
+    return flatten("crew", credits, "crew", CREW_FIELDS)
+
+
+BUILDERS = {
+    "movies": build_movies,
+    "movie_genres": build_movie_genres,
+    "cast": build_cast,
+    "crew": build_crew,
+}
+
+REFERENCE_BUILDERS = {
+    "movies": build_movies_reference,
+    "movie_genres": build_movie_genres_reference,
+    "cast": build_cast_reference,
+    "crew": build_crew_reference,
+}
+
+
+def check_parity(details, credits):
+    """
+    Compare vectorized and reference builders on the same records.
+
+    Raises AssertionError on the first table that differs.
+    """
+    inputs = {"movies": details, "movie_genres": details, "cast": credits, "crew": credits}
+
+    for table, records in inputs.items():
+        pd.testing.assert_frame_equal(
+            BUILDERS[table](records),
+            REFERENCE_BUILDERS[table](records),
+            obj=table,
+        )
+
+
+# ============================================================
+# TRANSFORM STAGES
+# ============================================================
+
+def transform_genres(genres_path, folder=CLEAN, fmt=OUTPUT_FORMAT):
+    with METRICS.stage("transform.genres") as record:
+        genres = json.loads(Path(genres_path).read_text(encoding="utf-8"))
+
+        writer = open_table_writer("genres", folder, fmt)
+        writer.write(build_genres(genres))
+        writer.close()
+        record.rows_in = record.rows_out = writer.rows
+
+
+# Tables built from each processed store.
+STAGE_TABLES = {
+    "details": ("movies", "movie_genres"),
+    "credits": ("cast", "crew"),
+}
+
+# Stages whose built tables are split into facts + dimension tables before
+# writing (dimensions.py). The split keeps state across chunks, so it runs in
+# the parent, in chunk order.
+STAGE_DIMENSIONS = {
+    "credits": CreditDimensions,
+}
 
-df_crew = pd.DataFrame(crew_rows)
-df_crew.to_csv(CLEAN / "crew.csv", index=False)
-print("[SAVED] crew.csv")
+# Stages that also feed the genre x year aggregate cube (aggregate_cube.py).
+CUBE_STAGES = {"details"}
 
 
-print("=== TMDB TRANSFORM FINISHED ===")
+def chunk_cube(stage, frames):
+    """Cube contribution of one chunk's tables (None for stages without one)."""
+    if stage not in CUBE_STAGES:
+        return None
+    return build_cube(frames["movies"], frames["movie_genres"])
+
+
+def part_path(parts_dir, table, index, fmt):
+    return parts_dir / f"{table}-{index:06d}{PART_SUFFIX[fmt]}"
+
+
+def part_format(stage, fmt):
+    """Stages with dimensions ship whole built frames to the parent; others ship output rows."""
+    return "frame" if stage in STAGE_DIMENSIONS else fmt
+
+
+def build_part(stage, index, items, parts_dir, builders=BUILDERS, fmt=OUTPUT_FORMAT, cube=False):
+    """
+    Worker side of a parallel stage: parse one chunk and write its rows of
+    every stage table to part files named by chunk index. Returns the row
+    counts and, with cube=True, the chunk's cube contribution.
+    """
+    records = [json.loads(item) if isinstance(item, str) else item for item in items]
+    frames = {}
+
+    for table in STAGE_TABLES[stage]:
+        frames[table] = builders[table](records)
+        write_part(table, frames[table], part_path(parts_dir, table, index, fmt), fmt)
+
+    rows = {table: len(df) for table, df in frames.items()}
+    return rows, chunk_cube(stage, frames) if cube else None
+
+
+def _transform_parallel(stage, lines, chunk_size, writers, builders, workers, parts_dir, fmt, cube=False,
+                        write_frames=None):
+    """
+    Fan chunks out to a process pool and merge the part files in chunk order.
+
+    The parent only splits raw NDJSON `lines` into chunks; parsing and
+    building happen in the workers. Parts are appended strictly in chunk
+    order, so the result is byte-for-byte what the single-process path
+    writes. With `write_frames` the parts are built DataFrames handed to it
+    instead of rows appended to the writers. At most 2 * workers chunks are
+    in flight. Returns the merged cube (None unless cube=True).
+    """
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    part_fmt = part_format(stage, fmt)
+    merged = [None]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+
+        def merge_next():
+            index, future = pending.popleft()
+            rows, part_cube = future.result()
+            if write_frames is not None:
+                write_frames({
+                    table: read_frame_part(part_path(parts_dir, table, index, part_fmt))
+                    for table in STAGE_TABLES[stage]
+                })
+            else:
+                for table, writer in writers.items():
+                    writer.append_part(part_path(parts_dir, table, index, fmt), rows[table])
+            if part_cube is not None:
+                merged[0] = merge_cubes([merged[0], part_cube])
+
+        for index, chunk in enumerate(iter_chunks(lines, chunk_size)):
+            pending.append((index, pool.submit(build_part, stage, index, chunk, parts_dir, builders, part_fmt, cube)))
+            if len(pending) >= 2 * workers:
+                merge_next()
+
+        while pending:
+            merge_next()
+
+    shutil.rmtree(parts_dir, ignore_errors=True)
+    return merged[0]
+
+
+def transform_stage(stage, paths, chunk_size=CHUNK_SIZE, folder=CLEAN, builders=BUILDERS, workers=1,
+                    fmt=OUTPUT_FORMAT, cube=False):
+    """
+    Stream one processed store into its clean tables, chunk by chunk. With
+    cube=True the chunks' cube contributions are merged along the way and
+    returned.
+    """
+    with METRICS.stage(f"transform.{stage}") as record:
+        dimensions = STAGE_DIMENSIONS[stage](folder, fmt) if stage in STAGE_DIMENSIONS else None
+        tables = STAGE_TABLES[stage] + (dimensions.tables if dimensions else ())
+        writers = {table: open_table_writer(table, folder, fmt) for table in tables}
+        merged = None
+
+        def write_frames(frames):
+            if dimensions is not None:
+                frames = dimensions.split(frames)
+            for table, writer in writers.items():
+                writer.write(frames[table])
+
+        if workers > 1:
+            parts_dir = Path(folder) / "_parts"
+            # Overlapping stores are parsed here to drop repeated movies.
+            lines = record.count(read_raw(paths) if len(paths) == 1 else read_records_once(paths))
+            merged = _transform_parallel(stage, lines, chunk_size, writers, builders, workers, parts_dir, fmt, cube,
+                                         write_frames if dimensions else None)
+        else:
+            for chunk in iter_chunks(record.count(read_records_once(paths)), chunk_size):
+                frames = {table: builders[table](chunk) for table in STAGE_TABLES[stage]}
+                write_frames(frames)
+                if cube:
+                    merged = merge_cubes([merged, chunk_cube(stage, frames)])
+
+        if dimensions is not None:
+            for table, df in dimensions.lookups().items():
+                writers[table] = open_table_writer(table, folder, fmt)
+                writers[table].write(df)
+
+        for writer in writers.values():
+            writer.close()
+        record.rows_out = sum(writer.rows for writer in writers.values())
+
+    return merged
+
+
+def transform_details(details_paths, chunk_size=CHUNK_SIZE, folder=CLEAN, builders=BUILDERS, workers=1,
+                      fmt=OUTPUT_FORMAT, cube=True):
+    """Stream details into movies + movie_genres; returns their genre x year cube (cube=True)."""
+    return transform_stage("details", details_paths, chunk_size, folder, builders, workers, fmt, cube)
+
+
+def transform_credits(credits_paths, chunk_size=CHUNK_SIZE, folder=CLEAN, builders=BUILDERS, workers=1,
+                      fmt=OUTPUT_FORMAT):
+    """Stream credits into cast + crew and their people / departments / jobs dimensions."""
+    transform_stage("credits", credits_paths, chunk_size, folder, builders, workers, fmt)
+
+
+def read_records_once(paths):
+    """Records of several stores, each movie once (the first store holding it wins)."""
+    return unique_records(read_many(paths))
+
+
+def default_inputs(name, folder=RAW, catalog=CATALOG_DIR):
+    """
+    The processed `name` store followed by the catalog ingest's shard
+    stores, whichever exist. The processed store comes first so its
+    (incrementally refreshed) records win over a shard's copy.
+    """
+    paths = [path for path in [find_store(folder, name)] if path is not None]
+    paths += sorted(Path(catalog).glob(f"shard_*-of-*.{name}.ndjson*"))
+    if not paths:
+        raise FileNotFoundError(f"Missing {name} store in {folder} and {catalog}")
+    return paths
+
+
+def update_changed_details(movie_ids, details_paths, chunk_size, folder, builders):
+    """
+    Incremental run: rebuild movies + movie_genres for the changed movies
+    only. Rows of other movies are copied from the current clean tables
+    as Arrow batches; the changed movies are rebuilt from their records in
+    the details stores (a movie missing there was removed and is dropped).
+    The existing cube is updated by removing the changed movies' old
+    contribution and adding their new one. Returns the updated cube.
+    """
+    ids = sorted(set(movie_ids))
+    changed = pc.field("movie_id").isin(ids)
+    before = cube_for_movies(ids, folder)
+    wanted = set(ids)
+
+    with METRICS.stage("transform.details") as record:
+        writers = {table: open_table_writer(table, folder) for table in STAGE_TABLES["details"]}
+
+        # The writers only replace the clean tables on close(), so the old
+        # rows are still readable here.
+        for table, writer in writers.items():
+            for batch in iter_clean_batches(table, folder, chunk_size, ~changed):
+                writer.write_arrow(pa.Table.from_batches([batch]).cast(SCHEMAS[table]))
+
+        records = (r for r in read_records_once(details_paths) if r["id"] in wanted)
+        after = []
+        for chunk in iter_chunks(record.count(records), chunk_size):
+            frames = {table: builders[table](chunk) for table in STAGE_TABLES["details"]}
+            for table, writer in writers.items():
+                writer.write(frames[table])
+            after.append(chunk_cube("details", frames))
+
+        for writer in writers.values():
+            writer.close()
+        record.rows_out = sum(writer.rows for writer in writers.values())
+
+    print(f"[OK] Rebuilt {record.rows_in} of {len(ids)} changed movies; cube updated")
+    return merge_cubes([read_cube(folder), negate(before)] + after)
+
+
+def run_transform(chunk_size=CHUNK_SIZE, details_paths=None, credits_paths=None, genres_path=None, folder=CLEAN,
+                  reference=False, workers=1, fmt=OUTPUT_FORMAT, changed_ids=None):
+    """
+    Build the clean tables from the processed stores.
+
+    details/credits are streamed from NDJSON (plain, .gz or .zst) or a
+    legacy JSON list; several paths (e.g. catalog shards) are read in turn,
+    each movie once. By default the processed stores and the catalog
+    shards in data/processed/catalog are read.
+    With workers > 1 chunks are built in a process pool; the output is
+    identical to a single-process run with the same chunk size.
+
+    The genre x year cube is built alongside movies. Given the ids changed
+    by an incremental extract (changed_ids) and an existing Parquet clean
+    layer, only those movies are rebuilt in movies / movie_genres and the
+    cube; credits are always transformed in full.
+    """
+    print("=== TMDB TRANSFORM STARTED ===")
+
+    with METRICS.stage("transform"):
+        details_paths = details_paths or default_inputs("details")
+        credits_paths = credits_paths or default_inputs("credits")
+        genres_path = genres_path or RAW / "genres.json"
+
+        print(
+            f"[OK] Reading {len(details_paths)} details and {len(credits_paths)} credits store(s), "
+            f"chunk size {chunk_size}, {workers} worker(s), {fmt} output"
+        )
+
+        builders = REFERENCE_BUILDERS if reference else BUILDERS
+
+        incremental = changed_ids is not None and fmt == "parquet" and read_cube(folder) is not None
+        if incremental and all(clean_path(table, folder).exists() for table in STAGE_TABLES["details"]):
+            cube = update_changed_details(changed_ids, details_paths, chunk_size, folder, builders)
+        else:
+            cube = transform_details(details_paths, chunk_size, folder, builders, workers, fmt)
+        write_cube(cube, folder)
+
+        transform_genres(genres_path, folder, fmt)
+        transform_credits(credits_paths, chunk_size, folder, builders, workers, fmt)
+
+    print("=== TMDB TRANSFORM FINISHED ===")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Records transformed per chunk")
+    parser.add_argument("--details", type=Path, nargs="+", help="Details stores (default: data/processed/details.* and catalog shards)")
+    parser.add_argument("--credits", type=Path, nargs="+", help="Credits stores (default: data/processed/credits.* and catalog shards)")
+    parser.add_argument("--genres", type=Path, help="Genres JSON (default: data/processed/genres.json)")
+    parser.add_argument("--format", choices=["parquet", "csv"], default=OUTPUT_FORMAT, help="Clean layer output format")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (0 = one per CPU core)")
+    parser.add_argument("--reference", action="store_true", help="Use the per-row reference builders")
+    parser.add_argument("--check-parity", action="store_true", help="Compare vectorized and reference builders on the input, then exit")
+    parser.add_argument("--changed-ids", type=Path, nargs="?", const=CHANGED_IDS_PATH,
+                        help="Rebuild movies, movie_genres and the cube only for these movie ids (default: data/processed/changed_ids.json)")
+    args = parser.parse_args()
+
+    if args.check_parity:
+        details = iter_chunks(read_records_once(args.details or default_inputs("details")), args.chunk_size)
+        credits = iter_chunks(read_records_once(args.credits or default_inputs("credits")), args.chunk_size)
+        for details_chunk, credits_chunk in zip(details, credits):
+            check_parity(details_chunk, credits_chunk)
+        print("[OK] Vectorized and reference builders produce identical tables")
+        return
+
+    changed_ids = None
+    if args.changed_ids and not args.changed_ids.exists():
+        # A full extract removes changed_ids.json: everything may have changed.
+        print(f"[WARN] {args.changed_ids} not found (the last extract was a full run); "
+              "rebuilding the clean layer and the cube in full")
+    elif args.changed_ids:
+        changed_ids = json.loads(args.changed_ids.read_text(encoding="utf-8"))
+
+    workers = args.workers or os.cpu_count()
+    run_transform(args.chunk_size, args.details, args.credits, args.genres, reference=args.reference, workers=workers,
+                  fmt=args.format, changed_ids=changed_ids)
+    METRICS.write_report("transform")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,242 @@
 import os
 import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
 import requests
 from dotenv import load_dotenv
 
+from .http_cache import CACHE
+from .instrumentation import METRICS, endpoint_label
+
 load_dotenv()
 TMDB_API_KEY = os.getenv("TMDB_API_KEY")
 
-BASE_URL = "https://api.themoviedb.org/3"
+# Overridable so the pipeline can run against a local stub server.
+BASE_URL = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3")
+
+# TMDB allows roughly 40-50 requests/second per IP; stay just below that.
+RATE_LIMIT = float(os.getenv("TMDB_RATE_LIMIT", "40"))
+MAX_WORKERS = int(os.getenv("TMDB_MAX_WORKERS", "8"))
+TIMEOUT = 30
+
+# 429s do not consume a retry, but a request that is throttled this many
+# times gives up.
+MAX_THROTTLED = 10
 
 
 class TMDBApiError(Exception):
     pass
 
 
-def request_tmdb(endpoint, params=None, retries=3, sleep=1):
-    if params is None:
-        params = {}
+class TMDBRateLimitError(TMDBApiError):
+    """Still answered 429 after MAX_THROTTLED throttled attempts."""
+
+
+class TMDBNotFoundError(TMDBApiError):
+    """404: the resource does not exist (e.g. a movie TMDB removed)."""
+
+
+# ============================================================
+# RATE LIMITING
+# ============================================================
+
+class TokenBucket:
+    """Thread-safe token bucket shared by every request to TMDB."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+
+                if now >= self.blocked_until:
+                    elapsed = now - self.updated
+                    self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+                    self.updated = now
+
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+
+                    wait = (1 - self.tokens) / self.rate
+                else:
+                    wait = self.blocked_until - now
+
+            time.sleep(wait)
+
+    def try_acquire(self):
+        """Take a token if one is available now; never waits."""
+        with self.lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return False
+
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def block(self, seconds):
+        """Pause every caller for `seconds` (used for 429 / Retry-After)."""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.updated = self.blocked_until
+            self.tokens = 0
+
+
+class RequestStats:
+    """Counters for requests sent to TMDB, shared across threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+
+    def record(self, status_code):
+        with self.lock:
+            self.requests += 1
+            if status_code == 429:
+                self.throttled += 1
+            elif status_code not in (200, 304):
+                self.errors += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "errors": self.errors,
+            }
+
+
+LIMITER = TokenBucket(RATE_LIMIT)
+STATS = RequestStats()
+
+_local = threading.local()
+
+
+def _session():
+    """One requests.Session per thread (connection reuse, no shared state)."""
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
 
-    params["api_key"] = TMDB_API_KEY
+def _retry_after(response, default=2.0):
+    """Seconds to wait from a Retry-After header: delay-seconds or an HTTP-date."""
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return default
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+# ============================================================
+# REQUESTS
+# ============================================================
+
+def retry(label, attempt, retries, sleep):
+    """Wait before the next attempt (none after the last one)."""
+    if attempt < retries:
+        METRICS.inc("tmdb_http_retries_total", endpoint=label)
+        time.sleep(sleep)
+
+
+def request_tmdb(endpoint, params=None, retries=3, sleep=1, refresh=False):
+    """
+    GET a TMDB endpoint through the response cache. With refresh=True the
+    cached copy is ignored (not even revalidated) and replaced by the new
+    response, e.g. for movies /movie/changes reports as edited.
+    """
+    params = dict(params or {})
+    label = endpoint_label(endpoint)
+
+    cached = None if refresh else CACHE.lookup(BASE_URL, endpoint, params)
+    if cached is not None and cached.fresh:
+        METRICS.inc("tmdb_http_cache_hits_total", endpoint=label)
+        return cached.data
+
+    headers = CACHE.revalidation_headers(cached)
+    query = {**params, "api_key": TMDB_API_KEY}
 
     url = f"{BASE_URL}{endpoint}"
 
-    for attempt in range(retries):
-        response = requests.get(url, params=params)
+    attempt = 0
+    throttled = 0
+
+    while attempt < retries:
+        LIMITER.acquire()
+
+        sent = time.perf_counter()
+        try:
+            response = _session().get(url, params=query, headers=headers, timeout=TIMEOUT)
+        except requests.RequestException as e:
+            print(f"[ERROR] TMDB request failed: {e}")
+            METRICS.inc("tmdb_http_requests_total", endpoint=label, status="error")
+            attempt += 1
+            retry(label, attempt, retries, sleep)
+            continue
+
+        METRICS.observe("tmdb_http_request_seconds", time.perf_counter() - sent, endpoint=label)
+        METRICS.inc("tmdb_http_requests_total", endpoint=label, status=response.status_code)
+        STATS.record(response.status_code)
+
+        if response.status_code == 304 and cached is not None:
+            return CACHE.revalidated(cached)
 
         if response.status_code == 429:
-            print("[WARN] Rate limit reached. Waiting 2 seconds...")
-            time.sleep(2)
+            throttled += 1
+            METRICS.inc("tmdb_http_throttled_total", endpoint=label)
+            if throttled >= MAX_THROTTLED:
+                raise TMDBRateLimitError(f"Rate limited after {throttled} throttled (429) attempts: {url}")
+
+            wait = _retry_after(response)
+            print(f"[WARN] Rate limit reached. Pausing all workers for {wait:.1f} seconds...")
+            LIMITER.block(wait)
             continue
 
+        if response.status_code == 404:
+            raise TMDBNotFoundError(f"TMDB API error (404) for {url}: {response.text}")
+        if 400 <= response.status_code < 500:
+            # Other client errors (401 for a bad key, 422 for bad params)
+            # will not succeed on retry either.
+            raise TMDBApiError(f"TMDB API error ({response.status_code}) for {url}: {response.text}")
+
         if response.status_code != 200:
             print(f"[ERROR] TMDB API error ({response.status_code}): {response.text}")
-            time.sleep(sleep)
+            attempt += 1
+            retry(label, attempt, retries, sleep)
             continue
 
-        return response.json()
+        data = response.json()
+        CACHE.store(BASE_URL, endpoint, params, data, etag=response.headers.get("ETag"))
+        return data
 
     raise TMDBApiError(f"Failed after {retries} attempts: {url}")
 
@@ -53,6 +255,57 @@ def paginated_request(endpoint, total_pages=5, params=None):
         if page >= data.get("total_pages", 1):
             break
 
-        time.sleep(0.2)
-
     return all_results
+
+
+def fetch_concurrent(func, items, max_workers=MAX_WORKERS, report=True):
+    """
+    Run `func(item)` over `items` on a bounded thread pool.
+
+    Yields (item, result) pairs in input order. At most 2 * max_workers
+    calls are in flight, so `items` may be an arbitrarily long iterator.
+    All calls share LIMITER, so concurrency never exceeds RATE_LIMIT.
+    A call raising TMDBApiError yields (item, None) instead of aborting
+    the whole batch. Set report=False when the caller reports the rate
+    for several concurrent batches itself.
+    """
+    def call(item):
+        try:
+            return func(item)
+        except TMDBApiError as e:
+            print(f"[ERROR] {e}")
+            return None
+
+    before = STATS.snapshot()
+    start = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = deque()
+
+        for item in items:
+            pending.append((item, pool.submit(call, item)))
+
+            if len(pending) >= 2 * max_workers:
+                done_item, future = pending.popleft()
+                yield done_item, future.result()
+
+        while pending:
+            done_item, future = pending.popleft()
+            yield done_item, future.result()
+
+    if report:
+        report_rate(before, time.monotonic() - start, max_workers)
+
+
+def report_rate(before, elapsed, max_workers):
+    """Print requests/sec since `before` (a STATS snapshot)."""
+    after = STATS.snapshot()
+    sent = after["requests"] - before["requests"]
+    throttled = after["throttled"] - before["throttled"]
+    errors = after["errors"] - before["errors"]
+    rate = sent / elapsed if elapsed > 0 else 0.0
+
+    print(
+        f"[RATE] {sent} requests in {elapsed:.1f}s → {rate:.1f} req/s "
+        f"(workers={max_workers}, limit={LIMITER.rate:g}/s, 429s={throttled}, errors={errors})"
+    )
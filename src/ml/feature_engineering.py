@@ -0,0 +1,390 @@
+import os
+import time
+import hashlib
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.etl.schemas import CLEAN_DIR, read_clean_frame
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+FEATURE_DIR = BASE_DIR / "data" / "features"
+
+# Bump when the feature definitions change: it is part of every store's
+# version, so old stores are never reused for new features.
+FEATURE_VERSION = 2
+
+# Cast members billed in the first TOP_BILLED positions count as "top billed".
+TOP_BILLED = 5
+
+# Feature stores kept on disk (older ones are deleted after a build).
+KEEP_STORES = 3
+
+# Columns read from the clean layer; the movie fingerprint covers the
+# movies, movie_genres, cast and crew columns (cast with each person's
+# gender joined in from people).
+INPUT_COLUMNS = {
+    "movies": ["movie_id", "release_date", "runtime", "popularity", "budget", "revenue"],
+    "movie_genres": ["movie_id", "genre_id"],
+    "cast": ["movie_id", "person_id", "order"],
+    "crew": ["movie_id", "person_id", "job_id"],
+    "people": ["person_id", "gender"],
+    "jobs": ["job_id", "name"],
+}
+
+DIRECTOR_JOB = "Director"
+
+# Dense numeric features, in design-matrix order (genres follow as multi-hot).
+NUMERIC_FEATURES = [
+    "release_year",
+    "release_month",
+    "release_year_missing",
+    "runtime",
+    "runtime_missing",
+    "log_budget",
+    "budget_missing",
+    "log_revenue",
+    "revenue_missing",
+    "cast_size",
+    "top_billed_count",
+    "top_billed_female_share",
+    "crew_size",
+    "director_count",
+    "director_prior_movies",
+    "top_cast_prior_movies",
+]
+
+
+# ============================================================
+# INPUTS
+# ============================================================
+
+def load_inputs(folder=CLEAN_DIR):
+    """The clean-table columns the features are built from, as DataFrames."""
+    tables = {table: read_clean_frame(table, folder, columns) for table, columns in INPUT_COLUMNS.items()}
+    tables["movies"]["release_date"] = pd.to_datetime(tables["movies"]["release_date"])
+
+    people = tables.pop("people").set_index("person_id")["gender"]
+    tables["cast"]["gender"] = tables["cast"]["person_id"].map(people)
+    return tables
+
+
+def movie_fingerprints(tables):
+    """
+    One uint64 per movie over its movies row and its genre, cast and crew
+    rows. Child rows are combined by a wrapping sum, so their order does
+    not matter.
+    """
+    movies = tables["movies"]
+    ids = movies["movie_id"].astype("int64").to_numpy()
+    parts = {"movie": pd.util.hash_pandas_object(movies, index=False).to_numpy()}
+
+    for table in ("movie_genres", "cast", "crew"):
+        df = tables[table]
+        hashed = pd.Series(pd.util.hash_pandas_object(df, index=False).to_numpy(), index=df["movie_id"].astype("int64"))
+        parts[table] = hashed.groupby(level=0).sum().reindex(ids, fill_value=0).to_numpy(dtype="uint64")
+
+    combined = pd.util.hash_pandas_object(pd.DataFrame(parts), index=False).to_numpy()
+    return pd.Series(combined, index=ids, name="fingerprint")
+
+
+def data_version(fingerprints):
+    """Hash of the feature definitions and every movie's fingerprint."""
+    ordered = fingerprints.sort_index()
+    digest = hashlib.sha256(f"features-v{FEATURE_VERSION}".encode())
+    digest.update(ordered.index.to_numpy(dtype="int64").tobytes())
+    digest.update(ordered.to_numpy(dtype="uint64").tobytes())
+    return digest.hexdigest()[:16]
+
+
+# ============================================================
+# FEATURE GROUPS (vectorized)
+# ============================================================
+
+def log_amount(values):
+    """log1p of a money column; TMDB stores unknown budget/revenue as 0."""
+    amount = values.astype("float64").where(values.astype("float64") > 0)
+    return np.log1p(amount), amount.isna().astype("int8")
+
+
+def movie_features(movies):
+    """Features that depend only on the movie's own row."""
+    dates = movies["release_date"]
+    runtime = movies["runtime"].astype("float64").where(movies["runtime"].astype("float64") > 0)
+    log_budget, budget_missing = log_amount(movies["budget"])
+    log_revenue, revenue_missing = log_amount(movies["revenue"])
+
+    return pd.DataFrame({
+        "movie_id": movies["movie_id"].astype("int64").to_numpy(),
+        "popularity": movies["popularity"].astype("float64").to_numpy(),
+        "release_year": dates.dt.year.astype("float64").to_numpy(),
+        "release_month": dates.dt.month.astype("float64").to_numpy(),
+        "release_year_missing": dates.isna().astype("int8").to_numpy(),
+        "runtime": runtime.to_numpy(),
+        "runtime_missing": runtime.isna().astype("int8").to_numpy(),
+        "log_budget": log_budget.to_numpy(),
+        "budget_missing": budget_missing.to_numpy(),
+        "log_revenue": log_revenue.to_numpy(),
+        "revenue_missing": revenue_missing.to_numpy(),
+    })
+
+
+def id_lists(links, column, movie_ids):
+    """Sorted `column` ids linked to every movie, e.g. its genres (a sparse multi-hot row)."""
+    links = links[["movie_id", column]].astype("int64").drop_duplicates().sort_values(["movie_id", column])
+    grouped = links.groupby("movie_id")[column].agg(list)
+    return grouped.reindex(movie_ids).apply(lambda ids: ids if isinstance(ids, list) else [])
+
+
+def credit_pairs(tables):
+    """(person_id, movie_id, release_date) of every director and top-billed actor credit."""
+    dates = tables["movies"][["movie_id", "release_date"]].astype({"movie_id": "int64"})
+
+    jobs, crew = tables["jobs"], tables["crew"]
+    director_jobs = jobs.loc[jobs["name"] == DIRECTOR_JOB, "job_id"]
+    directors = crew.loc[crew["job_id"].isin(director_jobs), ["person_id", "movie_id"]]
+
+    cast = tables["cast"]
+    top_cast = cast.loc[cast["order"].astype("float64") < TOP_BILLED, ["person_id", "movie_id"]]
+
+    pairs = {}
+    for role, df in (("director", directors), ("top_cast", top_cast)):
+        df = df.dropna().astype("int64").drop_duplicates()
+        pairs[role] = df.merge(dates, on="movie_id", how="inner")
+    return pairs
+
+
+def prior_movies(pairs):
+    """
+    For every (person, movie) credit, how many of the person's movies in
+    the catalog were released strictly earlier. Undated movies count as 0
+    and are never "prior" to anything.
+    """
+    days = pairs["release_date"].to_numpy(dtype="datetime64[D]").astype("float64")
+    days[pd.isna(pairs["release_date"]).to_numpy()] = np.nan
+    ranked = pd.Series(days, index=pairs.index).groupby(pairs["person_id"].to_numpy()).rank(method="min")
+    return (ranked - 1).fillna(0)
+
+
+def credit_features(tables, pairs, movie_ids):
+    """Cast / crew aggregates per movie, including director and top-cast history."""
+    cast, crew = tables["cast"], tables["crew"]
+    index = pd.Index(movie_ids, name="movie_id")
+
+    cast_ids = cast["movie_id"].astype("int64")
+    top = cast["order"].astype("float64") < TOP_BILLED
+    female = (cast["gender"].astype("float64") == 1) & top
+
+    features = pd.DataFrame(index=index)
+    features["cast_size"] = cast_ids.value_counts().reindex(index, fill_value=0)
+    features["top_billed_count"] = top.groupby(cast_ids).sum().reindex(index, fill_value=0)
+    # 0 without top-billed cast (top_billed_count says so); an all-missing
+    # column breaks histogram binning on small training subsets.
+    features["top_billed_female_share"] = (
+        female.groupby(cast_ids).sum().reindex(index, fill_value=0) / features["top_billed_count"].replace(0, np.nan)
+    ).fillna(0.0)
+    features["crew_size"] = crew["movie_id"].astype("int64").value_counts().reindex(index, fill_value=0)
+
+    directors, top_cast = pairs["director"], pairs["top_cast"]
+    features["director_count"] = directors["movie_id"].value_counts().reindex(index, fill_value=0)
+    features["director_prior_movies"] = (
+        prior_movies(directors).groupby(directors["movie_id"].to_numpy()).max().reindex(index, fill_value=0)
+    )
+    features["top_cast_prior_movies"] = (
+        prior_movies(top_cast).groupby(top_cast["movie_id"].to_numpy()).mean().reindex(index, fill_value=0)
+    )
+
+    # People behind the history features; an incremental build uses them to
+    # find the other movies a change affects.
+    features["director_ids"] = id_lists(directors, "person_id", index)
+    features["top_cast_ids"] = id_lists(top_cast, "person_id", index)
+    return features.reset_index()
+
+
+def build_feature_frame(tables, pairs, fingerprints, movie_ids=None):
+    """Feature rows for `movie_ids` (default: every movie), sorted by movie_id."""
+    movies = tables["movies"]
+    if movie_ids is not None:
+        movies = movies[movies["movie_id"].astype("int64").isin(movie_ids)]
+
+    features = movie_features(movies).sort_values("movie_id").reset_index(drop=True)
+    ids = features["movie_id"].to_numpy()
+
+    features = features.merge(credit_features(tables, pairs, ids), on="movie_id", how="left")
+    features["genre_ids"] = id_lists(tables["movie_genres"], "genre_id", ids).to_numpy()
+    features["fingerprint"] = fingerprints.reindex(ids).to_numpy(dtype="uint64")
+    return features
+
+
+# ============================================================
+# FEATURE STORE
+# ============================================================
+
+def store_path(version, folder=FEATURE_DIR):
+    return Path(folder) / f"features-v{FEATURE_VERSION}-{version}.parquet"
+
+
+def stores(folder=FEATURE_DIR):
+    """Stores built with the current feature definitions, oldest first."""
+    return sorted(Path(folder).glob(f"features-v{FEATURE_VERSION}-*.parquet"), key=lambda p: p.stat().st_mtime)
+
+
+def latest_store(folder=FEATURE_DIR):
+    found = stores(folder)
+    return found[-1] if found else None
+
+
+def affected_movies(previous, pairs, changed, removed):
+    """
+    Movies whose history features can change: the changed movies plus every
+    movie sharing a director or top-billed actor with a changed or removed
+    movie (before or after the change).
+    """
+    touched = previous[previous["movie_id"].isin(changed | removed)]
+    people = set()
+    for column in ("director_ids", "top_cast_ids"):
+        for ids in touched[column]:
+            people.update(int(i) for i in ids)
+
+    affected = set(changed)
+    for credits in pairs.values():
+        new_people = set(credits.loc[credits["movie_id"].isin(changed), "person_id"])
+        affected.update(credits.loc[credits["person_id"].isin(people | new_people), "movie_id"])
+    return affected
+
+
+def write_store(features, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    pq.write_table(pa.Table.from_pandas(features, preserve_index=False), tmp, compression="zstd")
+    os.replace(tmp, path)
+
+
+def prune_stores(keep, folder=FEATURE_DIR):
+    """Keep the newest `keep` stores; stores of older feature definitions are dropped."""
+    current = stores(folder)
+    for path in Path(folder).glob("features-*.parquet"):
+        if path not in current[-keep:]:
+            path.unlink(missing_ok=True)
+
+
+def build_features(folder=CLEAN_DIR, store=FEATURE_DIR, force=False):
+    """
+    Feature table for the current clean data, returned as (version, path).
+
+    The store is keyed by the data version, so an unchanged catalog reuses
+    the existing file. Otherwise only movies whose fingerprint changed (and
+    movies whose history features they affect) are recomputed; every other
+    row is copied from the most recent store.
+    """
+    start = time.perf_counter()
+    tables = load_inputs(folder)
+    fingerprints = movie_fingerprints(tables)
+    version = data_version(fingerprints)
+    path = store_path(version, store)
+
+    if path.exists() and not force:
+        print(f"[OK] Features up to date (version {version})")
+        return version, path
+
+    pairs = credit_pairs(tables)
+    previous_path = None if force else latest_store(store)
+
+    if previous_path is None:
+        features = build_feature_frame(tables, pairs, fingerprints)
+        print(f"[OK] Built features for {len(features)} movies")
+    else:
+        previous = pd.read_parquet(previous_path)
+        old = pd.Series(previous["fingerprint"].to_numpy(dtype="uint64"), index=previous["movie_id"])
+        common = old.index.intersection(fingerprints.index)
+        differs = fingerprints[common].to_numpy() != old[common].to_numpy()
+
+        changed = set(fingerprints.index.difference(old.index)) | set(common[differs])
+        removed = set(old.index.difference(fingerprints.index))
+        recompute = affected_movies(previous, pairs, changed, removed)
+
+        kept = previous[~previous["movie_id"].isin(recompute | removed)]
+        fresh = build_feature_frame(tables, pairs, fingerprints, recompute)
+        features = pd.concat([kept, fresh], ignore_index=True).sort_values("movie_id").reset_index(drop=True)
+        print(
+            f"[OK] Recomputed features for {len(fresh)} of {len(features)} movies "
+            f"({len(changed)} changed, {len(removed)} removed) from {previous_path.name}"
+        )
+
+    write_store(features, path)
+    prune_stores(KEEP_STORES, store)
+    print(f"[SAVED] {path.name} ({len(features)} rows) in {time.perf_counter() - start:.2f}s")
+    return version, path
+
+
+def load_features(version=None, store=FEATURE_DIR):
+    """A stored feature table (default: the most recent one) and its version."""
+    path = store_path(version, store) if version else latest_store(store)
+    if path is None or not path.exists():
+        raise FileNotFoundError(f"[ERROR] No feature store found in {store} (run feature_engineering)")
+    return pd.read_parquet(path), path.stem.rsplit("-", 1)[1]
+
+
+# ============================================================
+# MODEL INPUTS
+# ============================================================
+
+def genre_matrix(features, genre_ids=None):
+    """
+    Multi-hot genres (one row per feature row). Columns follow `genre_ids`
+    (default: every genre present, sorted); unknown genres are dropped so a
+    fitted model keeps its column layout.
+    """
+    lists = features["genre_ids"].to_numpy()
+    lengths = np.fromiter((len(g) for g in lists), dtype="int64", count=len(lists))
+    values = np.concatenate([np.asarray(g, dtype="int64") for g in lists]) if len(lists) else np.empty(0, "int64")
+
+    if genre_ids is None:
+        genre_ids = np.unique(values)
+    genre_ids = np.asarray(genre_ids, dtype="int64")
+
+    rows = np.repeat(np.arange(len(lists)), lengths)
+    known = np.isin(values, genre_ids)
+    columns = np.searchsorted(genre_ids, values[known])
+
+    matrix = np.zeros((len(lists), len(genre_ids)), dtype="float64")
+    matrix[rows[known], columns] = 1.0
+    return matrix, genre_ids
+
+
+def design_matrix(features, genre_ids=None):
+    """
+    Dense model input: the numeric features (NaN kept, for models that
+    handle missing values) followed by the genre multi-hot columns.
+    HistGradientBoostingRegressor bins dense input only, and with ~20
+    genres the matrix is small. Returns (matrix, column names, genre ids).
+    """
+    genres, genre_ids = genre_matrix(features, genre_ids)
+    numeric = features[NUMERIC_FEATURES].to_numpy(dtype="float64")
+    names = NUMERIC_FEATURES + [f"genre_{g}" for g in genre_ids]
+    return np.hstack([numeric, genres]), names, genre_ids
+
+
+# ============================================================
+# MAIN
+# ============================================================
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clean-dir", type=Path, default=CLEAN_DIR, help="Clean layer to read")
+    parser.add_argument("--force", action="store_true", help="Rebuild every movie's features from scratch")
+    args = parser.parse_args()
+
+    build_features(args.clean_dir, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
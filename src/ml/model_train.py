@@ -0,0 +1,228 @@
+import os
+import time
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from scipy.stats import loguniform, randint
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables HalvingRandomSearchCV)
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import HalvingRandomSearchCV, train_test_split
+
+from src.etl.schemas import CLEAN_DIR
+from .feature_engineering import FEATURE_DIR, FEATURE_VERSION, build_features, load_features, design_matrix
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+MODEL_PATH = BASE_DIR / "data" / "models" / "popularity_model.joblib"
+PREDICTIONS_PATH = BASE_DIR / "data" / "predictions" / "popularity_predictions.parquet"
+
+RANDOM_STATE = 42
+TEST_SIZE = 0.2
+CV_FOLDS = 5
+
+# Random configurations sampled for successive halving; each round keeps
+# the best 1/HALVING_FACTOR of them and gives them HALVING_FACTOR x more rows,
+# ending on the full training set.
+N_CANDIDATES = 48
+HALVING_FACTOR = 3
+
+# Feature rows scored per chunk.
+SCORE_CHUNK_ROWS = 100000
+
+PARAM_DISTRIBUTIONS = {
+    "learning_rate": loguniform(0.02, 0.3),
+    "max_leaf_nodes": randint(15, 128),
+    "min_samples_leaf": randint(10, 200),
+    "l2_regularization": loguniform(1e-3, 10.0),
+}
+
+
+def base_model():
+    """Gradient boosting on log popularity; stops adding trees once validation loss stalls."""
+    return HistGradientBoostingRegressor(
+        max_iter=500,
+        early_stopping=True,
+        validation_fraction=0.1,
+        n_iter_no_change=20,
+        random_state=RANDOM_STATE,
+    )
+
+
+def target(features):
+    return np.log1p(features["popularity"].to_numpy(dtype="float64"))
+
+
+# ============================================================
+# TRAINING
+# ============================================================
+
+def train(folder=CLEAN_DIR, n_candidates=N_CANDIDATES, folds=CV_FOLDS, n_jobs=-1, model_path=MODEL_PATH,
+          store=FEATURE_DIR):
+    """
+    Build (or reuse) the feature store, run a successive-halving random
+    search with cross-validation across `n_jobs` worker processes, and save
+    the best model together with the feature version it was trained on.
+    """
+    print("=== POPULARITY MODEL TRAINING ===")
+
+    version, _ = build_features(folder, store)
+    features, _ = load_features(version, store)
+    features = features[features["popularity"].notna()].reset_index(drop=True)
+
+    X, columns, genre_ids = design_matrix(features)
+    y = target(features)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+
+    search = HalvingRandomSearchCV(
+        base_model(),
+        PARAM_DISTRIBUTIONS,
+        n_candidates=n_candidates,
+        factor=HALVING_FACTOR,
+        min_resources="exhaust",
+        cv=folds,
+        scoring="neg_root_mean_squared_error",
+        n_jobs=n_jobs,
+        random_state=RANDOM_STATE,
+        return_train_score=False,
+    )
+
+    start = time.perf_counter()
+    search.fit(X_train, y_train)
+    elapsed = time.perf_counter() - start
+
+    fits = int(np.sum(search.n_candidates_)) * folds
+    print(
+        f"[OK] Search: {n_candidates} candidates, {search.n_iterations_} halving rounds, {fits} fits "
+        f"on {n_jobs if n_jobs > 0 else os.cpu_count()} worker(s) in {elapsed:.1f}s "
+        f"({len(X_train) / elapsed:,.0f} training rows/sec)"
+    )
+    params = {
+        name: int(value) if isinstance(value, (int, np.integer)) else round(float(value), 4)
+        for name, value in search.best_params_.items()
+    }
+    print(f"[OK] Best params: {params} (CV RMSE {-search.best_score_:.4f})")
+
+    predicted = search.best_estimator_.predict(X_test)
+    metrics = {
+        "rmse_log": float(np.sqrt(mean_squared_error(y_test, predicted))),
+        "r2_log": float(r2_score(y_test, predicted)),
+        "cv_rmse_log": float(-search.best_score_),
+    }
+    print(f"[OK] Holdout RMSE (log popularity) {metrics['rmse_log']:.4f}, R² {metrics['r2_log']:.3f}")
+
+    bundle = {
+        "model": search.best_estimator_,
+        "feature_version": version,
+        "feature_definitions": FEATURE_VERSION,
+        "columns": columns,
+        "genre_ids": genre_ids,
+        "params": params,
+        "metrics": metrics,
+        "trained_at": datetime.now(timezone.utc).isoformat(),
+        "train_rows": len(X_train),
+        "train_seconds": elapsed,
+    }
+
+    model_path = Path(model_path)
+    model_path.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(bundle, model_path)
+    print(f"[SAVED] {model_path.name} (features {version})")
+    return bundle
+
+
+# ============================================================
+# BATCH SCORING
+# ============================================================
+
+def load_model(model_path=MODEL_PATH):
+    model_path = Path(model_path)
+    if not model_path.exists():
+        raise FileNotFoundError(f"[ERROR] No trained model at {model_path} (run model_train first)")
+
+    bundle = joblib.load(model_path)
+    if bundle["feature_definitions"] != FEATURE_VERSION:
+        raise ValueError(
+            f"[ERROR] Model was trained on feature definitions v{bundle['feature_definitions']}, "
+            f"current code builds v{FEATURE_VERSION}; retrain the model"
+        )
+    return bundle
+
+
+def score_catalog(folder=CLEAN_DIR, model_path=MODEL_PATH, output=PREDICTIONS_PATH, chunk_rows=SCORE_CHUNK_ROWS,
+                  store=FEATURE_DIR):
+    """
+    Predict popularity for every movie in the current feature store, in
+    chunks of `chunk_rows`, and write the predictions as a Parquet table.
+    """
+    print("=== POPULARITY BATCH SCORING ===")
+
+    bundle = load_model(model_path)
+    version, path = build_features(folder, store)
+    if version != bundle["feature_version"]:
+        print(f"[WARN] Model trained on features {bundle['feature_version']}, scoring features {version}")
+
+    schema = pa.schema([
+        ("movie_id", pa.int64()),
+        ("predicted_popularity", pa.float64()),
+        ("feature_version", pa.string()),
+        ("model_trained_at", pa.string()),
+    ])
+
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output.with_name(output.name + ".tmp")
+
+    rows = 0
+    start = time.perf_counter()
+    with pq.ParquetWriter(tmp, schema, compression="zstd") as writer:
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            features = batch.to_pandas()
+            X, _, _ = design_matrix(features, bundle["genre_ids"])
+            predicted = np.expm1(bundle["model"].predict(X))
+
+            writer.write_table(pa.table({
+                "movie_id": features["movie_id"].to_numpy(dtype="int64"),
+                "predicted_popularity": predicted,
+                "feature_version": pa.array([version] * len(features), pa.string()),
+                "model_trained_at": pa.array([bundle["trained_at"]] * len(features), pa.string()),
+            }, schema=schema))
+            rows += len(features)
+
+    os.replace(tmp, output)
+    elapsed = time.perf_counter() - start
+    print(f"[SAVED] {output.name} ({rows} rows) in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/sec)")
+    return output
+
+
+# ============================================================
+# MAIN
+# ============================================================
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--score", action="store_true", help="Score the whole catalog with the saved model")
+    parser.add_argument("--clean-dir", type=Path, default=CLEAN_DIR, help="Clean layer to build features from")
+    parser.add_argument("--candidates", type=int, default=N_CANDIDATES, help="Random configurations to search")
+    parser.add_argument("--folds", type=int, default=CV_FOLDS, help="Cross-validation folds")
+    parser.add_argument("--jobs", type=int, default=-1, help="Worker processes for the search (-1 = all cores)")
+    parser.add_argument("--chunk-rows", type=int, default=SCORE_CHUNK_ROWS, help="Rows scored per chunk")
+    args = parser.parse_args()
+
+    if args.score:
+        score_catalog(args.clean_dir, chunk_rows=args.chunk_rows)
+        return
+
+    train(args.clean_dir, args.candidates, args.folds, args.jobs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import shutil
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.etl.schemas import read_clean_frame
+from src.etl.transform_tmdb import open_table_writer
+from src.ml import feature_engineering
+from src.ml.feature_engineering import (
+    NUMERIC_FEATURES, build_features, design_matrix, load_features, prior_movies, stores,
+)
+
+
+def edit_movie(folder, **values):
+    """Change the first movie's row in a clean layer; returns its id."""
+    movies = read_clean_frame("movies", folder)
+    for column, value in values.items():
+        movies.loc[0, column] = value
+    writer = open_table_writer("movies", folder)
+    writer.write(movies)
+    writer.close()
+    return int(movies.loc[0, "movie_id"])
+
+
+@pytest.fixture
+def clean(synthetic_clean, tmp_path):
+    return shutil.copytree(synthetic_clean, tmp_path / "clean")
+
+
+def test_prior_movies_only_counts_earlier_releases():
+    pairs = pd.DataFrame({
+        "person_id": [1, 1, 1, 1, 1, 2],
+        "movie_id": [10, 11, 12, 13, 14, 11],
+        "release_date": pd.to_datetime(["2000-01-01", "2005-06-01", "2005-06-01", None, "2010-01-01", "2005-06-01"]),
+    })
+
+    # Same-day releases are not "prior" to each other and undated movies never count.
+    assert prior_movies(pairs).tolist() == [0, 1, 1, 0, 3, 0]
+
+
+def test_later_movies_do_not_leak_into_earlier_features(clean, tmp_path):
+    _, path = build_features(clean, tmp_path / "before")
+    before = pd.read_parquet(path).set_index("movie_id")
+
+    # Moving a movie into the future only changes its own history features and
+    # those of later movies by the same people.
+    moved = edit_movie(clean, release_date=date(2099, 1, 1))
+    _, path = build_features(clean, tmp_path / "after")
+    after = pd.read_parquet(path).set_index("movie_id")
+
+    history = ["director_prior_movies", "top_cast_prior_movies"]
+    earlier = before.index[(before["release_year"] < 2099) & (before.index != moved)]
+    unchanged = after.loc[earlier, history] <= before.loc[earlier, history]
+    assert unchanged.all().all()
+    assert after.loc[moved, "director_prior_movies"] >= before.loc[moved, "director_prior_movies"]
+
+
+def test_target_is_not_a_model_input(synthetic_clean, tmp_path):
+    _, path = build_features(synthetic_clean, tmp_path)
+    features = pd.read_parquet(path)
+    X, columns, _ = design_matrix(features)
+
+    assert "popularity" not in columns and "popularity" not in NUMERIC_FEATURES
+    shuffled = features.assign(popularity=np.random.default_rng(0).permutation(features["popularity"].to_numpy()))
+    np.testing.assert_array_equal(design_matrix(shuffled)[0], X)
+
+
+def test_design_matrix_is_dense_with_stable_genre_columns(synthetic_clean, tmp_path):
+    _, path = build_features(synthetic_clean, tmp_path)
+    features = pd.read_parquet(path)
+    X, columns, genre_ids = design_matrix(features)
+
+    assert isinstance(X, np.ndarray) and X.shape == (len(features), len(columns))
+    assert X[:, len(NUMERIC_FEATURES):].sum() == sum(len(g) for g in features["genre_ids"])
+
+    # Scoring a subset keeps the training layout, dropping genres it never saw.
+    subset, _, _ = design_matrix(features.head(5), genre_ids[:-1])
+    assert subset.shape == (5, len(columns) - 1)
+
+
+def test_unchanged_catalog_reuses_the_store(synthetic_clean, tmp_path):
+    version, path = build_features(synthetic_clean, tmp_path)
+    modified = path.stat().st_mtime_ns
+
+    assert build_features(synthetic_clean, tmp_path) == (version, path)
+    assert path.stat().st_mtime_ns == modified
+    assert load_features(store=tmp_path)[1] == version
+
+
+def test_incremental_build_matches_a_full_build(clean, tmp_path):
+    store = tmp_path / "features"
+    first, _ = build_features(clean, store)
+
+    edit_movie(clean, runtime=321, budget=12_345_678)
+    version, path = build_features(clean, store)
+    _, full = build_features(clean, tmp_path / "full", force=True)
+
+    assert version != first
+    pd.testing.assert_frame_equal(pd.read_parquet(path), pd.read_parquet(full))
+
+
+def test_new_feature_definitions_rebuild_and_prune(synthetic_clean, tmp_path, monkeypatch):
+    old_version, old_path = build_features(synthetic_clean, tmp_path)
+
+    monkeypatch.setattr(feature_engineering, "FEATURE_VERSION", feature_engineering.FEATURE_VERSION + 1)
+    version, path = build_features(synthetic_clean, tmp_path)
+
+    assert version != old_version and path != old_path
+    assert not old_path.exists()
+    assert stores(tmp_path) == [path]
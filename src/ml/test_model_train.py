@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.ml import feature_engineering, model_train
+from src.ml.feature_engineering import design_matrix, load_features
+
+
+@pytest.fixture(scope="module")
+def trained(synthetic_clean, tmp_path_factory):
+    folder = tmp_path_factory.mktemp("model")
+    model_path = folder / "model.joblib"
+    bundle = model_train.train(synthetic_clean, n_candidates=4, folds=2, n_jobs=1, model_path=model_path,
+                               store=folder / "features")
+    return folder, model_path, bundle
+
+
+def test_train_saves_the_model_with_its_feature_version(trained):
+    folder, model_path, bundle = trained
+    saved = model_train.load_model(model_path)
+
+    assert saved["feature_version"] == bundle["feature_version"] == load_features(store=folder / "features")[1]
+    assert saved["columns"][-len(saved["genre_ids"]):] == [f"genre_{g}" for g in saved["genre_ids"]]
+    assert np.isfinite(saved["metrics"]["rmse_log"])
+
+
+def test_scoring_round_trip(synthetic_clean, trained):
+    folder, model_path, bundle = trained
+    output = folder / "predictions.parquet"
+
+    model_train.score_catalog(synthetic_clean, model_path, output, chunk_rows=64, store=folder / "features")
+
+    predictions = pd.read_parquet(output)
+    features, version = load_features(store=folder / "features")
+    X, _, _ = design_matrix(features, bundle["genre_ids"])
+
+    assert predictions["movie_id"].tolist() == features["movie_id"].tolist()
+    assert set(predictions["feature_version"]) == {version}
+    np.testing.assert_allclose(predictions["predicted_popularity"], np.expm1(bundle["model"].predict(X)))
+
+
+def test_model_of_other_feature_definitions_is_refused(trained, monkeypatch):
+    _, model_path, _ = trained
+    monkeypatch.setattr(model_train, "FEATURE_VERSION", feature_engineering.FEATURE_VERSION + 1)
+
+    with pytest.raises(ValueError, match="retrain the model"):
+        model_train.load_model(model_path)
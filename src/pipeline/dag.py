@@ -0,0 +1,232 @@
+import json
+import time
+import hashlib
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timezone
+from pathlib import Path
+
+from src.etl.storage import write_checkpoint, read_checkpoint
+from src.etl.instrumentation import METRICS
+
+# ============================================================
+# STAGES
+# ============================================================
+
+# name: unique id; run: callable; deps: names of upstream stages;
+# inputs / outputs / code: files or directories whose content is hashed;
+# params: JSON-able settings that change the result; max_age: seconds after
+# which the stage reruns even if nothing changed (e.g. API snapshots).
+Stage = namedtuple("Stage", ["name", "run", "deps", "inputs", "outputs", "code", "params", "max_age"])
+
+
+def stage(name, run, deps=(), inputs=(), outputs=(), code=(), params=None, max_age=None):
+    return Stage(name, run, tuple(deps), tuple(inputs), tuple(outputs), tuple(code), params or {}, max_age)
+
+
+# Files never hashed inside output directories (writers' temporary files).
+IGNORED_SUFFIXES = (".tmp", ".old")
+
+
+# ============================================================
+# CONTENT HASHES
+# ============================================================
+
+class ContentHasher:
+    """
+    sha256 of files and directories. A file's hash is remembered with its
+    size and mtime, so unchanged files are not re-read on the next run.
+    """
+
+    def __init__(self, memo=None):
+        self.memo = memo or {}
+        self.lock = threading.Lock()
+
+    def file_hash(self, path):
+        stat = path.stat()
+        key = str(path.resolve())
+
+        with self.lock:
+            known = self.memo.get(key)
+        if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            return known["sha256"]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+
+        with self.lock:
+            self.memo[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+        return digest.hexdigest()
+
+    def files(self, path):
+        path = Path(path)
+        if path.is_dir():
+            return sorted(
+                f for f in path.rglob("*")
+                if f.is_file() and not f.name.endswith(IGNORED_SUFFIXES)
+            )
+        return [path] if path.exists() else []
+
+    def hash_paths(self, paths):
+        """One hash over every file under `paths`; a missing path hashes as missing."""
+        digest = hashlib.sha256()
+        for path in paths:
+            path = Path(path)
+            digest.update(str(path).encode())
+            found = self.files(path)
+            if not found:
+                digest.update(b"<missing>")
+            for f in found:
+                digest.update(f"{f.relative_to(path) if path.is_dir() else f.name}:{self.file_hash(f)}".encode())
+        return digest.hexdigest()
+
+    def input_hash(self, s):
+        digest = hashlib.sha256()
+        digest.update(self.hash_paths(s.code).encode())
+        digest.update(self.hash_paths(s.inputs).encode())
+        digest.update(json.dumps(s.params, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+
+# ============================================================
+# SELECTION
+# ============================================================
+
+def descendants(stages, name):
+    found, frontier = {name}, [name]
+    while frontier:
+        current = frontier.pop()
+        for s in stages.values():
+            if current in s.deps and s.name not in found:
+                found.add(s.name)
+                frontier.append(s.name)
+    return found
+
+
+def ancestors(stages, name):
+    found, frontier = {name}, [name]
+    while frontier:
+        for dep in stages[frontier.pop()].deps:
+            if dep not in found:
+                found.add(dep)
+                frontier.append(dep)
+    return found
+
+
+def select(stages, start=None, until=None, skip=()):
+    """
+    Stage names to consider: `start` and everything after it, up to `until`
+    and everything before it, minus `skip`.
+    """
+    for name in (start, until, *skip):
+        if name is not None and name not in stages:
+            raise ValueError(f"[ERROR] Unknown stage '{name}' (stages: {', '.join(stages)})")
+
+    selected = set(stages)
+    if start:
+        selected &= descendants(stages, start)
+    if until:
+        selected &= ancestors(stages, until)
+    return selected - set(skip)
+
+
+# ============================================================
+# RUNNER
+# ============================================================
+
+def is_fresh(s, record, input_hash, hasher):
+    """True if the last run of `s` saw the same inputs and its outputs are untouched."""
+    if not record or record.get("inputs") != input_hash:
+        return False
+    if s.outputs and record.get("outputs") != hasher.hash_paths(s.outputs):
+        return False
+    if s.max_age is not None:
+        finished = datetime.fromisoformat(record["finished_at"])
+        if (datetime.now(timezone.utc) - finished).total_seconds() > s.max_age:
+            return False
+    return True
+
+
+def run_dag(stages, state_path, start=None, until=None, skip=(), force=False, workers=4, dry_run=False):
+    """
+    Run the selected stages in dependency order, independent ones side by
+    side on `workers` threads. A stage is skipped when its code, inputs and
+    params hash the same as on its last successful run and its outputs are
+    unchanged. Returns {stage name: status}.
+    """
+    stages = {s.name: s for s in stages}
+    selected = select(stages, start, until, skip)
+
+    state = read_checkpoint(state_path) or {}
+    hasher = ContentHasher(state.pop("_files", {}))
+    state_lock = threading.Lock()
+
+    status = {name: "not selected" for name in stages if name not in selected}
+    timings = {}
+
+    def save_state():
+        write_checkpoint(state_path, {**state, "_files": hasher.memo})
+
+    def execute(s):
+        input_hash = hasher.input_hash(s)
+        if not force and is_fresh(s, state.get(s.name), input_hash, hasher):
+            return "skipped"
+        if dry_run:
+            return "would run"
+
+        print(f"[RUN] {s.name}")
+        with METRICS.stage(f"pipeline.{s.name}"):
+            s.run()
+
+        with state_lock:
+            state[s.name] = {
+                "inputs": input_hash,
+                "outputs": hasher.hash_paths(s.outputs) if s.outputs else None,
+                "finished_at": datetime.now(timezone.utc).isoformat(),
+            }
+            save_state()
+        return "ran"
+
+    def ready(name):
+        deps = stages[name].deps
+        return all(status.get(d) in ("ran", "skipped", "would run", "not selected") for d in deps)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        running = {}
+
+        while True:
+            for name in stages:
+                if name in status or name in running.values():
+                    continue
+                if any(status.get(d) in ("failed", "blocked") for d in stages[name].deps):
+                    status[name] = "blocked"
+                elif ready(name):
+                    timings[name] = time.perf_counter()
+                    running[pool.submit(execute, stages[name])] = name
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                timings[name] = time.perf_counter() - timings[name]
+                try:
+                    status[name] = future.result()
+                except Exception as e:
+                    print(f"[ERROR] Stage '{name}' failed: {e}")
+                    status[name] = "failed"
+
+    if not dry_run:
+        with state_lock:
+            save_state()
+
+    for name in stages:
+        if name in selected:
+            elapsed = f" ({timings[name]:.1f}s)" if status[name] == "ran" else ""
+            print(f"  {name:<16} {status[name]}{elapsed}")
+
+    return status
@@ -0,0 +1,166 @@
+import os
+import re
+import argparse
+from pathlib import Path
+
+from src.etl.schemas import SCHEMAS, clean_path
+from src.etl.storage import ndjson_path
+from src.etl.aggregate_cube import cube_path
+from src.etl.instrumentation import METRICS
+from .dag import stage, run_dag
+
+# ============================================================
+# PATHS
+# ============================================================
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+SRC = BASE_DIR / "src"
+RAW_DIR = BASE_DIR / "data" / "raw"
+PROCESSED_DIR = BASE_DIR / "data" / "processed"
+
+STATE_PATH = PROCESSED_DIR / "pipeline_state.json"
+
+# List snapshots are refreshed when older than this, even if nothing else
+# changed (same TTL as the HTTP cache uses for list endpoints).
+LIST_MAX_AGE = 6 * 3600
+
+# Stages running side by side (they mostly wait on the API or a database).
+STAGE_WORKERS = 4
+
+ETL = SRC / "etl"
+CLEAN_TABLES = [clean_path(table) for table in SCHEMAS]
+
+# Relative imports inside a package (top-level or inside a function).
+RELATIVE_IMPORT = re.compile(r"^[ \t]*from \.(\w+) import", re.MULTILINE)
+
+
+def package_imports(path):
+    """`path` and every module of its package it imports, directly or through another module."""
+    found, todo = set(), [Path(path)]
+    while todo:
+        module = todo.pop()
+        if module in found or not module.exists():
+            continue
+        found.add(module)
+        todo += [module.parent / f"{name}.py" for name in RELATIVE_IMPORT.findall(module.read_text(encoding="utf-8"))]
+    return sorted(found)
+
+
+# transform_tmdb and everything it imports from src/etl, so a new helper
+# module is covered without being listed here.
+TRANSFORM_CODE = package_imports(ETL / "transform_tmdb.py")
+
+
+# ============================================================
+# STAGE ACTIONS (imported lazily: the loaders connect on import)
+# ============================================================
+
+def list_extract(name):
+    def run():
+        from src.etl.extract_tmdb import LIST_EXTRACTS
+        LIST_EXTRACTS[name]()
+    return run
+
+
+def extract_details(workers, compression):
+    from src.etl.extract_tmdb import extract_popular_details
+    extract_popular_details(workers, compression)
+
+
+def transform(compression, workers):
+    from src.etl.transform_tmdb import run_transform
+    run_transform(
+        details_paths=[ndjson_path(PROCESSED_DIR, "details", compression)],
+        credits_paths=[ndjson_path(PROCESSED_DIR, "credits", compression)],
+        genres_path=RAW_DIR / "genres.json",
+        workers=workers,
+    )
+
+
+def load_postgres():
+    from src.etl.load_tmdb import load_all
+    load_all()
+
+
+def load_bigquery():
+    from src.cloud.bigquery_load import load_clean_data
+    load_clean_data()
+
+
+# ============================================================
+# PIPELINE
+# ============================================================
+
+def pipeline(extract_workers=8, transform_workers=1, compression="none"):
+    """extract (lists -> details) -> transform -> Postgres and BigQuery loads."""
+    list_code = [ETL / "extract_tmdb.py", ETL / "utils_api.py"]
+    stores = [ndjson_path(PROCESSED_DIR, name, compression) for name in ("details", "credits")]
+
+    stages = [
+        stage(name, list_extract(name), outputs=[RAW_DIR / f"{name}.json"], code=list_code, max_age=LIST_MAX_AGE)
+        for name in ("popular", "top_rated", "upcoming", "trending", "genres")
+    ]
+
+    stages += [
+        stage(
+            "details", lambda: extract_details(extract_workers, compression),
+            deps=["popular"],
+            inputs=[RAW_DIR / "popular.json"],
+            outputs=stores,
+            code=list_code + [ETL / "storage.py"],
+            params={"compression": compression},
+        ),
+        stage(
+            "transform", lambda: transform(compression, transform_workers),
+            deps=["details", "genres"],
+            inputs=stores + [RAW_DIR / "genres.json"],
+            outputs=CLEAN_TABLES + [cube_path()],
+            code=TRANSFORM_CODE,
+        ),
+        stage(
+            "load_postgres", load_postgres,
+            deps=["transform"],
+            inputs=CLEAN_TABLES,
+            code=[ETL / "load_tmdb.py", ETL / "schemas.py", SRC / "config" / "create_schema.py"],
+            params={"database": os.getenv("DATABASE_URL")},
+        ),
+        stage(
+            "load_bigquery", load_bigquery,
+            deps=["transform"],
+            inputs=CLEAN_TABLES,
+            code=[SRC / "cloud" / "bigquery_load.py", ETL / "schemas.py"],
+            params={"project": os.getenv("GCP_PROJECT_ID"), "dataset": os.getenv("BIGQUERY_DATASET")},
+        ),
+    ]
+    return stages
+
+
+# ============================================================
+# MAIN
+# ============================================================
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--from", dest="start", help="Start at this stage (and run what depends on it)")
+    parser.add_argument("--until", help="Stop after this stage (and what it depends on)")
+    parser.add_argument("--skip", nargs="+", default=[], help="Stages to leave out, e.g. load_bigquery")
+    parser.add_argument("--force", action="store_true", help="Run selected stages even if their inputs are unchanged")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which stages would run")
+    parser.add_argument("--workers", type=int, default=STAGE_WORKERS, help="Stages run concurrently")
+    parser.add_argument("--extract-workers", type=int, default=8, help="Concurrent requests for movie details")
+    parser.add_argument("--transform-workers", type=int, default=1, help="Transform worker processes")
+    parser.add_argument("--compression", choices=["none", "gzip", "zstd"], default="none", help="Details/credits store compression")
+    args = parser.parse_args()
+
+    print("=== TMDB PIPELINE ===")
+    stages = pipeline(args.extract_workers, args.transform_workers, args.compression)
+    status = run_dag(stages, STATE_PATH, args.start, args.until, args.skip, args.force, args.workers, args.dry_run)
+    if not args.dry_run:
+        METRICS.write_report("pipeline")
+
+    if "failed" in status.values():
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import os
+import threading
+
+import pytest
+
+from src.etl.publish import mark_published, read_published
+from src.pipeline.dag import run_dag, stage
+
+
+@pytest.fixture
+def files(tmp_path):
+    for name in ("code.py", "input.txt"):
+        (tmp_path / name).write_text("v1")
+    return tmp_path
+
+
+def pipeline(folder, runs, params=None, fail=(), max_age=None):
+    """extract -> transform -> (load_a, load_b); each run appends its name to `runs`."""
+    def run(name):
+        def action():
+            if name in fail:
+                raise RuntimeError(f"{name} broke")
+            runs.append(name)
+            (folder / f"{name}.out").write_text(name + (folder / "code.py").read_text())
+        return action
+
+    return [
+        stage("extract", run("extract"), inputs=[folder / "input.txt"], outputs=[folder / "extract.out"],
+              max_age=max_age),
+        stage("transform", run("transform"), deps=["extract"], inputs=[folder / "extract.out"],
+              outputs=[folder / "transform.out"], code=[folder / "code.py"], params=params),
+        stage("load_a", run("load_a"), deps=["transform"], inputs=[folder / "transform.out"]),
+        stage("load_b", run("load_b"), deps=["transform"], inputs=[folder / "transform.out"]),
+    ]
+
+
+def run(folder, **kwargs):
+    runs = []
+    options = {k: kwargs.pop(k) for k in ("start", "until", "skip", "force", "dry_run") if k in kwargs}
+    status = run_dag(pipeline(folder, runs, **kwargs), folder / "state.json", **options)
+    return status, runs
+
+
+def test_unchanged_stages_are_skipped(files):
+    status, runs = run(files)
+    assert sorted(runs) == ["extract", "load_a", "load_b", "transform"]
+
+    status, runs = run(files)
+    assert runs == [] and set(status.values()) == {"skipped"}
+
+
+def test_code_change_reruns_stage_and_downstream(files):
+    run(files)
+    (files / "code.py").write_text("v2")
+
+    status, runs = run(files)
+    assert status["extract"] == "skipped"
+    assert sorted(runs) == ["load_a", "load_b", "transform"]
+
+
+def test_params_and_inputs_change_the_hash(files):
+    run(files)
+    assert run(files, params={"compression": "zstd"})[0]["transform"] == "ran"
+
+    (files / "input.txt").write_text("v2")
+    assert run(files, params={"compression": "zstd"})[0]["extract"] == "ran"
+
+
+def test_same_output_content_skips_downstream(files):
+    run(files)
+    (files / "input.txt").write_text("v2")  # extract reruns but writes the same output
+
+    status, runs = run(files)
+    assert runs == ["extract"]
+    assert status["transform"] == "skipped"
+
+
+def test_touched_output_reruns_stage(files):
+    run(files)
+    (files / "transform.out").write_text("edited by hand")
+
+    status, runs = run(files)
+    assert runs == ["transform"]
+
+
+def test_max_age_reruns_stage(files):
+    run(files, max_age=3600)
+    assert run(files, max_age=3600)[1] == []
+    assert run(files, max_age=0)[1] == ["extract"]
+
+
+def test_failure_blocks_downstream_and_is_retried(files):
+    status, runs = run(files, fail={"transform"})
+    assert status["transform"] == "failed"
+    assert status["load_a"] == status["load_b"] == "blocked"
+
+    status, runs = run(files)
+    assert sorted(runs) == ["load_a", "load_b", "transform"]
+
+
+def test_selection_force_and_dry_run(files):
+    run(files)
+
+    status, runs = run(files, start="transform", until="load_a", force=True)
+    assert runs == ["transform", "load_a"]
+    assert status["extract"] == status["load_b"] == "not selected"
+
+    (files / "code.py").write_text("v2")
+    status, runs = run(files, dry_run=True)
+    assert runs == [] and status["transform"] == "would run"
+    assert run(files, skip=["load_b"])[1] == ["transform", "load_a"]
+
+    with pytest.raises(ValueError, match="Unknown stage"):
+        run(files, start="publish")
+
+
+def test_concurrent_publish_keeps_both_targets(tmp_path):
+    # load_postgres and load_bigquery publish from parallel pipeline stages.
+    def publish(target):
+        for _ in range(50):
+            mark_published(target, ["movies"], folder=tmp_path)
+
+    threads = [threading.Thread(target=publish, args=(target,)) for target in ("postgres", "bigquery")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert read_published("postgres", tmp_path)["tables"] == ["movies"]
+    assert read_published("bigquery", tmp_path)["tables"] == ["movies"]
+    assert not [f for f in os.listdir(tmp_path) if f.endswith(".tmp")]
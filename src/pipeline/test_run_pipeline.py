@@ -0,0 +1,20 @@
+from src.pipeline.run_pipeline import ETL, TRANSFORM_CODE, package_imports, pipeline
+
+
+def test_transform_hash_covers_its_imports():
+    transform = next(s for s in pipeline() if s.name == "transform")
+    hashed = {path.stem for path in transform.code}
+
+    assert {"transform_tmdb", "schemas", "dimensions", "aggregate_cube", "storage"} <= hashed
+    assert list(transform.code) == TRANSFORM_CODE
+
+
+def test_package_imports_follow_modules_transitively(tmp_path):
+    (tmp_path / "main.py").write_text("import os\nfrom .helpers import a\n\ndef run():\n    from .lazy import b\n")
+    (tmp_path / "helpers.py").write_text("from .deep import c\nfrom src.other import d\n")
+    (tmp_path / "lazy.py").write_text("")
+    (tmp_path / "deep.py").write_text("from .helpers import a\n")
+    (tmp_path / "unused.py").write_text("")
+
+    assert [p.name for p in package_imports(tmp_path / "main.py")] == ["deep.py", "helpers.py", "lazy.py", "main.py"]
+    assert ETL / "dimensions.py" in package_imports(ETL / "transform_tmdb.py")